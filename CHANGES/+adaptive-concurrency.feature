@@ -0,0 +1,2 @@
+Added the ``COOKBOOK_ADAPTIVE_CONCURRENCY_MAX`` setting to adapt the number of concurrent artifact
+downloads to the throughput of each upstream host.
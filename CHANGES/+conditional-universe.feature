@@ -0,0 +1,4 @@
+Sync requests the remote universe conditionally (using its ETag and Last-Modified headers). If the
+universe has not changed since the last sync from the same remote into the repository, the sync
+finishes without creating a new repository version. The state of the last sync is stored in a new
+table.
@@ -0,0 +1,2 @@
+The version constraints of the ``cookbooks`` specifier of a remote are validated and honoured
+when synchronizing (e.g. ``{"ntp": "~> 3.0"}``).
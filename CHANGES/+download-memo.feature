@@ -0,0 +1,3 @@
+Sync remembers the artifact downloaded from a URL together with its HTTP validators. A cookbook
+available at a known URL from another remote is revalidated with a conditional request instead of
+being downloaded again.
@@ -0,0 +1,2 @@
+Added the ``import_directory`` repository action to import all cookbook archives found in a
+directory on the Pulp server (within ``ALLOWED_IMPORT_PATHS``) into a new repository version.
@@ -0,0 +1,2 @@
+Added the ``latest_versions`` remote option to synchronize only the given number of latest versions
+of each cookbook.
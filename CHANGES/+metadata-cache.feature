@@ -0,0 +1,2 @@
+Added the ``COOKBOOK_METADATA_CACHE_SIZE`` setting. The metadata extracted from a cookbook archive is
+stored and cached, so the archive is decompressed only once.
@@ -0,0 +1,3 @@
+Added the ``COOKBOOK_METADATA_MAX_MEMBERS`` and ``COOKBOOK_METADATA_MAX_BYTES`` settings to limit how
+much of a cookbook archive is read when looking for its ``metadata.json`` file. Archives exceeding a
+limit are rejected.
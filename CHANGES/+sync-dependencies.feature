@@ -0,0 +1,2 @@
+Added the ``sync_dependencies`` remote option to synchronize the cookbooks of the ``cookbooks``
+specifier together with all their (transitive) dependencies.
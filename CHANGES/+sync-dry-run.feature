@@ -0,0 +1,3 @@
+Added the ``dry_run`` option to the sync action. A dry run reports the number of cookbooks to add
+and to remove, the number of artifacts to download and the estimated download size without
+creating a repository version.
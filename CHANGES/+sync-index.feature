@@ -0,0 +1,2 @@
+Added the ``COOKBOOK_SYNC_INDEX_MAX_BYTES`` setting to match synced content against an in-memory
+index of the repository version instead of querying the database for each batch.
@@ -0,0 +1,3 @@
+Added the ``COOKBOOK_SYNC_INSTRUMENTATION`` setting to record metrics for each stage of the sync
+pipeline. The metrics are logged and attached to the sync task as progress reports with the code
+``sync.pipeline.stage``.
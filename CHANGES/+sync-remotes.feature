@@ -0,0 +1,3 @@
+Added the ``sync_remotes`` repository action to synchronize a repository from several remotes into
+a single repository version. If several remotes provide the same cookbook version, the remote listed
+first takes precedence.
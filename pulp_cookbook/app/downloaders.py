@@ -0,0 +1,267 @@
+# (C) Copyright 2026 Simon Baatz <gmbnomis@gmail.com>
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import asyncio
+
+import aiohttp
+
+from pulpcore.plugin.download import (
+    DownloaderFactory,
+    DownloadResult,
+    FileDownloader,
+    HttpDownloader,
+)
+
+from pulp_cookbook.concurrency import AdaptiveConcurrency, AdaptiveLimiter
+
+
+def response_validators(headers):
+    """
+    Get the validators of a response for a conditional request.
+
+    Args:
+        headers (dict): The headers of the response
+
+    Returns:
+        dict: "etag" and/or "last_modified" values
+
+    """
+    validators = {"etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified")}
+    return {key: value for key, value in validators.items() if value}
+
+
+class ConditionalSession:
+    """
+    A proxy of an `aiohttp.ClientSession` sending additional headers with each GET request.
+
+    Args:
+        session (aiohttp.ClientSession): the session to use
+        headers (dict): the headers to add to each request
+
+    """
+
+    def __init__(self, session, headers):
+        self.session = session
+        self.headers = headers
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+    def get(self, url, headers=None, **kwargs):
+        return self.session.get(url, headers={**self.headers, **(headers or {})}, **kwargs)
+
+
+class UniverseDownloadMixin:
+    """
+    Mixin for downloaders of a universe that is parsed while it is downloaded.
+
+    If `universe` is set, the downloaded data is flushed to the file after each
+    chunk. Thus, the file (at `path`) can be read while it grows, and reading
+    it does not hold up the download. The `written` event is set whenever data
+    has been written. The `started` event is set when the first data is about
+    to arrive. Each attempt of a retried download writes a new file.
+    """
+
+    not_modified = False
+
+    def __init__(self, url, universe=False, **kwargs):
+        super().__init__(url, **kwargs)
+        self.universe = universe
+        self.started = asyncio.Event()
+        self.written = asyncio.Event()
+
+    async def handle_data(self, data):
+        """Handle downloaded data and make it available to readers of the file."""
+        self.started.set()
+        await super().handle_data(data)
+        if self.universe:
+            self._writer.flush()
+            self.written.set()
+
+
+class CookbookFileDownloader(UniverseDownloadMixin, FileDownloader):
+    """Downloader of a cookbook remote for `file://` URLs."""
+
+
+class CookbookHttpDownloader(UniverseDownloadMixin, HttpDownloader):
+    """
+    Downloader of a cookbook remote for HTTP(S) URLs supporting conditional requests.
+
+    If the validators of a previous download are given, the request is
+    conditional. If the server responds with "304 Not Modified", nothing is
+    downloaded, `not_modified` is set and the `path` of the result is None.
+    Otherwise, the validators of the response are stored as "validators" in
+    the `extra_data` passed to `run()` (if any).
+    """
+
+    def __init__(self, url, etag=None, last_modified=None, **kwargs):
+        """
+        Args:
+            url (str): The url to download.
+            etag (str): ETag of a previous download (optional)
+            last_modified (str): Last-Modified header of a previous download (optional)
+            kwargs (dict): This accepts the parameters of
+                :class:`~pulpcore.plugin.download.HttpDownloader` and `universe`.
+
+        """
+        super().__init__(url, **kwargs)
+        self.etag = etag
+        self.last_modified = last_modified
+        headers = self.conditional_headers()
+        if headers:
+            self.session = ConditionalSession(self.session, headers)
+
+    def conditional_headers(self):
+        """Return the request headers making the request conditional."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    async def is_modified(self):
+        """
+        Check whether the `url` has been modified since the previous download.
+
+        Sends the conditional request (within the concurrency limit of the
+        downloader), but does not download the body of the response.
+
+        Returns:
+            bool: False if the server responded with "304 Not Modified"
+
+        Raises:
+            aiohttp.ClientResponseError: When the response status is >= 400.
+
+        """
+        async with self.semaphore:
+            if self.download_throttler:
+                await self.download_throttler.acquire()
+            async with self.session.get(
+                self.url, proxy=self.proxy, proxy_auth=self.proxy_auth, auth=self.auth
+            ) as response:
+                self.raise_for_status(response)
+                # Do not read the body of a modified response
+                response.close()
+                return response.status != 304
+
+    async def run(self, extra_data=None):
+        """
+        Download the `url` unless it has not been modified.
+
+        Args:
+            extra_data (dict): Extra data passed to the downloader.
+
+        Returns:
+            :class:`~pulpcore.plugin.download.DownloadResult`
+
+        """
+        result = await super().run(extra_data=extra_data)
+        if extra_data is not None and not self.not_modified:
+            extra_data["validators"] = response_validators(result.headers)
+        return result
+
+    async def _handle_response(self, response):
+        if response.status == 304:
+            self.not_modified = True
+            return DownloadResult(
+                path=None, artifact_attributes=None, url=self.url, headers=response.headers
+            )
+        self.started.set()
+        return await super()._handle_response(response)
+
+
+class AdaptiveHttpDownloader(CookbookHttpDownloader):
+    """
+    HTTP downloader reporting the outcome of each attempt to its concurrency limiter.
+
+    If the `semaphore` is an :class:`~pulp_cookbook.concurrency.AdaptiveLimiter`,
+    responses with status 429 or 5xx and timeouts are reported as failures,
+    i.e. they reduce the number of concurrent downloads from the host. Otherwise,
+    the downloader works like :class:`CookbookHttpDownloader`.
+    """
+
+    async def _run(self, extra_data=None):
+        if not isinstance(self.semaphore, AdaptiveLimiter):
+            return await super()._run(extra_data=extra_data)
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+        epoch = self.semaphore.epoch
+        try:
+            result = await super()._run(extra_data=extra_data)
+        except aiohttp.ClientResponseError as exc:
+            if exc.status == 429 or exc.status >= 500:
+                await self.semaphore.record_failure(epoch)
+            raise
+        except asyncio.TimeoutError:
+            await self.semaphore.record_failure(epoch)
+            raise
+        await self.semaphore.record_success(loop.time() - start, self._size)
+        return result
+
+
+class CookbookDownloaderFactory(DownloaderFactory):
+    """
+    The DownloaderFactory of a cookbook remote.
+
+    Builds :class:`CookbookHttpDownloader` and :class:`CookbookFileDownloader`
+    instances. The universe download (a downloader built with `universe=True`)
+    runs while the sync pipeline downloads artifacts. Thus, it does not take a
+    slot of the remote's download concurrency limit.
+
+    Args:
+        remote (:class:`~pulpcore.plugin.models.Remote`): The remote used to populate
+            downloader settings.
+
+    """
+
+    downloader_overrides = {
+        "http": CookbookHttpDownloader,
+        "https": CookbookHttpDownloader,
+        "file": CookbookFileDownloader,
+    }
+
+    def __init__(self, remote):
+        super().__init__(remote, downloader_overrides=self.downloader_overrides)
+
+    def build(self, url, **kwargs):
+        downloader = super().build(url, **kwargs)
+        if kwargs.get("universe"):
+            downloader.semaphore = asyncio.Semaphore()
+        return downloader
+
+
+class AdaptiveDownloaderFactory(CookbookDownloaderFactory):
+    """
+    A DownloaderFactory adapting the number of concurrent HTTP downloads per host.
+
+    Instead of the remote's download concurrency limit for all downloads, each
+    upstream host gets an :class:`~pulp_cookbook.concurrency.AdaptiveLimiter`
+    starting at the remote's download concurrency. The universe download does
+    not count towards the throughput of its host.
+
+    Args:
+        remote (:class:`~pulpcore.plugin.models.Remote`): The remote used to populate
+            downloader settings.
+        max_concurrency (int): maximum number of concurrent downloads per host
+
+    """
+
+    downloader_overrides = {
+        "http": AdaptiveHttpDownloader,
+        "https": AdaptiveHttpDownloader,
+        "file": CookbookFileDownloader,
+    }
+
+    def __init__(self, remote, max_concurrency):
+        super().__init__(remote)
+        self._concurrency = AdaptiveConcurrency(
+            remote.download_concurrency or remote.DEFAULT_DOWNLOAD_CONCURRENCY, max_concurrency
+        )
+
+    def build(self, url, **kwargs):
+        downloader = super().build(url, **kwargs)
+        if isinstance(downloader, AdaptiveHttpDownloader) and not kwargs.get("universe"):
+            downloader.semaphore = self._concurrency.limiter(url)
+        return downloader
@@ -0,0 +1,108 @@
+# (C) Copyright 2026 Simon Baatz <gmbnomis@gmail.com>
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from pulp_cookbook.app.models import CookbookArtifactMetadata
+from pulp_cookbook.metadata import CookbookMetadata
+
+
+class LRUCache:
+    """
+    A simple, thread safe least recently used cache.
+
+    Args:
+        maxsize (int): Maximum number of entries to keep
+
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        """Return the value for `key` or None if it is not cached."""
+        with self._lock:
+            try:
+                self._entries.move_to_end(key)
+            except KeyError:
+                return None
+            return self._entries[key]
+
+    def put(self, key, value):
+        """Cache `value` for `key`, evicting the least recently used entry if necessary."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_metadata_cache = None
+
+
+def metadata_cache():
+    """Return the in-process cache of extracted metadata keyed by (artifact sha256, name)."""
+    global _metadata_cache
+    if _metadata_cache is None:
+        _metadata_cache = LRUCache(settings.COOKBOOK_METADATA_CACHE_SIZE)
+    return _metadata_cache
+
+
+def get_cookbook_metadata(artifact, name):
+    """
+    Get the metadata of a cookbook tar archive artifact.
+
+    The metadata is looked up in the in-process cache first, then in the
+    database. Only if both miss, the archive is read and the extracted metadata
+    is stored in both caches.
+
+    Args:
+        artifact (:class:`~pulpcore.plugin.models.Artifact`): saved artifact of the
+            cookbook tar archive
+        name (str): name of the cookbook
+
+    Returns:
+        CookbookMetadata: Instance containing the metadata
+
+    Raises:
+        FileNotFoundError: If the archive does not contain the metadata
+        ArchiveLimitExceeded: If the metadata was not found within the configured limits
+
+    """
+    key = (artifact.sha256, name)
+    cache = metadata_cache()
+    metadata = cache.get(key)
+    if metadata is None:
+        try:
+            metadata = CookbookArtifactMetadata.objects.get(artifact=artifact, name=name).metadata
+        except CookbookArtifactMetadata.DoesNotExist:
+            with artifact.file.open("rb") as fileobj:
+                metadata = CookbookMetadata.from_cookbook_file(
+                    fileobj=fileobj,
+                    name=name,
+                    max_members=settings.COOKBOOK_METADATA_MAX_MEMBERS,
+                    max_bytes=settings.COOKBOOK_METADATA_MAX_BYTES,
+                ).metadata
+            try:
+                with transaction.atomic():
+                    CookbookArtifactMetadata.objects.update_or_create(
+                        artifact=artifact, defaults={"name": name, "metadata": metadata}
+                    )
+            except IntegrityError:
+                # Concurrently stored for the same artifact
+                pass
+        cache.put(key, metadata)
+    return CookbookMetadata(metadata)
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.16 on 2026-10-18 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0062_add_new_distribution_mastermodel'),
+        ('cookbook', '0003_json_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CookbookArtifactMetadata',
+            fields=[
+                ('artifact', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='cookbook_cookbookartifactmetadata', serialize=False, to='core.artifact')),
+                ('name', models.TextField()),
+                ('metadata', models.JSONField()),
+            ],
+            options={
+                'default_related_name': '%(app_label)s_%(model_name)s',
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.16 on 2026-10-18 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0062_add_new_distribution_mastermodel'),
+        ('cookbook', '0005_cookbookremote_sync_dependencies'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CookbookSyncState',
+            fields=[
+                ('pulp_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('pulp_created', models.DateTimeField(auto_now_add=True)),
+                ('pulp_last_updated', models.DateTimeField(auto_now=True, null=True)),
+                ('etag', models.TextField(null=True)),
+                ('last_modified', models.TextField(null=True)),
+                ('mirror', models.BooleanField()),
+                ('remote_last_updated', models.DateTimeField(null=True)),
+                ('remote', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cookbook_cookbooksyncstate', to='cookbook.cookbookremote')),
+                ('repository', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cookbook_cookbooksyncstate', to='cookbook.cookbookrepository')),
+                ('repository_version', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cookbook_cookbooksyncstate', to='core.repositoryversion')),
+            ],
+            options={
+                'default_related_name': '%(app_label)s_%(model_name)s',
+                'unique_together': {('remote', 'repository')},
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.16 on 2026-10-18 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0062_add_new_distribution_mastermodel'),
+        ('cookbook', '0007_cookbooksyncstate_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CookbookDownloadMemo',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('artifact', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cookbook_cookbookdownloadmemo', to='core.artifact')),
+            ],
+            options={
+                'default_related_name': '%(app_label)s_%(model_name)s',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cookbook', '0008_cookbookdownloadmemo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cookbookremote',
+            name='latest_versions',
+            field=models.PositiveIntegerField(null=True),
+        ),
+    ]
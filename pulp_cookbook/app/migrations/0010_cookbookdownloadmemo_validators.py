@@ -0,0 +1,23 @@
+# Generated by Django 3.2.16 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cookbook', '0009_cookbookremote_latest_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cookbookdownloadmemo',
+            name='etag',
+            field=models.TextField(null=True),
+        ),
+        migrations.AddField(
+            model_name='cookbookdownloadmemo',
+            name='last_modified',
+            field=models.TextField(null=True),
+        ),
+    ]
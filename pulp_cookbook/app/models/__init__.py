@@ -2,8 +2,11 @@
 #
 # SPDX-License-Identifier: GPL-2.0-or-later
 
+from .content import CookbookArtifactMetadata  # noqa
+from .content import CookbookDownloadMemo  # noqa
 from .content import CookbookPackageContent  # noqa
 from .publication import CookbookDistribution  # noqa
 from .publication import CookbookPublication  # noqa
 from .repository import CookbookRepository  # noqa
 from .repository import CookbookRemote  # noqa
+from .repository import CookbookSyncState  # noqa
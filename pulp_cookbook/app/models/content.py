@@ -6,7 +6,7 @@ import uuid
 
 from django.db import models
 
-from pulpcore.plugin.models import Content
+from pulpcore.plugin.models import Artifact, Content
 
 
 class CookbookPackageContent(Content):
@@ -90,3 +90,77 @@ class CookbookPackageContent(Content):
     class Meta:
         default_related_name = "%(app_label)s_%(model_name)s"
         unique_together = ("name", "version", "content_id_type", "content_id")
+
+
+class CookbookArtifactMetadata(models.Model):
+    """
+    Metadata extracted from a cookbook tar archive.
+
+    Caches the content of the 'metadata.json' file of a cookbook artifact
+    to avoid decompressing the archive again.
+
+    Fields:
+        name (str): The name of the cookbook the metadata was extracted for.
+        metadata (JSON): The content of the 'metadata.json' file.
+
+    Relations:
+        artifact (Artifact): The cookbook tar archive.
+    """
+
+    artifact = models.OneToOneField(Artifact, on_delete=models.CASCADE, primary_key=True)
+    name = models.TextField(blank=False, null=False)
+    metadata = models.JSONField(blank=False, null=False)
+
+    class Meta:
+        default_related_name = "%(app_label)s_%(model_name)s"
+
+
+class HttpValidators(models.Model):
+    """
+    The HTTP validators of a response, kept to repeat the request conditionally.
+
+    Fields:
+        etag (models.TextField): ETag header of the response
+        last_modified (models.TextField): Last-Modified header of the response
+    """
+
+    etag = models.TextField(null=True)
+    last_modified = models.TextField(null=True)
+
+    def validators(self):
+        """
+        Get the validators for a conditional request.
+
+        Returns:
+            dict: "etag" and/or "last_modified" values
+
+        """
+        validators = {"etag": self.etag, "last_modified": self.last_modified}
+        return {key: value for key, value in validators.items() if value}
+
+    class Meta:
+        abstract = True
+
+
+class CookbookDownloadMemo(HttpValidators):
+    """
+    The artifact downloaded for a cookbook download URL.
+
+    Allows syncs to attach a known artifact instead of downloading the same
+    cookbook tar archive again, e.g. from remotes mirroring the same upstream.
+    The HTTP validators of the download are kept to revalidate the artifact
+    with a conditional request.
+
+    Fields:
+        key (str): The key of the download (see
+            :func:`~pulp_cookbook.metadata.download_key`).
+
+    Relations:
+        artifact (Artifact): The downloaded cookbook tar archive.
+    """
+
+    key = models.CharField(max_length=64, primary_key=True)
+    artifact = models.ForeignKey(Artifact, on_delete=models.CASCADE)
+
+    class Meta:
+        default_related_name = "%(app_label)s_%(model_name)s"
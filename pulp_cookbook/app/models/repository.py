@@ -2,11 +2,16 @@
 #
 # SPDX-License-Identifier: GPL-2.0-or-later
 
-from django.db.models import JSONField
-from pulpcore.plugin.models import Remote, Repository
+from django.conf import settings
+from django.db import models
+from django.db.models import BooleanField, JSONField, PositiveIntegerField
+from pulpcore.plugin.models import BaseModel, Remote, Repository, RepositoryVersion
 
-from pulp_cookbook.app.models.content import CookbookPackageContent
+from pulp_cookbook.app.downloaders import AdaptiveDownloaderFactory, CookbookDownloaderFactory
+from pulp_cookbook.app.models.content import CookbookPackageContent, HttpValidators
 from pulp_cookbook.app.repo_version_utils import check_repo_version_constraint
+from pulp_cookbook.metadata import UniverseFingerprint
+from pulp_cookbook.versions import parse_constraint
 
 
 class CookbookRemote(Remote):
@@ -17,12 +22,45 @@ class CookbookRemote(Remote):
     TYPE = "cookbook"
 
     cookbooks = JSONField(null=True)
+    sync_dependencies = BooleanField(default=False)
+    latest_versions = PositiveIntegerField(null=True)
 
-    def specifier_cookbook_names(self):
+    def specifier_constraints(self):
+        """
+        Get the version constraints of the cookbook specifier.
+
+        Returns:
+            dict: compiled VersionConstraint by cookbook name or None if the
+                remote does not restrict the cookbooks to synchronize
+
+        Raises:
+            InvalidConstraint: If a version constraint is invalid
+
+        """
         if self.cookbooks is None:
             return None
-        else:
-            return set(self.cookbooks.keys())
+        return {name: parse_constraint(version or "") for name, version in self.cookbooks.items()}
+
+    @property
+    def download_factory(self):
+        """
+        Return the DownloaderFactory used to download the universe and cookbook artifacts.
+
+        The factory builds the downloaders of
+        :class:`~pulp_cookbook.app.downloaders.CookbookDownloaderFactory`. If
+        COOKBOOK_ADAPTIVE_CONCURRENCY_MAX is set, the number of concurrent
+        downloads adapts per upstream host (see
+        :class:`~pulp_cookbook.app.downloaders.AdaptiveDownloaderFactory`).
+        """
+        try:
+            return self._download_factory
+        except AttributeError:
+            max_concurrency = settings.COOKBOOK_ADAPTIVE_CONCURRENCY_MAX
+            if max_concurrency:
+                self._download_factory = AdaptiveDownloaderFactory(self, max_concurrency)
+            else:
+                self._download_factory = CookbookDownloaderFactory(self)
+            return self._download_factory
 
     class Meta:
         default_related_name = "%(app_label)s_%(model_name)s"
@@ -52,3 +90,57 @@ class CookbookRepository(Repository):
 
     class Meta:
         default_related_name = "%(app_label)s_%(model_name)s"
+
+
+class CookbookSyncState(HttpValidators, BaseModel):
+    """
+    State of the last successful sync of a repository from a remote.
+
+    Keeps the HTTP validators of the universe response and a fingerprint of the
+    universe of the remote to avoid re-syncing unchanged parts of the universe.
+
+    Fields:
+        fingerprint (models.BinaryField): fingerprint of the synced universe entries
+        mirror (models.BooleanField): whether the sync was in mirror mode
+        remote_last_updated (models.DateTimeField): last update of the remote at sync time
+
+    Relations:
+        remote (CookbookRemote): the remote synced from
+        repository (CookbookRepository): the repository synced into
+        repository_version (RepositoryVersion): latest repository version after the sync
+    """
+
+    remote = models.ForeignKey(CookbookRemote, on_delete=models.CASCADE)
+    repository = models.ForeignKey(CookbookRepository, on_delete=models.CASCADE)
+    repository_version = models.ForeignKey(RepositoryVersion, on_delete=models.CASCADE)
+    fingerprint = models.BinaryField(null=True)
+    mirror = models.BooleanField()
+    remote_last_updated = models.DateTimeField(null=True)
+
+    def is_current(self, mirror):
+        """
+        Check whether the state applies to a new sync.
+
+        The state of the last sync only applies if neither the remote nor the
+        repository changed since and the last sync was at least as strict (a
+        mirror sync after an additive sync may remove content).
+
+        Args:
+            mirror (bool): True for mirror mode, False for additive
+
+        """
+        return (
+            self.remote_last_updated == self.remote.pulp_last_updated
+            and self.repository_version_id == self.repository.latest_version().pk
+            and (self.mirror or not mirror)
+        )
+
+    def universe_fingerprint(self):
+        """Return the UniverseFingerprint of the synced universe (None if not available)."""
+        if self.fingerprint is None:
+            return None
+        return UniverseFingerprint.from_bytes(bytes(self.fingerprint))
+
+    class Meta:
+        default_related_name = "%(app_label)s_%(model_name)s"
+        unique_together = ("remote", "repository")
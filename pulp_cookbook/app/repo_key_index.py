@@ -0,0 +1,97 @@
+# (C) Copyright 2026 Simon Baatz <gmbnomis@gmail.com>
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+from django.db import DEFAULT_DB_ALIAS
+
+from pulpcore.plugin.models import Artifact, ContentArtifact
+
+# Estimated memory use of a content unit (and its artifact) in the index
+ESTIMATED_ENTRY_SIZE = 2048
+
+# Number of rows to fetch from the database at once when loading the index
+LOAD_CHUNK_SIZE = 2000
+
+
+class RepoKeyIndex:
+    """
+    In-memory index of the content of a repository version by repo key.
+
+    The index stores the field values of each content unit and of its
+    artifacts as plain tuples. Model instances are only created for content
+    that is looked up.
+
+    Use `load()` to create an index.
+    """
+
+    def __init__(self, model_type):
+        self.model_type = model_type
+        self._content_fields = [field.name for field in model_type._meta.concrete_fields]
+        self._artifact_fields = [field.name for field in Artifact._meta.concrete_fields]
+        self._key_positions = [
+            self._content_fields.index(field) for field in model_type.repo_key_fields
+        ]
+        self._content_by_key = {}
+        self._artifacts_by_pk = {}
+
+    def __len__(self):
+        return len(self._content_by_key)
+
+    @classmethod
+    def load(cls, model_type, repository_version, max_bytes):
+        """
+        Load the index for a content type of a repository version.
+
+        Args:
+            model_type (type): the content model
+            repository_version (RepositoryVersion): the repository version to index
+            max_bytes (int): memory limit for the index
+
+        Returns:
+            RepoKeyIndex: the index or None if the estimated memory use of the
+                index exceeds `max_bytes`
+
+        """
+        content = model_type.objects.filter(pk__in=repository_version.content)
+        if content.count() * ESTIMATED_ENTRY_SIZE > max_bytes:
+            return None
+        index = cls(model_type)
+        key_positions = index._key_positions
+        for values in content.values_list(*index._content_fields).iterator(
+            chunk_size=LOAD_CHUNK_SIZE
+        ):
+            index._content_by_key[tuple(values[i] for i in key_positions)] = values
+        content_artifacts = ContentArtifact.objects.filter(
+            content__in=content, artifact__isnull=False
+        ).values_list(
+            "content_id",
+            "relative_path",
+            *(f"artifact__{field}" for field in index._artifact_fields),
+        )
+        for content_pk, relative_path, *values in content_artifacts.iterator(
+            chunk_size=LOAD_CHUNK_SIZE
+        ):
+            index._artifacts_by_pk.setdefault(content_pk, []).append((relative_path, tuple(values)))
+        return index
+
+    def get(self, repo_key):
+        """
+        Look up content by repo key.
+
+        Args:
+            repo_key (tuple): repo key as returned by `repo_key_value()`
+
+        Returns:
+            tuple: the content instance and a list of (relative path, Artifact)
+                tuples of its artifacts or None if there is no such content
+
+        """
+        values = self._content_by_key.get(repo_key)
+        if values is None:
+            return None
+        content = self.model_type.from_db(DEFAULT_DB_ALIAS, self._content_fields, values)
+        artifacts = [
+            (relative_path, Artifact.from_db(DEFAULT_DB_ALIAS, self._artifact_fields, a_values))
+            for relative_path, a_values in self._artifacts_by_pk.get(content.pk, ())
+        ]
+        return content, artifacts
@@ -2,7 +2,8 @@
 #
 # SPDX-License-Identifier: GPL-2.0-or-later
 
-from django.db.models import Count
+from django.db.models import Count, F, Func, TextField
+from django.db.models.expressions import RawSQL
 
 
 def check_repo_version_constraint(repository_version):
@@ -30,3 +31,33 @@ def check_repo_version_constraint(repository_version):
                     "repository version would contain multiple versions"
                     f" of cookbooks: {duplicates_str}"
                 )
+
+
+def filter_repo_keys(queryset, keys, fields=None):
+    """
+    Restrict a content queryset to content with the given repo keys.
+
+    The keys are matched in a single set-based lookup: the key values are
+    passed as one array parameter per key field and the row of key fields of
+    the content must be in the rows of the unnested arrays. Thus, the statement
+    does not grow with the number of keys (in contrast to OR-ing one `Q` object
+    per key).
+
+    Args:
+        queryset (django.db.models.QuerySet): content of a single type with text key fields
+        keys (iterable): repo key tuples as returned by `repo_key_value()`
+        fields (tuple): the key fields if the keys are not repo keys (e.g. the
+            natural key fields)
+
+    Returns:
+        django.db.models.QuerySet: the restricted queryset
+
+    """
+    fields = fields or queryset.model.repo_key_fields
+    values = [list(field_values) for field_values in zip(*keys)] or [[] for _ in fields]
+    arrays = ", ".join(["%s::text[]"] * len(fields))
+    return queryset.alias(
+        _filter_repo_key=Func(
+            *(F(field) for field in fields), function="ROW", output_field=TextField()
+        )
+    ).filter(_filter_repo_key__in=RawSQL(f"SELECT * FROM unnest({arrays})", values))
@@ -2,6 +2,8 @@
 #
 # SPDX-License-Identifier: GPL-2.0-or-later
 
+import os
+
 from gettext import gettext as _
 
 from django.conf import settings
@@ -15,9 +17,11 @@ from pulpcore.plugin.serializers import (
     RelatedField,
     RemoteSerializer,
     RepositorySerializer,
+    RepositorySyncURLSerializer,
     SingleArtifactContentUploadSerializer,
 )
 
+from pulp_cookbook.app.metadata_cache import get_cookbook_metadata
 from pulp_cookbook.app.utils import pulp_cookbook_content_path
 
 from pulp_cookbook.app.models import (
@@ -28,7 +32,8 @@ from pulp_cookbook.app.models import (
     CookbookRepository,
 )
 
-from pulp_cookbook.metadata import CookbookMetadata
+from pulp_cookbook.metadata import ArchiveLimitExceeded
+from pulp_cookbook.versions import InvalidConstraint, parse_constraint
 
 
 class CookbookPackageContentSerializer(SingleArtifactContentUploadSerializer):
@@ -57,13 +62,15 @@ class CookbookPackageContentSerializer(SingleArtifactContentUploadSerializer):
         data = super().deferred_validate(data)
 
         try:
-            metadata = CookbookMetadata.from_cookbook_file(
-                fileobj=data["artifact"].file, name=data["name"]
-            )
+            metadata = get_cookbook_metadata(data["artifact"], data["name"])
         except FileNotFoundError:
             raise serializers.ValidationError(
                 detail={"artifact": _("No metadata.json found in cookbook tar")}
             )
+        except ArchiveLimitExceeded as exc:
+            raise serializers.ValidationError(
+                detail={"artifact": _("Cookbook tar rejected: {}").format(exc)}
+            )
 
         try:
             if data["version"] != metadata.version:
@@ -114,6 +121,85 @@ class CookbookRepositorySerializer(RepositorySerializer):
         model = CookbookRepository
 
 
+class CookbookRepositorySyncURLSerializer(RepositorySyncURLSerializer):
+    """
+    Serializer for Cookbook Repository syncs.
+    """
+
+    dry_run = serializers.BooleanField(
+        required=False,
+        default=False,
+        help_text=_(
+            "If ``True``, only report the number of cookbooks the sync would add and remove,"
+            " the number of artifacts it would download and the estimated download size"
+            " (as progress reports of the task). No artifacts are downloaded and no"
+            " repository version is created."
+        ),
+    )
+
+
+class CookbookRepositoryMultiSyncSerializer(serializers.Serializer):
+    """
+    Serializer for syncs of a Cookbook Repository from several remotes.
+    """
+
+    remotes = serializers.ListField(
+        child=DetailRelatedField(
+            view_name_pattern=r"remotes(-.*/.*)-detail",
+            queryset=CookbookRemote.objects.all(),
+        ),
+        min_length=1,
+        help_text=_(
+            "The remotes to sync from. If several remotes provide the same cookbook"
+            " version, the remote listed first takes precedence."
+        ),
+    )
+
+    mirror = serializers.BooleanField(
+        required=False,
+        default=False,
+        help_text=_(
+            "If ``True``, synchronization will remove all content that is not present in "
+            "any of the remotes. If ``False``, sync will be additive only."
+        ),
+    )
+
+    def validate_remotes(self, value):
+        if len(set(value)) != len(value):
+            raise serializers.ValidationError(_("Remotes must not be listed more than once"))
+        return value
+
+
+class CookbookDirectoryImportSerializer(serializers.Serializer):
+    """
+    Serializer for importing cookbook archives from a local directory.
+    """
+
+    path = serializers.CharField(
+        help_text=_(
+            "Absolute path of a directory on the Pulp server containing cookbook archives"
+            " ('.tar.gz' or '.tgz' files, searched recursively). It must be within"
+            " ALLOWED_IMPORT_PATHS."
+        )
+    )
+
+    def validate_path(self, value):
+        """
+        Check that the path is a directory within ALLOWED_IMPORT_PATHS.
+        """
+        path = os.path.realpath(value)
+        if not any(
+            path == allowed or path.startswith(os.path.join(allowed, ""))
+            for allowed in map(os.path.realpath, settings.ALLOWED_IMPORT_PATHS)
+        ):
+            raise serializers.ValidationError(
+                _("Path '{}' is not within ALLOWED_IMPORT_PATHS").format(value)
+            )
+        if not os.path.isdir(path):
+            raise serializers.ValidationError(_("Path '{}' is not a directory").format(value))
+        return path
+
+
 class CookbookRemoteSerializer(RemoteSerializer):
     """Serializer for the remote pointing to a universe repo."""
 
@@ -130,21 +216,52 @@ class CookbookRemoteSerializer(RemoteSerializer):
         help_text=_(
             'An optional JSON object in the format {"<cookbook name>":'
             ' "<version_string>" }. Used to limit the cookbooks to synchronize'
-            " from the remote"
+            " from the remote. The version string is a Chef version constraint"
+            ' (like "~> 1.2" or ">= 1.0, < 2.0"), an empty string selects all'
+            " versions of the cookbook"
         ),
         required=False,
     )
 
+    sync_dependencies = serializers.BooleanField(
+        help_text=_(
+            "If True, synchronize the cookbooks selected by 'cookbooks' together with"
+            " their transitive dependencies (as declared in the universe of the remote)."
+            " Defaults to False."
+        ),
+        required=False,
+    )
+
+    latest_versions = serializers.IntegerField(
+        help_text=_(
+            "If set, synchronize only the given number of latest versions of each cookbook"
+            " (of the versions selected by 'cookbooks' and 'sync_dependencies')."
+        ),
+        min_value=1,
+        allow_null=True,
+        required=False,
+    )
+
     class Meta:
-        fields = RemoteSerializer.Meta.fields + ("cookbooks",)
+        fields = RemoteSerializer.Meta.fields + (
+            "cookbooks",
+            "sync_dependencies",
+            "latest_versions",
+        )
         model = CookbookRemote
 
-    # TODO: No support for version specifiers yet, only cookbook names
     def validate_cookbooks(self, value):
         if value == "":  # blank value
             return value
         if isinstance(value, dict):
-            if all(value.keys()):
+            if all(value.keys()) and all(isinstance(v, str) for v in value.values()):
+                for name, version in value.items():
+                    try:
+                        parse_constraint(version)
+                    except InvalidConstraint as exc:
+                        raise serializers.ValidationError(
+                            _("Invalid version constraint for cookbook '{}': {}").format(name, exc)
+                        )
                 return value
         raise serializers.ValidationError(
             _('Format must be {"<cookbook_name>" : "version_string" }')
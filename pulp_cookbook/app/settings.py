@@ -0,0 +1,32 @@
+# (C) Copyright 2026 Simon Baatz <gmbnomis@gmail.com>
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+# Limits for reading a cookbook archive when extracting its metadata. If the
+# 'metadata.json' file is not found within the given number of archive members
+# or (uncompressed) bytes, the archive is rejected. 'None' disables a limit.
+COOKBOOK_METADATA_MAX_MEMBERS = None
+COOKBOOK_METADATA_MAX_BYTES = None
+
+# Number of extracted cookbook metadata entries to keep in the in-process
+# cache (in front of the metadata stored in the database).
+COOKBOOK_METADATA_CACHE_SIZE = 1024
+
+# Memory limit (in bytes) for preloading the content of the repository version
+# into an in-memory index at the start of a sync. If the index would be larger,
+# existing content is queried per batch. 'None' disables the index.
+COOKBOOK_SYNC_INDEX_MAX_BYTES = None
+
+# Number of worker processes reading cookbook archives when importing a local
+# directory. 'None' uses the number of CPUs.
+COOKBOOK_IMPORT_PROCESSES = None
+
+# Maximum number of concurrent artifact downloads per upstream host. If set,
+# the number of concurrent downloads adapts per host, starting at the download
+# concurrency of the remote. 'None' uses the remote's fixed download concurrency.
+COOKBOOK_ADAPTIVE_CONCURRENCY_MAX = None
+
+# Record the number of items, the time busy and waiting and the queue depth of
+# each stage of the sync pipeline. The metrics are logged and attached to the
+# sync task as progress reports.
+COOKBOOK_SYNC_INSTRUMENTATION = False
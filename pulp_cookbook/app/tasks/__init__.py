@@ -2,5 +2,6 @@
 #
 # SPDX-License-Identifier: GPL-2.0-or-later
 
+from .importing import import_directory  # noqa
 from .publishing import publish  # noqa
-from .synchronizing import synchronize  # noqa
+from .synchronizing import synchronize, synchronize_remotes  # noqa
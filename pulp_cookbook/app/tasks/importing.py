@@ -0,0 +1,206 @@
+# (C) Copyright 2026 Simon Baatz <gmbnomis@gmail.com>
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import asyncio
+import hashlib
+import logging
+import os
+import tarfile
+import tempfile
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from gettext import gettext as _
+
+from django.conf import settings
+
+from pulpcore.plugin.models import Artifact, ProgressReport
+from pulpcore.plugin.stages import (
+    ArtifactSaver,
+    ContentSaver,
+    DeclarativeArtifact,
+    DeclarativeContent,
+    DeclarativeVersion,
+    QueryExistingArtifacts,
+    QueryExistingContents,
+    Stage,
+)
+
+from pulp_cookbook.app.models import CookbookPackageContent, CookbookRepository
+from pulp_cookbook.app.tasks.progress import ThrottledProgress
+from pulp_cookbook.metadata import CHUNK_SIZE, CookbookMetadata
+
+log = logging.getLogger(__name__)
+
+COOKBOOK_FILE_SUFFIXES = (".tar.gz", ".tgz")
+
+
+def find_cookbook_files(path):
+    """
+    Find cookbook archives in a directory tree.
+
+    Args:
+        path (str): the directory to search
+
+    Returns:
+        list: paths of all files with a cookbook archive suffix (sorted)
+
+    """
+    return sorted(
+        os.path.join(directory, filename)
+        for directory, _, filenames in os.walk(path)
+        for filename in filenames
+        if filename.endswith(COOKBOOK_FILE_SUFFIXES)
+    )
+
+
+def process_cookbook_file(path, working_dir, digest_names, max_members=None, max_bytes=None):
+    """
+    Copy a cookbook archive into the working directory, compute its digests and metadata.
+
+    Runs in a worker process, i.e. does not use the database.
+
+    Args:
+        path (str): path of the cookbook archive
+        working_dir (str): directory to copy the archive to
+        digest_names (list): names of the digests to compute
+        max_members (int): see `CookbookMetadata.from_cookbook_file()`
+        max_bytes (int): see `CookbookMetadata.from_cookbook_file()`
+
+    Returns:
+        dict: "path" of the archive, "file" (path of the copy), "size", "digests"
+            (by name) and "metadata" (dict)
+
+    Raises:
+        ValueError: If the file is not a cookbook archive or its metadata was
+            not found within the given limits
+
+    """
+    hashers = {name: hashlib.new(name) for name in digest_names}
+    size = 0
+    with open(path, "rb") as src, tempfile.NamedTemporaryFile(dir=working_dir, delete=False) as dst:
+        while True:
+            chunk = src.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            for hasher in hashers.values():
+                hasher.update(chunk)
+            dst.write(chunk)
+    try:
+        with open(dst.name, "rb") as fileobj:
+            metadata = CookbookMetadata.from_cookbook_file(
+                fileobj, max_members=max_members, max_bytes=max_bytes
+            )
+    except (EOFError, FileNotFoundError, tarfile.TarError, ValueError) as exc:
+        os.unlink(dst.name)
+        raise ValueError(f"{path}: {str(exc) or 'cookbook metadata not found'}")
+    return {
+        "path": path,
+        "file": dst.name,
+        "size": size,
+        "digests": {name: hasher.hexdigest() for name, hasher in hashers.items()},
+        "metadata": metadata.metadata,
+    }
+
+
+class DirectoryImportFirstStage(Stage):
+    """
+    The first stage of the directory import pipeline.
+
+    Processes the cookbook archives in a process pool (see
+    `process_cookbook_file()`) and emits a DeclarativeContent with an
+    artifact from the local file for each archive as soon as it has been
+    processed.
+
+    Args:
+        paths (list): paths of the cookbook archives
+        processes (int): number of worker processes (None for the number of CPUs)
+
+    """
+
+    def __init__(self, paths, processes=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.paths = paths
+        self.processes = processes
+
+    async def run(self):
+        process = partial(
+            process_cookbook_file,
+            working_dir=os.path.abspath("."),
+            digest_names=list(Artifact.DIGEST_FIELDS),
+            max_members=settings.COOKBOOK_METADATA_MAX_MEMBERS,
+            max_bytes=settings.COOKBOOK_METADATA_MAX_BYTES,
+        )
+        async with ProgressReport(
+            message="Importing Cookbooks", code="importing.cookbooks", total=len(self.paths)
+        ) as pb, ThrottledProgress(pb) as progress:
+            with ProcessPoolExecutor(max_workers=self.processes) as executor:
+                futures = [executor.submit(process, path) for path in self.paths]
+                try:
+                    for future in asyncio.as_completed(map(asyncio.wrap_future, futures)):
+                        result = await future
+                        await self.put(self.declarative_content(result))
+                        await progress.aincrement()
+                except BaseException:
+                    # Do not process the remaining archives if an archive is
+                    # invalid or the pipeline failed or has been cancelled. The
+                    # executor futures are cancelled directly, as leaving the
+                    # executor blocks the event loop until all work is done.
+                    for future in futures:
+                        future.cancel()
+                    raise
+
+    @staticmethod
+    def declarative_content(result):
+        """Create the DeclarativeContent for a result of `process_cookbook_file()`."""
+        metadata = result["metadata"]
+        cookbook = CookbookPackageContent(
+            name=metadata["name"],
+            version=metadata["version"],
+            dependencies=metadata.get("dependencies", {}),
+        )
+        cookbook.set_sha256_digest(result["digests"]["sha256"])
+        artifact = Artifact(file=result["file"], size=result["size"], **result["digests"])
+        da = DeclarativeArtifact(
+            artifact=artifact,
+            url="file://" + result["path"],
+            relative_path=cookbook.relative_path(),
+        )
+        return DeclarativeContent(content=cookbook, d_artifacts=[da])
+
+
+class DirectoryImportDeclarativeVersion(DeclarativeVersion):
+    """Pipeline importing local cookbook archives into a new repository version."""
+
+    def pipeline_stages(self, new_version):
+        return [
+            self.first_stage,
+            QueryExistingArtifacts(),
+            ArtifactSaver(),
+            QueryExistingContents(),
+            ContentSaver(),
+        ]
+
+
+def import_directory(repository_pk, path):
+    """
+    Import all cookbook archives found in a local directory into a new repository version.
+
+    Args:
+        repository_pk (str): The repository PK.
+        path (str): The directory to import from (within ALLOWED_IMPORT_PATHS).
+
+    Raises:
+        ValueError: If an archive is not a valid cookbook archive.
+
+    """
+    repository = CookbookRepository.objects.get(pk=repository_pk)
+    paths = find_cookbook_files(path)
+    log.info(
+        _("Importing %(count)d cookbook archives from %(path)s"),
+        {"count": len(paths), "path": path},
+    )
+    first_stage = DirectoryImportFirstStage(paths, processes=settings.COOKBOOK_IMPORT_PROCESSES)
+    DirectoryImportDeclarativeVersion(first_stage=first_stage, repository=repository).create()
@@ -0,0 +1,207 @@
+# (C) Copyright 2026 Simon Baatz <gmbnomis@gmail.com>
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import asyncio
+import logging
+
+from gettext import gettext as _
+
+from pulpcore.plugin.constants import TASK_STATES
+from pulpcore.plugin.models import ProgressReport
+
+log = logging.getLogger(__name__)
+
+
+class StageMetrics:
+    """
+    The metrics of a stage in an instrumented pipeline.
+
+    Waiting for input is the time the stage spends waiting for the next item
+    (or batch) from `items()` (or `batches()`), waiting for output the time
+    spent in `put()`. The remaining time of the stage is busy. Stages
+    requesting input or putting output while they keep processing (like the
+    `ArtifactDownloader`) may be busy while waiting, i.e. their busy time is a
+    lower bound.
+
+    The depth of the input queue is derived from the number of items the
+    previous stage has put and the stage has taken so far.
+
+    Args:
+        name (str): name of the stage
+        upstream (StageMetrics): the metrics of the previous stage (None if there is none)
+
+    Attributes:
+        taken (int): number of items taken from the input
+        emitted (int): number of items put to the output
+        input_wait (float): seconds spent waiting for input
+        output_wait (float): seconds spent waiting for the output to be accepted
+        duration (float): seconds from the start of the stage until it finished
+        max_depth (int): maximum depth of the input queue when taking input
+
+    """
+
+    def __init__(self, name, upstream=None):
+        self.name = name
+        self.upstream = upstream
+        self.taken = 0
+        self.emitted = 0
+        self.input_wait = 0.0
+        self.output_wait = 0.0
+        self.duration = 0.0
+        self.max_depth = 0
+        self._depth_sum = 0
+        self._depth_samples = 0
+        self._start = None
+
+    def now(self):
+        """Return the current time (and the start time of the stage on the first call)."""
+        now = asyncio.get_event_loop().time()
+        if self._start is None:
+            self._start = now
+        return now
+
+    def finished(self):
+        """Record the duration of the stage up to now."""
+        self.duration = self.now() - self._start
+
+    def record_taken(self, count):
+        """Record that `count` items have been taken from the input."""
+        if self.upstream is not None:
+            depth = self.upstream.emitted - self.taken
+            self._depth_sum += depth
+            self._depth_samples += 1
+            self.max_depth = max(self.max_depth, depth)
+        self.taken += count
+
+    @property
+    def items(self):
+        return self.taken if self.upstream is not None else self.emitted
+
+    @property
+    def mean_depth(self):
+        return self._depth_sum / self._depth_samples if self._depth_samples else 0.0
+
+    @property
+    def busy(self):
+        return max(self.duration - self.input_wait - self.output_wait, 0.0)
+
+    def summary(self):
+        summary = _(
+            "{name}: {items} items in {duration:.1f}s, busy {busy:.1f}s, waiting for input"
+            " {input_wait:.1f}s, waiting for output {output_wait:.1f}s"
+        ).format(
+            name=self.name,
+            items=self.items,
+            duration=self.duration,
+            busy=self.busy,
+            input_wait=self.input_wait,
+            output_wait=self.output_wait,
+        )
+        if self.upstream is not None:
+            summary += _(", input queue depth {mean:.1f} (max {max})").format(
+                mean=self.mean_depth, max=self.max_depth
+            )
+        return summary
+
+
+def instrument(stage, metrics):
+    """
+    Record the metrics of a stage.
+
+    Wraps the `run()`, `items()`, `batches()` and `put()` methods of the stage
+    instance. A stage overriding `__call__` without calling `run()` (like the
+    `EndStage`) is finished when its input is exhausted.
+
+    Args:
+        stage (Stage): the stage to instrument
+        metrics (StageMetrics): the metrics to record
+
+    """
+    run, items, batches, put = stage.run, stage.items, stage.batches, stage.put
+
+    async def measure_input(iterator, size):
+        while True:
+            start = metrics.now()
+            try:
+                item = await iterator.__anext__()
+            except StopAsyncIteration:
+                metrics.input_wait += metrics.now() - start
+                metrics.finished()
+                return
+            metrics.input_wait += metrics.now() - start
+            metrics.record_taken(size(item))
+            yield item
+
+    async def measured_run():
+        metrics.now()
+        try:
+            await run()
+        finally:
+            metrics.finished()
+
+    def measured_items():
+        return measure_input(items(), lambda item: 1)
+
+    def measured_batches(*args, **kwargs):
+        return measure_input(batches(*args, **kwargs), len)
+
+    async def measured_put(item):
+        start = metrics.now()
+        try:
+            await put(item)
+        finally:
+            metrics.output_wait += metrics.now() - start
+        metrics.emitted += 1
+
+    stage.run = measured_run
+    stage.items = measured_items
+    stage.batches = measured_batches
+    stage.put = measured_put
+
+
+class InstrumentedPipeline:
+    """
+    Stages API stages recording metrics for each stage.
+
+    The stages are instrumented in place and run by
+    :func:`~pulpcore.plugin.stages.create_pipeline` (directly or as part of a
+    :class:`~pulpcore.plugin.stages.DeclarativeVersion`). The first stage has
+    no input, i.e. the time it waits for its source (like the universe being
+    downloaded) counts as busy.
+
+    Args:
+        stages (list): the stages to instrument
+
+    Attributes:
+        stages (list): the instrumented stages
+        metrics (list): the :class:`StageMetrics` of each stage
+
+    Raises:
+        ValueError: When a stage instance is specified more than once.
+
+    """
+
+    def __init__(self, stages):
+        if len(set(stages)) != len(stages):
+            raise ValueError(_("Each stage instance must be unique."))
+        self.stages = stages
+        self.metrics = []
+        metrics = None
+        for stage in stages:
+            metrics = StageMetrics(type(stage).__name__, upstream=metrics)
+            instrument(stage, metrics)
+            self.metrics.append(metrics)
+
+    def report(self):
+        """Log the metrics and attach them to the task as progress reports."""
+        for metrics in self.metrics:
+            summary = metrics.summary()
+            log.info(summary)
+            ProgressReport(
+                message=summary,
+                code="sync.pipeline.stage",
+                total=metrics.items,
+                done=metrics.items,
+                state=TASK_STATES.COMPLETED,
+            ).save()
@@ -0,0 +1,67 @@
+# (C) Copyright 2026 Simon Baatz <gmbnomis@gmail.com>
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import time
+
+# Defaults for flushing progress to the ProgressReport: after this number of
+# items or after this number of seconds, whatever comes first
+FLUSH_ITEMS = 1000
+FLUSH_INTERVAL = 0.5
+
+
+class ThrottledProgress:
+    """
+    Throttled progress reporting for hot loops.
+
+    Counts progress locally and updates the wrapped ProgressReport only every
+    `flush_items` items or after `flush_interval` seconds. Use it as an async
+    context manager to flush the remaining progress at the end::
+
+        async with ProgressReport(message="Parsing", code="parsing") as pb:
+            async with ThrottledProgress(pb) as progress:
+                for item in items:
+                    await progress.aincrement()
+
+    Args:
+        progress_report (:class:`~pulpcore.plugin.models.ProgressReport`): the report to update
+        flush_items (int): maximum number of items to count before updating the report
+        flush_interval (float): maximum time in seconds before updating the report
+
+    """
+
+    def __init__(self, progress_report, flush_items=FLUSH_ITEMS, flush_interval=FLUSH_INTERVAL):
+        self.progress_report = progress_report
+        self.flush_items = flush_items
+        self.flush_interval = flush_interval
+        self.pending = 0
+        self._last_flush = time.monotonic()
+
+    def _flush_due(self):
+        return (
+            self.pending >= self.flush_items
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        )
+
+    async def aincrease_by(self, count):
+        """Count `count` processed items."""
+        self.pending += count
+        if self._flush_due():
+            await self.aflush()
+
+    async def aincrement(self):
+        """Count a processed item."""
+        await self.aincrease_by(1)
+
+    async def aflush(self):
+        """Update the progress report with the items counted so far."""
+        if self.pending:
+            pending, self.pending = self.pending, 0
+            await self.progress_report.aincrease_by(pending)
+        self._last_flush = time.monotonic()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aflush()
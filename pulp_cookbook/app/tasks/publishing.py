@@ -71,7 +71,8 @@ def populate(publication, progress_report=None, batch_size=BATCH_SIZE):
     """
     Populate a publication.
 
-    Create published artifacts and yield a Universe Entry for each.
+    Create published artifacts and yield a Universe Entry for each. Entries
+    are ordered by cookbook name.
 
     Args:
         publication (:class:`~pulp_cookbook.models.CookbookPublication`): CookbookPublication
@@ -86,6 +87,7 @@ def populate(publication, progress_report=None, batch_size=BATCH_SIZE):
     """
     content_batches = publication.repository_version.content_batch_qs(
         content_qs=CookbookPackageContent.objects.all(),
+        order_by_params=("name", "pk"),
         batch_size=batch_size,
     )
 
@@ -2,61 +2,132 @@
 #
 # SPDX-License-Identifier: GPL-2.0-or-later
 
+import asyncio
 import logging
 
 from collections import defaultdict
 from gettext import gettext as _
-from urllib.parse import urljoin
+from operator import attrgetter
+from urllib.parse import urljoin, urlparse
+import aiohttp
 from asgiref.sync import sync_to_async
 
-from django.db.models import Prefetch, Q
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Prefetch
 
-from pulpcore.plugin.models import Artifact, ContentArtifact, ProgressReport, Remote
+from pulpcore.plugin.constants import TASK_STATES
+from pulpcore.plugin.models import Artifact, Content, ContentArtifact, ProgressReport, Remote
 from pulpcore.plugin.stages import (
+    EndStage,
     DeclarativeArtifact,
     DeclarativeContent,
     DeclarativeVersion,
     Stage,
     ArtifactDownloader,
     ArtifactSaver,
-    QueryExistingContents,
     RemoteArtifactSaver,
     ContentSaver,
+    create_pipeline,
 )
 
-from pulp_cookbook.app.models import CookbookPackageContent, CookbookRemote, CookbookRepository
-from pulp_cookbook.metadata import Universe
+from pulp_cookbook.app.models import (
+    CookbookDownloadMemo,
+    CookbookPackageContent,
+    CookbookRemote,
+    CookbookRepository,
+    CookbookSyncState,
+)
+from pulp_cookbook.app.repo_key_index import RepoKeyIndex
+from pulp_cookbook.app.repo_version_utils import filter_repo_keys
+from pulp_cookbook.app.tasks.instrumentation import InstrumentedPipeline
+from pulp_cookbook.app.tasks.progress import ThrottledProgress
+from pulp_cookbook.dependencies import UniverseGraph
+from pulp_cookbook.metadata import (
+    REMOVED,
+    KeyedDiff,
+    UniverseFingerprint,
+    UniverseParser,
+    download_key,
+)
+from pulp_cookbook.versions import InvalidConstraint, InvalidVersion, VersionArray
 
 log = logging.getLogger(__name__)
 
+# Number of bytes of the downloaded universe to parse at once.
+UNIVERSE_READ_SIZE = 65536
+
+# Maximum number of entries of a remote buffered in a multi-remote sync while
+# the entries of the remotes taking precedence are emitted.
+REMOTE_ENTRIES_QUEUE_SIZE = 1000
+
 
 class UpdateContentWithDownloadResult(Stage):
     """
-    A stage that sets the content_id (SHA256 from the artifact).
+    A stage that sets the content_id (SHA256 from the artifact) and shares existing content.
 
     Set the content_id to the SHA256 checksum for "unsaved" content or, if
     saved content has no/a different checksum, create a new content instance
     with a SHA256 content_id.
+
+    Content with an artifact that has not been downloaded (deferred download
+    in a sync from several remotes) is left unchanged.
+
+    Then, like :class:`~pulpcore.plugin.stages.QueryExistingContents`, replace
+    "unsaved" content by existing content with the same natural key. The
+    content of a batch is looked up in a single set-based query (see
+    `filter_repo_keys()`) and only content that was found is touched.
     """
 
     async def run(self):
-        async for d_content in self.items():
-            download_sha256 = d_content.d_artifacts[0].artifact.sha256
+        async for batch in self.batches():
+            await sync_to_async(self._process_batch)(batch)
+            for d_content in batch:
+                await self.put(d_content)
+
+    def _process_batch(self, batch):
+        for d_content in batch:
+            artifact = d_content.d_artifacts[0].artifact
+            if artifact._state.adding:
+                continue
+            download_sha256 = artifact.sha256
             if d_content.content._state.adding:
                 d_content.content.set_sha256_digest(download_sha256)
-            else:
-                if d_content.content.content_id != download_sha256:
-                    # To keep previous repository versions untouched, create a
-                    # new content unit instead of modifying the existing
-                    # content.
-                    # To copy multiple inheritance models, we need to set both
-                    # pk and pulp_id to None and, as stages look at _state.adding,
-                    # reset that as well...
-                    d_content.content.pk = None
-                    d_content.content.pulp_id = None
-                    d_content.content._state.adding = True
-                    d_content.content.set_sha256_digest(download_sha256)
-            await self.put(d_content)
+            elif d_content.content.content_id != download_sha256:
+                # To keep previous repository versions untouched, create a
+                # new content unit instead of modifying the existing
+                # content.
+                # To copy multiple inheritance models, we need to set both
+                # pk and pulp_id to None and, as stages look at _state.adding,
+                # reset that as well...
+                d_content.content.pk = None
+                d_content.content.pulp_id = None
+                d_content.content._state.adding = True
+                d_content.content.set_sha256_digest(download_sha256)
+
+        # declarative content by model type and natural key
+        d_c_by_mt_nk = defaultdict(lambda: defaultdict(list))
+        for d_content in batch:
+            content = d_content.content
+            # Content with a deferred artifact has a new random content_id,
+            # i.e. there is no existing content to share
+            if content._state.adding and content.content_id_type == content.SHA256:
+                d_c_by_mt_nk[type(content)][content.natural_key()].append(d_content)
+
+        for model_type, d_c_by_natural_key in d_c_by_mt_nk.items():
+            existing = list(
+                filter_repo_keys(
+                    model_type.objects.all(),
+                    d_c_by_natural_key.keys(),
+                    fields=model_type.natural_key_fields(),
+                )
+            )
+            if not existing:
+                continue
+            model_type.objects.filter(pk__in=[content.pk for content in existing]).touch()
+            for content in existing:
+                for d_content in d_c_by_natural_key[content.natural_key()]:
+                    d_content.content = content
 
 
 class QueryExistingRepoContentAndArtifacts(Stage):
@@ -69,9 +140,9 @@ class QueryExistingRepoContentAndArtifacts(Stage):
 
     This stage inspects any "unsaved" Content unit objects and searches for
     existing saved Content units with the same key. The search is constrained to
-    the content of the given repository version `new_version` and use the query
-    :class:`~pulpcore.plugin.models.Content.repo_q()` and the key
-    :class:`~pulpcore.plugin.models.Content.repo_key_fields`.
+    the content of the given repository version `new_version` and matches the keys
+    :class:`~pulpcore.plugin.models.Content.repo_key_fields` of a batch in a
+    single set-based lookup (see `filter_repo_keys()`).
 
     Any existing Content objects found replace their "unsaved" counterpart in
     the :class:`~pulpcore.plugin.stages.DeclarativeContent` object.
@@ -87,14 +158,25 @@ class QueryExistingRepoContentAndArtifacts(Stage):
     This stage drains all available items from `in_q` and batches everything
     into one large call to the db for efficiency.
 
+    If `index_max_bytes` is set, the content of the repository version is
+    loaded into an in-memory index (see
+    :class:`~pulp_cookbook.app.repo_key_index.RepoKeyIndex`) when the first
+    batch arrives and all batches are matched against the index without further
+    queries. If the index would exceed the memory limit, each batch is queried
+    as described above.
+
     Args: new_version (:class:`~pulpcore.plugin.models.RepositoryVersion`):
         Optional repository version to search content in.
+        index_max_bytes (int): Memory limit for the in-memory index (None
+        disables the index).
 
     """
 
-    def __init__(self, new_version, *args, **kwargs):
+    def __init__(self, new_version, *args, index_max_bytes=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.new_version = new_version
+        self.index_max_bytes = index_max_bytes
+        self._indexes = {}
 
     async def run(self):
         async for batch in self.batches():
@@ -105,24 +187,53 @@ class QueryExistingRepoContentAndArtifacts(Stage):
     def _process_batch(self, batch):
         unsaved_d_cs = [dc for dc in batch if dc.content._state.adding]
 
-        content_q_by_type = defaultdict(lambda: Q(pk=None))
         # declarative_content by model type and repo key
         d_c_by_mt_rk = defaultdict(dict)
 
         for declarative_content in unsaved_d_cs:
             m_type = type(declarative_content.content)
-            unit_q = declarative_content.content.repo_q()
-            content_q_by_type[m_type] = content_q_by_type[m_type] | unit_q
             d_c_by_mt_rk[m_type][declarative_content.content.repo_key_value()] = declarative_content
 
-        for model_type in content_q_by_type:
-            self._associate_model_type(
-                model_type, content_q_by_type[model_type], d_c_by_mt_rk[model_type]
-            )
+        for model_type, d_c_by_repo_key in d_c_by_mt_rk.items():
+            index = self._index(model_type)
+            if index is None:
+                self._associate_model_type(model_type, d_c_by_repo_key)
+            else:
+                self._associate_from_index(index, d_c_by_repo_key)
+
+    def _index(self, model_type):
+        if not self.index_max_bytes:
+            return None
+        try:
+            return self._indexes[model_type]
+        except KeyError:
+            index = RepoKeyIndex.load(model_type, self.new_version, self.index_max_bytes)
+            if index is None:
+                log.info(
+                    _("Content of {} exceeds the index memory limit, querying per batch").format(
+                        model_type.__name__
+                    )
+                )
+            self._indexes[model_type] = index
+            return index
 
-    def _associate_model_type(self, model_type, q, d_c_by_repo_key):
+    @staticmethod
+    def _associate(declarative_content, content, content_artifacts):
+        declarative_content.content = content
+        for relative_path, artifact in content_artifacts:
+            for d_a in declarative_content.d_artifacts:
+                if d_a.relative_path == relative_path:
+                    d_a.artifact = artifact
+
+    def _associate_from_index(self, index, d_c_by_repo_key):
+        for repo_key, declarative_content in d_c_by_repo_key.items():
+            found = index.get(repo_key)
+            if found is not None:
+                self._associate(declarative_content, *found)
+
+    def _associate_model_type(self, model_type, d_c_by_repo_key):
         content_filter = model_type.objects.filter(pk__in=self.new_version.content)
-        content_filter = content_filter.filter(q)
+        content_filter = filter_repo_keys(content_filter, d_c_by_repo_key.keys())
         # prefetch the related ContentArtifact and Artifact objects:
         content_filter = content_filter.prefetch_related(
             Prefetch(
@@ -142,94 +253,801 @@ class QueryExistingRepoContentAndArtifacts(Stage):
             except KeyError:
                 pass
             else:
-                declarative_content.content = content
-                for c_a in content.c_as_with_artifact:
-                    for d_a in declarative_content.d_artifacts:
-                        if d_a.relative_path == c_a.relative_path:
-                            d_a.artifact = c_a.artifact
+                content_artifacts = [
+                    (c_a.relative_path, c_a.artifact) for c_a in content.c_as_with_artifact
+                ]
                 del content.c_as_with_artifact
+                self._associate(declarative_content, content, content_artifacts)
+
+
+class QueryDownloadMemo(Stage):
+    """
+    A stage that attaches known artifacts to content instead of downloading them.
+
+    Looks up the download key (stored in the `extra_data` of each
+    :class:`~pulpcore.plugin.stages.DeclarativeArtifact` by the first stage) of
+    the artifacts to download in the
+    :class:`~pulp_cookbook.app.models.CookbookDownloadMemo`. A known artifact is
+    revalidated with a conditional request using the validators of its
+    download. If it has not been modified, it replaces the unsaved artifact,
+    thus the artifact download stage skips it. Otherwise (or if the
+    revalidation fails), the artifact download stage downloads it.
+
+    Content without known artifacts is passed on right away, content with
+    known artifacts as soon as they have been revalidated. Artifacts left to
+    download (including modified ones) are marked to be recorded by
+    :class:`RecordDownloadMemo`.
+
+    Args:
+        revalidate (bool): If False, known artifacts are attached without
+            revalidating them (for estimating the downloads of a sync).
+        max_concurrent_content (int): The maximum number of content units
+            revalidated at the same time.
+
+    """
+
+    def __init__(self, revalidate=True, max_concurrent_content=200, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.revalidate = revalidate
+        self.max_concurrent_content = max_concurrent_content
+
+    async def run(self):
+        pending = set()
+        batches = self.batches()
+        batch_task = asyncio.ensure_future(batches.__anext__())
+        pending.add(batch_task)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task is not batch_task:
+                        task.result()  # raise exceptions of the revalidation
+                        continue
+                    try:
+                        batch = task.result()
+                    except StopAsyncIteration:
+                        batch_task = None
+                        continue
+                    known = await sync_to_async(self._process_batch)(batch)
+                    for d_content in batch:
+                        to_revalidate = [
+                            (d_artifact, known[d_artifact])
+                            for d_artifact in d_content.d_artifacts
+                            if d_artifact in known
+                        ]
+                        if to_revalidate:
+                            pending.add(
+                                asyncio.ensure_future(
+                                    self._revalidate_content(d_content, to_revalidate)
+                                )
+                            )
+                        else:
+                            await self.put(d_content)
+                if batch_task is not None and batch_task not in pending:
+                    if len(pending) < self.max_concurrent_content:
+                        batch_task = asyncio.ensure_future(batches.__anext__())
+                        pending.add(batch_task)
+        except BaseException:
+            # asyncio.wait does not cancel its tasks when cancelled or failing, we need to do this
+            for future in pending:
+                future.cancel()
+            raise
+
+    def _process_batch(self, batch):
+        """
+        Look up the artifacts to download of a batch in the memo.
+
+        Returns:
+            dict: the CookbookDownloadMemo of each declarative artifact with a
+                known artifact to revalidate
+
+        """
+        d_artifacts_by_key = defaultdict(list)
+        for d_content in batch:
+            for d_artifact in d_content.d_artifacts:
+                key = d_artifact.extra_data.get("download_key")
+                if key and d_artifact.artifact._state.adding and not d_artifact.deferred_download:
+                    d_artifacts_by_key[key].append(d_artifact)
+        known = (
+            CookbookDownloadMemo.objects.filter(key__in=d_artifacts_by_key.keys())
+            .exclude(etag=None, last_modified=None)
+            .select_related("artifact")
+        )
+        to_revalidate = {}
+        for memo in known:
+            for d_artifact in d_artifacts_by_key.pop(memo.key):
+                if self.revalidate:
+                    to_revalidate[d_artifact] = memo
+                else:
+                    d_artifact.artifact = memo.artifact
+        for d_artifacts in d_artifacts_by_key.values():
+            for d_artifact in d_artifacts:
+                d_artifact.extra_data["record_download"] = True
+        return to_revalidate
+
+    async def _revalidate_content(self, d_content, to_revalidate):
+        await asyncio.gather(*(self._revalidate(d_a, memo) for d_a, memo in to_revalidate))
+        await self.put(d_content)
+
+    @staticmethod
+    async def _revalidate(d_artifact, memo):
+        downloader = d_artifact.remote.get_downloader(url=d_artifact.url, **memo.validators())
+        try:
+            modified = await downloader.is_modified()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            log.debug("Revalidating %s failed: %s", d_artifact.url, exc)
+            modified = True
+        if modified:
+            d_artifact.extra_data["record_download"] = True
+        else:
+            d_artifact.artifact = memo.artifact
+
+
+class RecordDownloadMemo(Stage):
+    """
+    A stage that records saved artifacts in the download memo.
+
+    Records the artifacts of the declarative artifacts marked by
+    :class:`QueryDownloadMemo` under their download key, together with the
+    validators of their download. Artifacts downloaded without validators
+    cannot be revalidated, thus they are not recorded.
+    """
+
+    async def run(self):
+        async for batch in self.batches():
+            await sync_to_async(self._process_batch)(batch)
+            for d_content in batch:
+                await self.put(d_content)
+
+    def _process_batch(self, batch):
+        memos = [
+            CookbookDownloadMemo(
+                key=d_artifact.extra_data["download_key"],
+                artifact=d_artifact.artifact,
+                **d_artifact.extra_data["validators"],
+            )
+            for d_content in batch
+            for d_artifact in d_content.d_artifacts
+            if d_artifact.extra_data.get("record_download")
+            and d_artifact.extra_data.get("validators")
+            and not d_artifact.artifact._state.adding
+        ]
+        if memos:
+            # Replace the memos of artifacts modified since they were recorded
+            with transaction.atomic():
+                CookbookDownloadMemo.objects.filter(key__in=[m.key for m in memos]).delete()
+                CookbookDownloadMemo.objects.bulk_create(memos, ignore_conflicts=True)
+
+
+def latest_versions(entries, count):
+    """
+    Select the entries of the latest versions of a cookbook.
+
+    Args:
+        entries (list): the Entry instances of a cookbook
+        count (int): the number of versions to select
+
+    Returns:
+        list: the entries of the `count` latest versions (in the order of `entries`)
+
+    """
+    if len(entries) <= count:
+        return entries
+
+    versions = VersionArray()
+    valid = []
+    invalid = []
+    for index, entry in enumerate(entries):
+        try:
+            versions.append(entry.name, entry.version)
+        except InvalidVersion:
+            invalid.append(index)
+        else:
+            valid.append(index)
+    latest = {valid[i] for indices in versions.latest_indices(count).values() for i in indices}
+    # Invalid versions rank as the oldest
+    latest.update(invalid[: count - len(latest)])
+    return [entry for index, entry in enumerate(entries) if index in latest]
 
 
 class CookbookFirstStage(Stage):
     """The first stage of the pulp_cookbook sync pipeline."""
 
-    def __init__(self, remote, download_artifacts, *args, **kwargs):
+    def __init__(self, remote, universe, download_artifacts, *args, previous=None, **kwargs):
         """
         The first stage of the pulp_cookbook sync pipeline.
 
-        Get the `universe` of the remote repo, parse it and inject a
-        DeclarativeContent instance for each cookbook found.
+        Consume the `universe` of the remote repo while it is downloaded and
+        inject a DeclarativeContent instance for each cookbook found.
+
+        If the fingerprint of the previously synced universe is given, inject
+        DeclarativeContent for new and changed cookbooks only. The keys of
+        changed and removed cookbooks are collected in `replaced_keys`.
 
         Args:
             remote (CookbookRemote): The remote data to be used when syncing
+            universe (UniverseStream): The universe of the remote
+            previous (UniverseFingerprint): Fingerprint of the previously synced
+                universe (optional)
 
         """
         super().__init__(*args, **kwargs)
         self.remote = remote
+        self.universe = universe
         self.download_artifacts = download_artifacts
+        self.previous = previous
+        self.fingerprint = UniverseFingerprint()
+        self.replaced_keys = set()
 
-    async def run(self):
+    async def selected_entries(self, entries):
         """
-        Build and emit `DeclarativeContent` from the Manifest data.
+        Select the universe entries to synchronize.
 
         If a cookbook specifier is set in the remote, cookbooks are filtered
-        using this specifier.
+        using this specifier (by name and version constraint). If the remote
+        syncs dependencies, the dependency closure of the specified cookbooks
+        is selected instead. This needs the complete universe in memory.
+
+        Args:
+            entries (async iterable): the Entry instances of the universe
 
+        Yields:
+            Entry: the selected entries
+
+        """
+        constraints = self.remote.specifier_constraints()
+        if constraints and self.remote.sync_dependencies:
+            graph = UniverseGraph([entry async for entry in entries])
+            for entry in sorted(graph.closure(constraints), key=attrgetter("name")):
+                yield entry
+            return
+        async for entry in entries:
+            if not constraints or (
+                entry.name in constraints and constraints[entry.name].matches(entry.version)
+            ):
+                yield entry
+
+    async def latest_entries(self, entries):
         """
+        Select the latest versions of each cookbook if the remote limits them.
+
+        Expects the versions of a cookbook to be contiguous (as in the universe).
+        Versions are ordered by version number, invalid versions are considered
+        the oldest.
+
+        Args:
+            entries (async iterable): the selected Entry instances
+
+        Yields:
+            Entry: the entries of the `latest_versions` latest versions of each
+                cookbook (in the order of `entries`)
+
+        """
+        count = self.remote.latest_versions
+        if not count:
+            async for entry in entries:
+                yield entry
+            return
+        group = []
+        async for entry in entries:
+            if group and entry.name != group[0].name:
+                for latest in latest_versions(group, count):
+                    yield latest
+                group = []
+            group.append(entry)
+        for latest in latest_versions(group, count):
+            yield latest
+
+    async def changed_entries(self, entries):
+        """
+        Record the fingerprint of the entries and skip entries synced previously.
+
+        The entries are compared with the fingerprint of the previous sync
+        using a :class:`~pulp_cookbook.metadata.KeyedDiff`. Changed entries are
+        emitted right away, new entries once all entries have been compared (a
+        new entry may still appear in the previous fingerprint later).
+
+        Entries seen before in this sync (due to a retried universe download)
+        are skipped as well.
+
+        Args:
+            entries (async iterable): the selected Entry instances
+
+        Yields:
+            Entry: the entries new or changed since the previous sync (all
+                entries if there is no previous sync)
+
+        """
+        if self.previous is None:
+            async for entry in entries:
+                if self.fingerprint.get(entry.name, entry.version) is None:
+                    self.fingerprint.add(entry)
+                    yield entry
+            return
+
+        diff = KeyedDiff()
+        previous_items = self.previous.items()
+        async for entry in entries:
+            if self.fingerprint.get(entry.name, entry.version) is not None:
+                continue
+            item = ((entry.name, entry.version), self.fingerprint.add(entry), entry)
+            for kind, key, old, new in diff.step(next(previous_items, None), item):
+                self.replaced_keys.add(key)
+                yield new
+        for previous_item in previous_items:
+            for kind, key, old, new in diff.step(previous_item, None):
+                self.replaced_keys.add(key)
+                yield new
+        for kind, key, old, new in diff.finish():
+            if kind == REMOVED:
+                self.replaced_keys.add(key)
+            else:
+                yield new
+
+    async def run(self):
+        """Build and emit `DeclarativeContent` from the Manifest data."""
         async with ProgressReport(
-            message="Downloading Metadata", code="downloading.metadata", total=1
-        ) as pb:
-            downloader = self.remote.get_downloader(url=urljoin(self.remote.url + "/", "universe"))
-            result = await downloader.run()
-            await pb.aincrement()
+            message="Parsing Metadata", code="parsing.metadata"
+        ) as pb, ThrottledProgress(pb) as progress:
+            async for entry in self.changed_entries(self.remote_entries()):
+                await progress.aincrement()
+                await self.put(self.declarative_content(entry))
 
-        cookbook_names = self.remote.specifier_cookbook_names()
+    def remote_entries(self):
+        """Return the entries of the universe to synchronize (as async iterator)."""
+        return self.latest_entries(self.selected_entries(self.universe.entries()))
 
-        async with ProgressReport(message="Parsing Metadata", code="parsing.metadata") as pb:
-            universe = Universe(result.path)
-            for entry in universe.read():
-                if cookbook_names and entry.name not in cookbook_names:
-                    continue
-                cookbook = CookbookPackageContent(
-                    name=entry.name, version=entry.version, dependencies=entry.dependencies
-                )
-                artifact = Artifact()
-                da = DeclarativeArtifact(
-                    artifact=artifact,
-                    url=entry.download_url,
-                    relative_path=cookbook.relative_path(),
-                    remote=self.remote,
-                    deferred_download=not self.download_artifacts,
+    def declarative_content(self, entry):
+        """Build the `DeclarativeContent` for a universe entry."""
+        cookbook = CookbookPackageContent(
+            name=entry.name, version=entry.version, dependencies=entry.dependencies
+        )
+        da = DeclarativeArtifact(
+            artifact=Artifact(),
+            url=entry.download_url,
+            relative_path=cookbook.relative_path(),
+            remote=self.remote,
+            extra_data={"download_key": download_key(entry)},
+            deferred_download=not self.download_artifacts,
+        )
+        return DeclarativeContent(content=cookbook, d_artifacts=[da])
+
+
+class MultiRemoteFirstStage(Stage):
+    """
+    The first stage of a sync from several remotes into a single repository version.
+
+    The universes of all remotes are consumed concurrently (each one selected
+    as configured in its remote, see :class:`CookbookFirstStage`). If several
+    remotes provide the same cookbook version, the remote listed first takes
+    precedence. Thus, the entries of a remote are emitted once all remotes
+    listed before it are complete. Until then, up to
+    `REMOTE_ENTRIES_QUEUE_SIZE` entries are buffered and parsing the universe
+    of the remote pauses (its download continues, see :class:`UniverseStream`).
+
+    Args:
+        first_stages (list): a :class:`CookbookFirstStage` for each remote (in
+            order of precedence)
+
+    """
+
+    def __init__(self, first_stages, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.first_stages = first_stages
+
+    async def _read(self, first_stage, queue):
+        try:
+            async for entry in first_stage.remote_entries():
+                await queue.put(entry)
+        except Exception:
+            await queue.put(None)
+            raise
+        await queue.put(None)
+
+    async def run(self):
+        queues = [asyncio.Queue(maxsize=REMOTE_ENTRIES_QUEUE_SIZE) for _ in self.first_stages]
+        readers = [
+            asyncio.ensure_future(self._read(first_stage, queue))
+            for first_stage, queue in zip(self.first_stages, queues)
+        ]
+        emitted = set()
+        try:
+            async with ProgressReport(
+                message="Parsing Metadata", code="parsing.metadata"
+            ) as pb, ThrottledProgress(pb) as progress:
+                for first_stage, queue, reader in zip(self.first_stages, queues, readers):
+                    while True:
+                        entry = await queue.get()
+                        if entry is None:
+                            break
+                        key = (entry.name, entry.version)
+                        if key in emitted:
+                            continue
+                        emitted.add(key)
+                        await progress.aincrement()
+                        await self.put(first_stage.declarative_content(entry))
+                    # Raise the exception of a failed reader
+                    await reader
+        finally:
+            for reader in readers:
+                reader.cancel()
+
+
+class RemoveReplacedContent(Stage):
+    """
+    A stage that removes replaced content in incremental mirror syncs.
+
+    An incremental sync emits new and changed cookbooks only, i.e. a mirror sync
+    cannot remove all content that has not been emitted. Instead, this stage
+    removes the content of cookbooks removed or changed upstream (as collected
+    by the first stage) from the new repository version, unless it has been
+    emitted again.
+
+    Args:
+        new_version (:class:`~pulpcore.plugin.models.RepositoryVersion`): The
+            repository version being created
+        first_stage (CookbookFirstStage): The first stage of the pipeline
+
+    """
+
+    def __init__(self, new_version, first_stage, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.new_version = new_version
+        self.first_stage = first_stage
+
+    async def run(self):
+        emitted = set()
+        async for d_content in self.items():
+            emitted.add(d_content.content.pk)
+            await self.put(d_content)
+        # All items have passed the first stage, thus `replaced_keys` is complete
+        await sync_to_async(self._remove_replaced)(emitted)
+
+    def _remove_replaced(self, emitted):
+        content = CookbookPackageContent.objects.filter(pk__in=self.new_version.content)
+        to_remove = set(
+            filter_repo_keys(content, self.first_stage.replaced_keys).values_list("pk", flat=True)
+        )
+        to_remove -= emitted
+        if to_remove:
+            self.new_version.remove_content(Content.objects.filter(pk__in=to_remove))
+
+
+class SyncPlanStage(Stage):
+    """
+    A stage that counts what a sync would do instead of doing it.
+
+    Expects content that has been matched against the existing content of the
+    repository by :class:`QueryExistingRepoContentAndArtifacts`.
+
+    Attributes:
+        to_add (int): number of cookbooks that are not in the repository yet
+        to_download (int): number of artifacts that would be downloaded
+        existing_pks (set): PKs of existing content present in the remote
+
+    """
+
+    def __init__(self, download_artifacts, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.download_artifacts = download_artifacts
+        self.to_add = 0
+        self.to_download = 0
+        self.existing_pks = set()
+
+    async def run(self):
+        async for d_content in self.items():
+            if d_content.content._state.adding:
+                self.to_add += 1
+            else:
+                self.existing_pks.add(d_content.content.pk)
+            if self.download_artifacts:
+                self.to_download += sum(
+                    1 for d_a in d_content.d_artifacts if d_a.artifact._state.adding
                 )
-                dc = DeclarativeContent(content=cookbook, d_artifacts=[da])
-                await pb.aincrement()
-                await self.put(dc)
+            await self.put(d_content)
 
 
 class CookbookDeclarativeVersion(DeclarativeVersion):
     """Implement pulp_cookbook's stage API pipeline."""
 
-    def __init__(self, download_artifacts, *args, **kwargs):
+    def __init__(self, download_artifacts, *args, incremental_mirror=False, **kwargs):
         self.download_artifacts = download_artifacts
+        self.incremental_mirror = incremental_mirror
+        self.instrumented_pipeline = None
         super().__init__(*args, **kwargs)
 
     def pipeline_stages(self, new_version):
-        pipeline = [self.first_stage, QueryExistingRepoContentAndArtifacts(new_version=new_version)]
+        pipeline = [
+            self.first_stage,
+            QueryExistingRepoContentAndArtifacts(
+                new_version=new_version, index_max_bytes=settings.COOKBOOK_SYNC_INDEX_MAX_BYTES
+            ),
+        ]
         if self.download_artifacts:
             pipeline.extend(
                 [
+                    QueryDownloadMemo(),
                     ArtifactDownloader(),
                     ArtifactSaver(),
-                    UpdateContentWithDownloadResult(),
-                    QueryExistingContents(),  # share content with known digest
+                    RecordDownloadMemo(),
+                    UpdateContentWithDownloadResult(),  # share content with known digest
                 ]
             )
         pipeline.append(ContentSaver())
         pipeline.append(RemoteArtifactSaver())
+        if self.incremental_mirror:
+            pipeline.append(RemoveReplacedContent(new_version, self.first_stage))
+        if settings.COOKBOOK_SYNC_INSTRUMENTATION:
+            self.instrumented_pipeline = InstrumentedPipeline(pipeline)
+            return self.instrumented_pipeline.stages
         return pipeline
 
+    def create(self):
+        """
+        Perform the work, recording per stage metrics if enabled.
+
+        If the `COOKBOOK_SYNC_INSTRUMENTATION` setting is enabled, the stages
+        of :meth:`pipeline_stages` are instrumented by an :class:`InstrumentedPipeline`
+        and the metrics of each stage are attached to the task as progress reports.
+        The stages added by pulpcore (associating the content with the new
+        version) are not instrumented. The time the last stage waits for them
+        is reported as waiting for output.
+
+        Returns: The created RepositoryVersion or None if it represents no change from the latest.
+        """
+        try:
+            return super().create()
+        finally:
+            if self.instrumented_pipeline:
+                self.instrumented_pipeline.report()
+
+
+class UniverseStream:
+    """
+    The universe of a remote, parsed while it is downloaded.
+
+    The universe is downloaded into a file at full speed and parsed from the
+    file as it grows, i.e. a slow consumer of the entries holds up neither the
+    download nor keeps the parsed universe in memory. If a download attempt
+    fails and is retried, the universe is parsed from the start of the new
+    download again, i.e. entries may be yielded more than once. If the entries
+    are not consumed completely (e.g. because the sync failed), the download
+    must be stopped using `close()`.
+
+    Args:
+        downloader (UniverseDownloadMixin): the universe downloader (not started
+            yet, built with `universe=True`)
+
+    Attributes:
+        result (DownloadResult): the result of the download (once done)
+
+    """
+
+    def __init__(self, downloader):
+        self.downloader = downloader
+        self.result = None
+        self._task = None
+
+    async def _download(self):
+        async with ProgressReport(
+            message="Downloading Metadata", code="downloading.metadata", total=1
+        ) as pb:
+            result = await self.downloader.run()
+            await pb.aincrement()
+        return result
+
+    async def start(self):
+        """
+        Start the download and wait until the response of the remote is known.
+
+        Returns:
+            bool: False if the universe has not been modified since the last
+                download
+
+        """
+        self._task = asyncio.ensure_future(self._download())
+        started = asyncio.ensure_future(self.downloader.started.wait())
+        await asyncio.wait({self._task, started}, return_when=asyncio.FIRST_COMPLETED)
+        started.cancel()
+        if self._task.done():
+            self.result = self._task.result()  # raises download errors
+        return not self.downloader.not_modified
+
+    async def _wait_for_data(self):
+        written = asyncio.ensure_future(self.downloader.written.wait())
+        try:
+            await asyncio.wait({self._task, written}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            written.cancel()
+
+    async def entries(self):
+        """
+        Iterate over the universe entries as soon as they have been parsed.
+
+        Raises:
+            Exceptions of the download (after all entries parsed so far have
+            been yielded)
+
+        """
+        path = fp = None
+        parser = UniverseParser()
+        try:
+            while True:
+                self.downloader.written.clear()
+                if self.downloader.path is not None and self.downloader.path != path:
+                    # A new download attempt
+                    if fp is not None:
+                        fp.close()
+                    path = self.downloader.path
+                    fp = open(path, "rb")
+                    parser = UniverseParser()
+                data = fp.read(UNIVERSE_READ_SIZE) if fp is not None else b""
+                if data:
+                    for entry in parser.feed(data):
+                        yield entry
+                elif self._task.done():
+                    break
+                else:
+                    await self._wait_for_data()
+        finally:
+            if fp is not None:
+                fp.close()
+        self.result = await self._task
+        for entry in parser.close():
+            yield entry
+
+    async def close(self):
+        """Stop the download if it is still running."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+async def open_universe(remote, validators):
+    """
+    Start downloading the universe of a remote.
+
+    For HTTP(S) remotes, the request is conditional if validators of a
+    previous download are given.
+
+    Args:
+        remote (CookbookRemote): The remote to download the universe from
+        validators (dict): "etag" and/or "last_modified" of a previous download
+
+    Returns:
+        UniverseStream: the universe being downloaded or None if the universe
+            has not been modified
+
+    """
+    url = urljoin(remote.url + "/", "universe")
+    if urlparse(url).scheme.lower() not in ("http", "https"):
+        validators = {}
+    universe = UniverseStream(remote.get_downloader(url=url, universe=True, **validators))
+    if not await universe.start():
+        return None
+    return universe
+
+
+async def open_universes(remotes):
+    """
+    Start downloading the universes of several remotes concurrently.
+
+    If a download fails, the downloads of the other remotes are stopped.
+
+    Args:
+        remotes (list): The CookbookRemote instances to download the universes from
+
+    Returns:
+        list: a UniverseStream for each remote
+
+    """
+    universes = await asyncio.gather(
+        *(open_universe(remote, {}) for remote in remotes), return_exceptions=True
+    )
+    for universe in universes:
+        if isinstance(universe, BaseException):
+            for other in universes:
+                if isinstance(other, UniverseStream):
+                    await other.close()
+            raise universe
+    return universes
+
+
+def average_artifact_size():
+    """Return the average size of the known cookbook artifacts (None if there are none)."""
+    return ContentArtifact.objects.filter(
+        content__pulp_type=CookbookPackageContent.get_pulp_type(), artifact__isnull=False
+    ).aggregate(size=Avg("artifact__size"))["size"]
+
+
+def plan_sync(remote, repository, mirror):
+    """
+    Report what a sync would do without downloading artifacts or creating a version.
+
+    Runs the first stage, the query for existing content and the download memo
+    lookup of the sync pipeline. Reports the number of cookbooks to add and to remove, the number
+    of artifacts to download and the estimated download size (based on the
+    average size of known cookbook artifacts) as progress reports.
+
+    Args:
+        remote (CookbookRemote): The remote to sync from
+        repository (CookbookRepository): The repository to sync into
+        mirror (bool): True for mirror mode, False for additive
+
+    """
+    download = remote.policy == Remote.IMMEDIATE
+    base_version = repository.latest_version()
+    loop = asyncio.get_event_loop()
+    universe = loop.run_until_complete(open_universe(remote, {}))
+    first_stage = CookbookFirstStage(remote=remote, universe=universe, download_artifacts=download)
+    plan = SyncPlanStage(download_artifacts=download)
+    stages = [
+        first_stage,
+        QueryExistingRepoContentAndArtifacts(
+            new_version=base_version, index_max_bytes=settings.COOKBOOK_SYNC_INDEX_MAX_BYTES
+        ),
+    ]
+    if download:
+        stages.append(QueryDownloadMemo(revalidate=False))
+    stages.extend([plan, EndStage()])
+    try:
+        loop.run_until_complete(create_pipeline(stages))
+    finally:
+        loop.run_until_complete(universe.close())
+
+    to_remove = 0
+    if mirror:
+        existing = CookbookPackageContent.objects.filter(pk__in=base_version.content).count()
+        to_remove = existing - len(plan.existing_pks)
+    download_size = round(plan.to_download * (average_artifact_size() or 0) / 2**20)
+    for message, code, count in (
+        ("Cookbooks to add", "sync.plan.adding.content", plan.to_add),
+        ("Cookbooks to remove", "sync.plan.removing.content", to_remove),
+        ("Artifacts to download", "sync.plan.downloading.artifacts", plan.to_download),
+        ("Estimated download size (MB)", "sync.plan.downloading.size", download_size),
+    ):
+        ProgressReport(
+            message=message, code=code, total=count, done=count, state=TASK_STATES.COMPLETED
+        ).save()
+    log.info(
+        _(
+            "Sync plan: add %(add)d cookbooks, remove %(remove)d cookbooks, "
+            "download %(download)d artifacts (about %(size)d MB)"
+        ),
+        {
+            "add": plan.to_add,
+            "remove": to_remove,
+            "download": plan.to_download,
+            "size": download_size,
+        },
+    )
+
+
+def check_cookbook_specifier(remote):
+    """
+    Check the cookbook specifier of a remote before synchronizing from it.
+
+    Remotes stored before version constraints were validated may contain
+    constraints that cannot be parsed.
+
+    Raises:
+        ValueError: When a version constraint of the specifier is invalid.
+
+    """
+    try:
+        remote.specifier_constraints()
+    except InvalidConstraint as exc:
+        raise ValueError(
+            _("Remote '{name}' has an invalid cookbook specifier: {error}").format(
+                name=remote.name, error=exc
+            )
+        )
+
 
-def synchronize(remote_pk, repository_pk, mirror):
+def synchronize(remote_pk, repository_pk, mirror, dry_run=False):
     """
     Create a new version of the repository that is synchronized with the remote.
 
@@ -237,20 +1055,118 @@ def synchronize(remote_pk, repository_pk, mirror):
         remote_pk (str): The remote PK.
         repository_pk (str): The repository PK.
         mirror (bool): True for mirror mode, False for additive.
+        dry_run (bool): Only report what the sync would do (see `plan_sync()`).
 
     Raises:
-        ValueError: When url is empty.
+        ValueError: When url is empty or the cookbook specifier is invalid.
 
     """
     remote = CookbookRemote.objects.get(pk=remote_pk)
     repository = CookbookRepository.objects.get(pk=repository_pk)
     if not remote.url:
         raise ValueError(_("A remote must have a url specified to synchronize."))
+    check_cookbook_specifier(remote)
+
+    if dry_run:
+        plan_sync(remote, repository, mirror)
+        return
+
+    sync_state = CookbookSyncState.objects.filter(remote=remote, repository=repository).first()
+    if sync_state is not None and sync_state.is_current(mirror):
+        validators = sync_state.validators()
+        previous = sync_state.universe_fingerprint()
+    else:
+        validators = {}
+        previous = None
+    # The download continues while the pipeline runs (in the same event loop)
+    loop = asyncio.get_event_loop()
+    universe = loop.run_until_complete(open_universe(remote, validators))
+    if universe is None:
+        log.info(_("Universe of remote '{}' not modified, nothing to sync").format(remote.name))
+        return
 
     download = remote.policy == Remote.IMMEDIATE  # Interpret policy to download Artifacts or not
 
-    first_stage = CookbookFirstStage(remote=remote, download_artifacts=download)
+    first_stage = CookbookFirstStage(
+        remote=remote,
+        universe=universe,
+        download_artifacts=download,
+        previous=previous,
+    )
+    # An incremental sync does not emit unchanged content, i.e. it must not use
+    # the mirror mode of the pipeline
+    incremental_mirror = mirror and previous is not None
+    dv = CookbookDeclarativeVersion(
+        first_stage=first_stage,
+        repository=repository,
+        mirror=mirror and not incremental_mirror,
+        download_artifacts=download,
+        incremental_mirror=incremental_mirror,
+    )
+    try:
+        dv.create()
+    finally:
+        loop.run_until_complete(universe.close())
+
+    headers = universe.result.headers or {}
+    CookbookSyncState.objects.update_or_create(
+        remote=remote,
+        repository=repository,
+        defaults={
+            "repository_version": repository.latest_version(),
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fingerprint": first_stage.fingerprint.to_bytes(),
+            "mirror": mirror,
+            "remote_last_updated": remote.pulp_last_updated,
+        },
+    )
+
+
+def synchronize_remotes(remote_pks, repository_pk, mirror):
+    """
+    Create a new version of the repository that is synchronized with several remotes.
+
+    The universes of the remotes are downloaded and parsed concurrently and the
+    cookbooks of all remotes are added in a single repository version. If
+    several remotes provide the same cookbook version, the remote listed first
+    takes precedence.
+
+    Args:
+        remote_pks (list): The remote PKs (in order of precedence).
+        repository_pk (str): The repository PK.
+        mirror (bool): True for mirror mode, False for additive.
+
+    Raises:
+        ValueError: When the url or the cookbook specifier of a remote is invalid.
+
+    """
+    remotes = [CookbookRemote.objects.get(pk=pk) for pk in remote_pks]
+    repository = CookbookRepository.objects.get(pk=repository_pk)
+    for remote in remotes:
+        if not remote.url:
+            raise ValueError(
+                _("Remote '{}' must have a url specified to synchronize.").format(remote.name)
+            )
+        check_cookbook_specifier(remote)
+
+    loop = asyncio.get_event_loop()
+    universes = loop.run_until_complete(open_universes(remotes))
+    first_stages = [
+        CookbookFirstStage(
+            remote=remote,
+            universe=universe,
+            download_artifacts=remote.policy == Remote.IMMEDIATE,
+        )
+        for remote, universe in zip(remotes, universes)
+    ]
     dv = CookbookDeclarativeVersion(
-        first_stage=first_stage, repository=repository, mirror=mirror, download_artifacts=download
+        first_stage=MultiRemoteFirstStage(first_stages),
+        repository=repository,
+        mirror=mirror,
+        download_artifacts=any(first_stage.download_artifacts for first_stage in first_stages),
     )
-    dv.create()
+    try:
+        dv.create()
+    finally:
+        loop.run_until_complete(asyncio.gather(*(universe.close() for universe in universes)))
@@ -7,10 +7,7 @@ from rest_framework.decorators import action
 
 from pulpcore.plugin.actions import ModifyRepositoryActionMixin
 
-from pulpcore.plugin.serializers import (
-    AsyncOperationResponseSerializer,
-    RepositorySyncURLSerializer,
-)
+from pulpcore.plugin.serializers import AsyncOperationResponseSerializer
 
 from pulpcore.plugin.tasking import dispatch
 
@@ -34,10 +31,13 @@ from .models import (
     CookbookPublication,
 )
 from .serializers import (
+    CookbookDirectoryImportSerializer,
     CookbookDistributionSerializer,
     CookbookPackageContentSerializer,
     CookbookRemoteSerializer,
+    CookbookRepositoryMultiSyncSerializer,
     CookbookRepositorySerializer,
+    CookbookRepositorySyncURLSerializer,
     CookbookPublicationSerializer,
 )
 
@@ -81,14 +81,15 @@ class CookbookRepositoryViewSet(ModifyRepositoryActionMixin, RepositoryViewSet):
         description="Trigger an asynchronous task to sync cookbook content.",
         responses={202: AsyncOperationResponseSerializer},
     )
-    @action(detail=True, methods=["post"], serializer_class=RepositorySyncURLSerializer)
+    @action(detail=True, methods=["post"], serializer_class=CookbookRepositorySyncURLSerializer)
     def sync(self, request, pk):
         """
         Synchronizes a Cookbook repository.
 
-        The ``repository`` field has to be provided.
+        The ``repository`` field has to be provided. A dry run only reports what
+        the sync would do and does not lock the repository and remote exclusively.
         """
-        serializer = RepositorySyncURLSerializer(
+        serializer = CookbookRepositorySyncURLSerializer(
             data=request.data, context={"request": request, "repository_pk": pk}
         )
         serializer.is_valid(raise_exception=True)
@@ -97,10 +98,71 @@ class CookbookRepositoryViewSet(ModifyRepositoryActionMixin, RepositoryViewSet):
         remote = serializer.validated_data.get("remote", repository.remote)
 
         mirror = serializer.validated_data.get("mirror", False)
+        dry_run = serializer.validated_data.get("dry_run", False)
+        resources = {"shared_resources" if dry_run else "exclusive_resources": [repository, remote]}
         result = dispatch(
             tasks.synchronize,
-            exclusive_resources=[repository, remote],
-            kwargs={"remote_pk": remote.pk, "repository_pk": repository.pk, "mirror": mirror},
+            kwargs={
+                "remote_pk": remote.pk,
+                "repository_pk": repository.pk,
+                "mirror": mirror,
+                "dry_run": dry_run,
+            },
+            **resources,
+        )
+        return OperationPostponedResponse(result, request)
+
+    @extend_schema(
+        description="Trigger an asynchronous task to sync cookbook content from several"
+        " remotes into a single repository version.",
+        responses={202: AsyncOperationResponseSerializer},
+    )
+    @action(detail=True, methods=["post"], serializer_class=CookbookRepositoryMultiSyncSerializer)
+    def sync_remotes(self, request, pk):
+        """
+        Synchronizes a Cookbook repository from several remotes.
+
+        The ``remotes`` field has to be provided. The universes of the remotes
+        are fetched concurrently and a single repository version is created.
+        """
+        serializer = CookbookRepositoryMultiSyncSerializer(
+            data=request.data, context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+
+        repository = self.get_object()
+        remotes = serializer.validated_data["remotes"]
+        result = dispatch(
+            tasks.synchronize_remotes,
+            exclusive_resources=[repository, *remotes],
+            kwargs={
+                "remote_pks": [str(remote.pk) for remote in remotes],
+                "repository_pk": repository.pk,
+                "mirror": serializer.validated_data["mirror"],
+            },
+        )
+        return OperationPostponedResponse(result, request)
+
+    @extend_schema(
+        description="Trigger an asynchronous task to import cookbook archives from a local"
+        " directory.",
+        responses={202: AsyncOperationResponseSerializer},
+    )
+    @action(detail=True, methods=["post"], serializer_class=CookbookDirectoryImportSerializer)
+    def import_directory(self, request, pk):
+        """
+        Imports the cookbook archives of a local directory into a Cookbook repository.
+
+        The ``path`` field has to be provided and must be within ``ALLOWED_IMPORT_PATHS``.
+        """
+        serializer = CookbookDirectoryImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        repository = self.get_object()
+        result = dispatch(
+            tasks.import_directory,
+            exclusive_resources=[repository],
+            kwargs={"repository_pk": repository.pk, "path": serializer.validated_data["path"]},
         )
         return OperationPostponedResponse(result, request)
 
@@ -0,0 +1,161 @@
+# (C) Copyright 2026 Simon Baatz <gmbnomis@gmail.com>
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import asyncio
+
+from urllib.parse import urlsplit
+
+# Bytes added to the size of a download when computing its throughput. Models
+# the fixed cost of a request, such that small downloads do not appear slow.
+REQUEST_OVERHEAD_BYTES = 64 * 1024
+
+# Weight of a new sample in the moving average of the throughput
+THROUGHPUT_SMOOTHING = 0.2
+
+# The limit is decreased if the average throughput per download drops below
+# the best average throughput seen divided by this factor
+THROUGHPUT_TOLERANCE = 2.0
+
+
+class AdaptiveLimiter:
+    """
+    Limits the number of concurrent downloads from a host, adapting the limit.
+
+    Can be used like an `asyncio.Semaphore` (i.e. as an async context manager).
+    The outcome of each download has to be reported using `record_success()`
+    or `record_failure()`.
+
+    The limit follows an additive increase/multiplicative decrease scheme:
+
+    * After a round of successful downloads (as many as the current limit), the
+      limit is increased by one if the average throughput per download is
+      still within `THROUGHPUT_TOLERANCE` of the best average seen, and
+      decreased by one otherwise (more parallel downloads only share the
+      available bandwidth or overload the server).
+    * A failure indicating that the server is overloaded (429 or 5xx response,
+      timeout) halves the limit. Failures of downloads started before the last
+      decrease are ignored, as these downloads ran at the higher limit.
+
+    The `epoch` is incremented on each decrease of the limit. Pass the epoch
+    at the start of a download to `record_failure()`.
+
+    Args:
+        initial (int): initial limit
+        maximum (int): maximum limit
+        minimum (int): minimum limit
+
+    """
+
+    def __init__(self, initial, maximum, minimum=1):
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum)
+        self.limit = min(max(initial, minimum), self.maximum)
+        self.active = 0
+        self.throughput = None
+        self.best_throughput = None
+        self.epoch = 0
+        self._round_successes = 0
+        self._condition = None
+
+    def _get_condition(self):
+        # Created lazily to bind it to the loop the downloads are running in
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self):
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+
+    async def release(self):
+        condition = self._get_condition()
+        async with condition:
+            self.active -= 1
+            condition.notify_all()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.release()
+
+    async def _increase(self):
+        if self.limit < self.maximum:
+            condition = self._get_condition()
+            async with condition:
+                self.limit += 1
+                condition.notify_all()
+        self._round_successes = 0
+
+    def _decrease(self, limit):
+        self.limit = max(limit, self.minimum)
+        self.epoch += 1
+        self._round_successes = 0
+
+    async def record_success(self, duration, size):
+        """
+        Record a successful download.
+
+        Args:
+            duration (float): duration of the download in seconds
+            size (int): number of bytes downloaded
+
+        """
+        throughput = (size + REQUEST_OVERHEAD_BYTES) / max(duration, 1e-6)
+        if self.throughput is None:
+            self.throughput = throughput
+        else:
+            self.throughput += THROUGHPUT_SMOOTHING * (throughput - self.throughput)
+        self.best_throughput = max(self.best_throughput or 0, self.throughput)
+
+        self._round_successes += 1
+        if self._round_successes >= self.limit:
+            if self.throughput * THROUGHPUT_TOLERANCE >= self.best_throughput:
+                await self._increase()
+            else:
+                self._decrease(self.limit - 1)
+
+    async def record_failure(self, epoch=None):
+        """
+        Record a download failure indicating that the server is overloaded.
+
+        Args:
+            epoch (int): the `epoch` when the download started (None to count
+                the failure in any case)
+
+        """
+        if epoch is not None and epoch != self.epoch:
+            return
+        self._decrease(self.limit // 2)
+        # The throughput measured at the higher limit is not achievable
+        self.best_throughput = self.throughput
+
+
+class AdaptiveConcurrency:
+    """
+    Adaptive download concurrency limits per host.
+
+    Args:
+        initial (int): initial limit for each host
+        maximum (int): maximum limit for each host
+
+    """
+
+    def __init__(self, initial, maximum):
+        self.initial = initial
+        self.maximum = maximum
+        self._limiters = {}
+
+    def limiter(self, url):
+        """Return the :class:`AdaptiveLimiter` for the host of a URL."""
+        parts = urlsplit(url)
+        host = (parts.scheme.lower(), parts.netloc.lower())
+        try:
+            return self._limiters[host]
+        except KeyError:
+            limiter = self._limiters[host] = AdaptiveLimiter(self.initial, self.maximum)
+            return limiter
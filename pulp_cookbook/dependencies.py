@@ -0,0 +1,71 @@
+# (C) Copyright 2026 Simon Baatz <gmbnomis@gmail.com>
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+from collections import deque
+
+from pulp_cookbook.versions import InvalidConstraint, parse_constraint
+
+
+def dependency_constraint(text):
+    """
+    Compile the version constraint of a dependency.
+
+    Invalid constraints select all versions, i.e. resolution errs on the side
+    of including too many cookbooks rather than missing one.
+
+    """
+    try:
+        return parse_constraint(text or "")
+    except InvalidConstraint:
+        return parse_constraint("")
+
+
+class UniverseGraph:
+    """
+    In-memory dependency graph of a universe.
+
+    Indexes the universe entries by cookbook name to resolve the transitive
+    dependencies of cookbooks.
+
+    Args:
+        entries (iterable): Entry instances of the universe
+
+    """
+
+    def __init__(self, entries):
+        self._entries_by_name = {}
+        for entry in entries:
+            self._entries_by_name.setdefault(entry.name, []).append(entry)
+
+    def closure(self, roots):
+        """
+        Resolve the dependency closure of the given cookbooks.
+
+        All versions of a root cookbook matching its constraint are selected.
+        For each selected version, all versions of its dependencies matching
+        the dependency constraint are selected as well (transitively).
+
+        Args:
+            roots (dict): VersionConstraint by cookbook name
+
+        Returns:
+            list: the selected Entry instances
+
+        """
+        selected = {}
+        visited = set()
+        pending = deque(roots.items())
+        while pending:
+            name, constraint = pending.popleft()
+            if (name, constraint.text) in visited:
+                continue
+            visited.add((name, constraint.text))
+            for entry in self._entries_by_name.get(name, ()):
+                key = (name, entry.version)
+                if key in selected or not constraint.matches(entry.version):
+                    continue
+                selected[key] = entry
+                for dependency_name, dependency_text in entry.dependencies.items():
+                    pending.append((dependency_name, dependency_constraint(dependency_text)))
+        return list(selected.values())
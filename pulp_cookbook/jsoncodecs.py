@@ -0,0 +1,134 @@
+# (C) Copyright 2026 Simon Baatz <gmbnomis@gmail.com>
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import importlib
+import json
+
+from json.encoder import encode_basestring_ascii
+
+
+class JsonCodec:
+    """
+    JSON codec based on the `json` module of the standard library.
+
+    Attributes:
+        name (str): name of the codec
+        exact (bool): True if `dumps()` returns exactly the same string as
+                      `json.dumps()` with default arguments
+        streaming (bool): True if the codec provides `raw_decode()`, which
+                          is needed to parse documents incrementally
+
+    """
+
+    name = "json"
+    exact = True
+    streaming = True
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+
+    def loads(self, data):
+        """Deserialize `data` (str or bytes)."""
+        return json.loads(data)
+
+    def dumps(self, obj):
+        """Serialize `obj` to a str."""
+        # Fast paths for the most frequent universe values (producing the same
+        # output as json.dumps)
+        if type(obj) is str:
+            return encode_basestring_ascii(obj)
+        if type(obj) is dict and all(type(k) is str and type(v) is str for k, v in obj.items()):
+            return (
+                "{"
+                + ", ".join(
+                    encode_basestring_ascii(k) + ": " + encode_basestring_ascii(v)
+                    for k, v in obj.items()
+                )
+                + "}"
+            )
+        return json.dumps(obj)
+
+    def raw_decode(self, s, idx=0):
+        """Decode the JSON value starting at `s[idx]`, return the value and the end index."""
+        return self._decoder.raw_decode(s, idx)
+
+
+class _ModuleCodec:
+    """Base class for codecs using a third party module."""
+
+    module_name = None
+    exact = False
+    streaming = False
+
+    def __init__(self):
+        self.name = self.module_name
+        self._module = importlib.import_module(self.module_name)
+
+    def loads(self, data):
+        """Deserialize `data` (str or bytes)."""
+        return self._module.loads(data)
+
+
+class OrjsonCodec(_ModuleCodec):
+    """JSON codec based on `orjson`."""
+
+    module_name = "orjson"
+
+    def dumps(self, obj):
+        """Serialize `obj` to a str (compact, non-ASCII characters are not escaped)."""
+        return self._module.dumps(obj).decode("utf-8")
+
+
+class UjsonCodec(_ModuleCodec):
+    """JSON codec based on `ujson`."""
+
+    module_name = "ujson"
+
+    def dumps(self, obj):
+        """Serialize `obj` to a str (compact)."""
+        return self._module.dumps(obj, ensure_ascii=True, escape_forward_slashes=False)
+
+
+# Codec classes in order of preference (fastest first)
+CODEC_CLASSES = (OrjsonCodec, UjsonCodec, JsonCodec)
+
+_available_codecs = None
+
+
+def available_codecs():
+    """
+    Return instances of all codecs that can be used in this environment.
+
+    Returns:
+        list: codec instances in order of preference
+
+    """
+    global _available_codecs
+    if _available_codecs is None:
+        codecs = []
+        for codec_class in CODEC_CLASSES:
+            try:
+                codecs.append(codec_class())
+            except ImportError:
+                pass
+        _available_codecs = codecs
+    return _available_codecs
+
+
+def select_codec(exact=False, streaming=False):
+    """
+    Select the preferred codec fulfilling the given requirements.
+
+    Args:
+        exact (bool): The codec must serialize exactly like `json.dumps()`
+        streaming (bool): The codec must be able to parse documents incrementally
+
+    Returns:
+        codec instance (the standard library codec if no other codec qualifies)
+
+    """
+    for codec in available_codecs():
+        if (codec.exact or not exact) and (codec.streaming or not streaming):
+            return codec
+    raise LookupError("No suitable JSON codec found")  # pragma: no cover
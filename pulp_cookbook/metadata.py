@@ -2,8 +2,25 @@
 #
 # SPDX-License-Identifier: GPL-2.0-or-later
 
-import tarfile
+import codecs
+import hashlib
 import json
+import tarfile
+import zlib
+
+from collections import namedtuple
+from itertools import groupby, zip_longest
+from json.decoder import WHITESPACE
+from operator import attrgetter
+from urllib.parse import urlsplit, urlunsplit
+
+from pulp_cookbook.jsoncodecs import select_codec
+
+CHUNK_SIZE = 65536  # Number of bytes to read from a universe file at once
+
+
+class ArchiveLimitExceeded(ValueError):
+    """Reading a cookbook archive exceeded the given limits."""
 
 
 class CookbookMetadata:
@@ -31,28 +48,59 @@ class CookbookMetadata:
         return self.metadata["dependencies"]
 
     @classmethod
-    def from_cookbook_file(cls, fileobj, name):
+    def from_cookbook_file(cls, fileobj, name=None, max_members=None, max_bytes=None):
         """
         Construct a CookbookMetadata instance from a cookbook tar archive.
 
+        The archive is read as a stream and reading stops as soon as the
+        metadata has been found.
+
         Args:
             fileobj: file object of the cookbook tar archive
             name (str): name of the cookbook ("metadata.json" file
-                        is expected to be in the directoy `<name>`)
+                        is expected to be in the directoy `<name>`). If not
+                        given, the first "metadata.json" file in a top level
+                        directory is used.
+            max_members (int): If given, the maximum number of archive members
+                               to look at
+            max_bytes (int): If given, the maximum number of (uncompressed)
+                             archive bytes to read
 
         Returns:
             CookbookMetadata: Instance containing the extracted metadata
 
+        Raises:
+            FileNotFoundError: If the archive does not contain the metadata
+            ArchiveLimitExceeded: If the metadata was not found within the given limits
+
         """
-        tf = tarfile.open(fileobj=fileobj)
-        for element in tf:
-            if element.isfile() and element.name == name + "/metadata.json":
-                metadata = json.load(tf.extractfile(element))
-                # TODO: check name consistency, raise error
-                return CookbookMetadata(metadata)
+        metadata_path = None if name is None else name + "/metadata.json"
+        with tarfile.open(fileobj=fileobj, mode="r|*") as tf:
+            for member_count, element in enumerate(tf, 1):
+                if max_members is not None and member_count > max_members:
+                    raise ArchiveLimitExceeded(
+                        f"metadata not found within the first {max_members} archive members"
+                    )
+                if max_bytes is not None and element.offset_data + element.size > max_bytes:
+                    raise ArchiveLimitExceeded(
+                        f"metadata not found within the first {max_bytes} archive bytes"
+                    )
+                if not element.isfile():
+                    continue
+                if element.name == metadata_path or (
+                    metadata_path is None and _is_top_level_metadata(element.name)
+                ):
+                    metadata = json.load(tf.extractfile(element))
+                    # TODO: check name consistency, raise error
+                    return CookbookMetadata(metadata)
         raise FileNotFoundError
 
 
+def _is_top_level_metadata(path):
+    directory, _, filename = path.partition("/")
+    return bool(directory) and filename == "metadata.json"
+
+
 class Entry:
     """
     Universe entry: info about a cookbook in the universe file.
@@ -65,6 +113,8 @@ class Entry:
 
     """
 
+    __slots__ = ("name", "version", "download_url", "dependencies")
+
     def __init__(self, name, version, download_url, dependencies):
         self.name = name
         self.version = version
@@ -80,6 +130,209 @@ class Entry:
             "dependencies": self.dependencies,
         }
 
+    def data_json(self, dumps=json.dumps):
+        """
+        Return `data` serialized as JSON without creating the intermediate dict.
+
+        Args:
+            dumps (callable): function to serialize the values with
+
+        """
+        download_url = dumps(self.download_url)
+        return (
+            '{"location_type": "uri", "location_path": '
+            + download_url
+            + ', "download_url": '
+            + download_url
+            + ', "dependencies": '
+            + dumps(self.dependencies)
+            + "}"
+        )
+
+
+def entry_digest(entry):
+    """
+    Compute a digest of the data of a universe entry.
+
+    Entries with the same download URL and dependencies have the same digest.
+
+    Returns:
+        bytes: 16 byte BLAKE2b digest
+
+    """
+    data = json.dumps([entry.download_url, entry.dependencies], sort_keys=True)
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=16).digest()
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonical_url(url):
+    """
+    Return a canonical form of a download URL.
+
+    Scheme and host are lower-cased, a default port, user info and the fragment
+    are removed and an empty path is replaced by "/".
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]"
+    if parts.port is not None and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
+
+
+def download_key(entry):
+    """
+    Compute the key identifying the download of the archive of a universe entry.
+
+    Entries with the same canonical download URL and the same dependencies
+    have the same key, independent of the remote that lists them. If a
+    cookbook is republished under the same URL with changed metadata, the key
+    changes. The archive itself is revalidated with the HTTP validators of its
+    download (see :class:`~pulp_cookbook.app.tasks.synchronizing.QueryDownloadMemo`).
+
+    Returns:
+        str: SHA256 hex digest
+    """
+    data = json.dumps([canonical_url(entry.download_url), entry.dependencies], sort_keys=True)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def cookbook_entries(cookbook_name, cookbook_versions):
+    """
+    Yield the entries of a cookbook.
+
+    Args:
+        cookbook_name (str): name of the cookbook
+        cookbook_versions (dict): universe data of all versions of the cookbook
+
+    Yields: Entry: for each version
+
+    """
+    for cookbook_version, cookbook_meta in cookbook_versions.items():
+        yield Entry(
+            cookbook_name,
+            cookbook_version,
+            cookbook_meta["download_url"],
+            cookbook_meta["dependencies"],
+        )
+
+
+class UniverseParser:
+    """
+    Incremental, event driven parser for universe JSON documents.
+
+    The document is fed in chunks of bytes using `feed()`. As soon as the
+    object describing all versions of a cookbook has been received completely,
+    `feed()` returns the corresponding entries. Thus, only the data of a single
+    cookbook is held in memory, regardless of the size of the universe.
+
+    Args:
+        codec: JSON codec supporting `raw_decode()` (default: preferred
+               streaming codec)
+
+    """
+
+    _START, _MEMBER, _FIRST_MEMBER, _SEPARATOR, _END = range(5)
+
+    def __init__(self, codec=None):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._raw_decode = (codec or select_codec(streaming=True)).raw_decode
+        self._buffer = ""
+        self._pos = 0
+        self._retry_size = 0
+        self._state = self._START
+
+    def feed(self, data):
+        """
+        Feed the next chunk of the universe document to the parser.
+
+        Args:
+            data (bytes): next chunk of the UTF-8 encoded universe document
+
+        Returns:
+            list: Entry instances of all cookbooks completed by this chunk
+
+        """
+        self._buffer = self._buffer[self._pos :] + self._decoder.decode(data)
+        self._pos = 0
+        if len(self._buffer) < self._retry_size:
+            return []
+        return self._parse(final=False)
+
+    def close(self):
+        """
+        Signal the end of the universe document.
+
+        Returns:
+            list: Entry instances of the cookbooks still pending
+
+        Raises:
+            ValueError: If the document is not a valid universe
+
+        """
+        self._buffer = self._buffer[self._pos :] + self._decoder.decode(b"", final=True)
+        self._pos = 0
+        entries = self._parse(final=True)
+        if self._state != self._END or self._buffer[self._pos :].strip():
+            raise ValueError("Universe document is incomplete or has trailing data")
+        return entries
+
+    def _skip_whitespace(self, pos):
+        return WHITESPACE.match(self._buffer, pos).end()
+
+    def _parse(self, final):
+        entries = []
+        buffer = self._buffer
+        while self._state != self._END:
+            pos = self._skip_whitespace(self._pos)
+            if pos == len(buffer):
+                break
+            char = buffer[pos]
+            if self._state == self._START:
+                if char != "{":
+                    raise ValueError("Universe document must be a JSON object")
+                self._pos = pos + 1
+                self._state = self._FIRST_MEMBER
+            elif self._state == self._FIRST_MEMBER and char == "}":
+                self._pos = pos + 1
+                self._state = self._END
+            elif self._state == self._SEPARATOR:
+                if char not in ",}":
+                    raise ValueError(f"Unexpected character {char!r} in universe document")
+                self._pos = pos + 1
+                self._state = self._MEMBER if char == "," else self._END
+            else:
+                try:
+                    name, versions, end = self._decode_member(pos)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    # The member may not have been received completely. Do not
+                    # try again before the buffer has doubled in size to avoid
+                    # re-parsing big members over and over again.
+                    self._retry_size = 2 * (len(buffer) - self._pos)
+                    break
+                entries.extend(cookbook_entries(name, versions))
+                self._pos = end
+                self._retry_size = 0
+                self._state = self._SEPARATOR
+        return entries
+
+    def _decode_member(self, pos):
+        name, pos = self._raw_decode(self._buffer, pos)
+        pos = self._skip_whitespace(pos)
+        if self._buffer[pos : pos + 1] != ":":
+            raise json.JSONDecodeError("Expecting ':' delimiter", self._buffer, pos)
+        pos = self._skip_whitespace(pos + 1)
+        versions, pos = self._raw_decode(self._buffer, pos)
+        if not isinstance(name, str) or not isinstance(versions, dict):
+            raise ValueError(f"Invalid universe entry for cookbook {name!r}")
+        return name, versions, pos
+
 
 class Universe:
     """
@@ -102,38 +355,262 @@ class Universe:
         """
         self.relative_path = relative_path
 
-    def read(self):
+    def read(self, chunk_size=CHUNK_SIZE, incremental=True, codec=None):
         """
         Read the universe file at `relative_path` and yield cookbook entries.
 
+        By default, the file is parsed incrementally: Entries are yielded as
+        soon as all versions of a cookbook have been read. Otherwise, the
+        complete file is parsed at once, which allows to use the fastest
+        available JSON codec at the expense of memory.
+
+        Args:
+            chunk_size (int): Number of bytes to read from the file at once
+            incremental (bool): Whether to parse the file incrementally
+            codec: JSON codec to use (default: preferred codec for the parsing mode)
+
         Yields: Entry: for each cookbook.
 
         """
-        with open(self.relative_path) as fp:
-            universe = json.load(fp)
-        for cookbook_name, cookbook_versions in universe.items():
-            for cookbook_version, cookbook_meta in cookbook_versions.items():
-                yield Entry(
-                    cookbook_name,
-                    cookbook_version,
-                    cookbook_meta["download_url"],
-                    cookbook_meta["dependencies"],
-                )
-
-    def write(self, entries):
+        if not incremental:
+            codec = codec or select_codec()
+            with open(self.relative_path, "rb") as fp:
+                universe = codec.loads(fp.read())
+            for cookbook_name, cookbook_versions in universe.items():
+                yield from cookbook_entries(cookbook_name, cookbook_versions)
+            return
+
+        parser = UniverseParser(codec)
+        with open(self.relative_path, "rb") as fp:
+            for chunk in iter(lambda: fp.read(chunk_size), b""):
+                yield from parser.feed(chunk)
+        yield from parser.close()
+
+    def write(self, entries, codec=None):
         """
         Write the universe JSON file.
 
+        The entries of a cookbook must be contiguous (e.g. by ordering the
+        entries by name). The JSON object of a cookbook is written as soon
+        as all its entries have been received, i.e. only the entries of a
+        single cookbook are held in memory.
+
         Args:
             entries (iterable): The entries to be written.
+            codec: JSON codec to use (default: preferred codec serializing exactly
+                   like `json.dumps()`)
+
+        Raises:
+            ValueError: When the entries of a cookbook are not contiguous
 
         """
-        universe = dict()
-        for entry in entries:
+        dumps = (codec or select_codec(exact=True)).dumps
+        written_names = set()
+        with open(self.relative_path, "w+") as fp:
+            fp.write("{")
+            separator = ""
+            for name, entries_of_name in groupby(entries, key=attrgetter("name")):
+                if name in written_names:
+                    raise ValueError(f"entries of cookbook '{name}' are not contiguous")
+                written_names.add(name)
+                versions = {entry.version: entry.data_json(dumps) for entry in entries_of_name}
+                fp.write(separator)
+                fp.write(dumps(name))
+                fp.write(": {")
+                fp.write(
+                    ", ".join(dumps(version) + ": " + data for version, data in versions.items())
+                )
+                fp.write("}")
+                separator = ", "
+            fp.write("}")
+
+
+class UniverseFingerprint:
+    """
+    Compact fingerprint of a universe.
+
+    Stores the digest (see `entry_digest()`) of each entry by name and version
+    to detect new and changed entries without keeping the complete universe.
+
+    Args:
+        digests (dict): digests (hex str) by version by cookbook name
+
+    """
+
+    def __init__(self, digests=None):
+        self.digests = {} if digests is None else digests
+
+    def __len__(self):
+        return sum(len(versions) for versions in self.digests.values())
+
+    def add(self, entry):
+        """Add an entry, return its digest."""
+        digest = entry_digest(entry).hex()
+        self.digests.setdefault(entry.name, {})[entry.version] = digest
+        return digest
+
+    def get(self, name, version):
+        """Return the digest of a cookbook version (None if not contained)."""
+        return self.digests.get(name, {}).get(version)
+
+    def items(self):
+        """
+        Iterate over the entries as items for :class:`KeyedDiff`.
+
+        Yields:
+            tuple: ((name, version), digest, None) for each entry
+
+        """
+        for name, versions in self.digests.items():
+            for version, digest in versions.items():
+                yield (name, version), digest, None
+
+    def to_bytes(self):
+        """Serialize the fingerprint (compressed)."""
+        return zlib.compress(json.dumps(self.digests, separators=(",", ":")).encode("utf-8"))
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Deserialize a fingerprint serialized with `to_bytes()`."""
+        return cls(json.loads(zlib.decompress(data)))
+
+
+class UniverseChange(namedtuple("UniverseChange", ["kind", "name", "version", "old", "new"])):
+    """
+    Difference between two universes for a cookbook version.
+
+    Attributes:
+        kind (str): ADDED, REMOVED or CHANGED
+        name (str): cookbook name
+        version (str): cookbook version
+        old (Entry): entry in the old universe (None if added)
+        new (Entry): entry in the new universe (None if removed)
+
+    """
+
+    __slots__ = ()
+
+
+ADDED = "added"
+REMOVED = "removed"
+CHANGED = "changed"
+
+
+class KeyedDiff:
+    """
+    Incremental difference between two sequences of keyed, hashed items.
+
+    Both sequences are fed in lockstep using `step()`. Items whose key has not
+    been seen in the other sequence yet are kept pending until their
+    counterpart shows up. Thus, if both sequences are (mostly) in the same
+    order, memory use is proportional to the number of differences, not to the
+    length of the sequences.
+
+    Items are (key, digest, payload) tuples.
+    """
+
+    def __init__(self):
+        self._pending_old = {}
+        self._pending_new = {}
+
+    def step(self, old_item, new_item):
+        """
+        Feed the next item of both sequences.
+
+        Args:
+            old_item (tuple): next item of the old state (None if exhausted)
+            new_item (tuple): next item of the new state (None if exhausted)
+
+        Returns:
+            list: (kind, key, old payload, new payload) for each CHANGED difference
+                detected by these items
+
+        """
+        changes = []
+        if old_item is not None and new_item is not None and old_item[0] == new_item[0]:
+            if old_item[1] != new_item[1]:
+                changes.append((CHANGED, old_item[0], old_item[2], new_item[2]))
+            return changes
+        if old_item is not None:
+            key, digest, payload = old_item
             try:
-                versions = universe[entry.name]
+                new_digest, new_payload = self._pending_new.pop(key)
             except KeyError:
-                universe[entry.name] = versions = dict()
-            versions[entry.version] = entry.data
-        with open(self.relative_path, "w+") as fp:
-            json.dump(universe, fp)
+                self._pending_old[key] = (digest, payload)
+            else:
+                if digest != new_digest:
+                    changes.append((CHANGED, key, payload, new_payload))
+        if new_item is not None:
+            key, digest, payload = new_item
+            try:
+                old_digest, old_payload = self._pending_old.pop(key)
+            except KeyError:
+                self._pending_new[key] = (digest, payload)
+            else:
+                if digest != old_digest:
+                    changes.append((CHANGED, key, old_payload, payload))
+        return changes
+
+    def finish(self):
+        """
+        Signal the end of both sequences.
+
+        Yields:
+            tuple: (kind, key, old payload, new payload) for each REMOVED and
+                ADDED difference
+
+        """
+        for key, (_, payload) in self._pending_old.items():
+            yield REMOVED, key, payload, None
+        for key, (_, payload) in self._pending_new.items():
+            yield ADDED, key, None, payload
+
+
+def diff_keyed(old_items, new_items):
+    """
+    Compute the difference between two sequences of keyed, hashed items.
+
+    Both sequences are walked in lockstep (see :class:`KeyedDiff`).
+
+    Args:
+        old_items (iterable): (key, digest, payload) tuples of the old state
+        new_items (iterable): (key, digest, payload) tuples of the new state
+
+    Yields:
+        tuple: (kind, key, old payload, new payload) for each difference. CHANGED
+            differences are yielded as soon as they are detected, ADDED and
+            REMOVED differences at the end.
+
+    """
+    diff = KeyedDiff()
+    for old_item, new_item in zip_longest(old_items, new_items):
+        yield from diff.step(old_item, new_item)
+    yield from diff.finish()
+
+
+def _keyed_entries(entries):
+    for entry in entries:
+        yield (entry.name, entry.version), entry_digest(entry), entry
+
+
+def diff_universes(old_entries, new_entries):
+    """
+    Compute the difference between two universe snapshots.
+
+    Entries are compared by (name, version) and `entry_digest()`. Both
+    snapshots are consumed as streams (e.g. from `Universe.read()`); memory
+    use is proportional to the number of changes if the snapshots list the
+    cookbooks in (mostly) the same order.
+
+    Args:
+        old_entries (iterable): Entry instances of the old universe
+        new_entries (iterable): Entry instances of the new universe
+
+    Yields:
+        UniverseChange: for each added, removed or changed cookbook version
+
+    """
+    for kind, (name, version), old, new in diff_keyed(
+        _keyed_entries(old_entries), _keyed_entries(new_entries)
+    ):
+        yield UniverseChange(kind, name, version, old, new)
@@ -245,6 +245,47 @@ class SyncCookbookRepoTestCase(unittest.TestCase):
     def test_sync_streamed(self):
         self.do_sync_check("streamed")
 
+    def test_sync_version_constraint(self):
+        """Sync only the cookbook versions matching the version constraint of the remote."""
+        client = api.Client(self.cfg, api.json_handler)
+        repo = client.post(COOKBOOK_REPO_PATH, gen_repo())
+        self.addCleanup(client.delete, repo["pulp_href"])
+
+        body = gen_remote(fixture_u1.url, cookbooks={fixture_u1.example2_name: "~> 2.7.0"})
+        remote = client.post(COOKBOOK_REMOTE_PATH, body)
+        self.addCleanup(client.delete, remote["pulp_href"])
+
+        self.sync_and_inspect_task_report(remote, repo, 3)
+        repo = client.get(repo["pulp_href"])
+        self.verify_counts(repo, 3, 3, 0)
+        self.assertEqual(
+            sorted(cookbook["version"] for cookbook in get_cookbook_content(repo)),
+            ["2.7.0", "2.7.2", "2.7.4"],
+        )
+
+    def test_sync_dry_run(self):
+        """A dry run reports what a sync would do without creating a repository version."""
+        client = api.Client(self.cfg, api.json_handler)
+        repo = client.post(COOKBOOK_REPO_PATH, gen_repo())
+        self.addCleanup(client.delete, repo["pulp_href"])
+
+        body = gen_remote(fixture_u1.url, cookbooks={fixture_u1.example2_name: "~> 2.7.0"})
+        remote = client.post(COOKBOOK_REMOTE_PATH, body)
+        self.addCleanup(client.delete, remote["pulp_href"])
+
+        sync_resp = sync_raw(self.cfg, remote, repo, dry_run=True)
+        tasks = tuple(api.poll_spawned_tasks(self.cfg, sync_resp))
+        self.assertEqual(len(tasks), 1)
+        self.assertEqual(tasks[0]["created_resources"], [])
+        counts = {report["message"]: report["done"] for report in tasks[0]["progress_reports"]}
+        self.assertEqual(counts["Cookbooks to add"], 3)
+        self.assertEqual(counts["Cookbooks to remove"], 0)
+        self.assertEqual(counts["Artifacts to download"], 3)
+        self.assertNotIn("Downloading Artifacts", counts)
+
+        repo = client.get(repo["pulp_href"])
+        self.assertTrue(repo["latest_version_href"].endswith("/versions/0/"))
+
     def test_sync_immediate_immediate(self):
         client = api.Client(self.cfg, api.json_handler)
         self.do_create_repo_and_sync_twice(client, "immediate", "immediate")
@@ -0,0 +1,104 @@
+# (C) Copyright 2026 Simon Baatz <gmbnomis@gmail.com>
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""Benchmarks comparing the available JSON codecs for reading and writing universes."""
+import json
+import os
+import tempfile
+import time
+
+from unittest import TestCase
+
+from pulp_cookbook.jsoncodecs import available_codecs
+from pulp_cookbook.metadata import Universe, cookbook_entries
+
+# Number of universe entries to benchmark with, can be overridden by a comma
+# separated list in the environment
+UNIVERSE_SIZES = [
+    int(size)
+    for size in os.environ.get("COOKBOOK_BENCHMARK_SIZES", "10000,100000,1000000").split(",")
+]
+VERSIONS_PER_COOKBOOK = 20
+
+
+def synthetic_universe(entry_count):
+    """Create a universe dict looking like a Supermarket universe with `entry_count` entries."""
+    universe = {}
+    for i in range(0, entry_count, VERSIONS_PER_COOKBOOK):
+        name = f"cookbook-{i // VERSIONS_PER_COOKBOOK}"
+        universe[name] = {
+            f"{v // 10}.{v % 10}.0": {
+                "location_type": "uri",
+                "location_path": f"https://supermarket.example.com/{name}/{v}/download",
+                "download_url": f"https://supermarket.example.com/{name}/{v}/download",
+                "dependencies": {"apt": ">= 0.0.0", "build-essential": "~> 2.0"} if v % 2 else {},
+            }
+            for v in range(min(VERSIONS_PER_COOKBOOK, entry_count - i))
+        }
+    return universe
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+
+class JsonCodecBenchmark(TestCase):
+    """Compare the JSON codecs on synthetic universes."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "universe")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def report(self, size, operation, codec, timer, note=""):
+        print(f"\n{size:>8} entries {operation:<18} {codec.name:<8} {timer.elapsed:8.3f}s {note}")
+
+    def test_codecs(self):
+        for size in UNIVERSE_SIZES:
+            universe = synthetic_universe(size)
+            expected = json.dumps(universe).encode()
+            with open(self.path, "wb") as fp:
+                fp.write(expected)
+            entries = [
+                entry
+                for name, versions in universe.items()
+                for entry in cookbook_entries(name, versions)
+            ]
+
+            for codec in available_codecs():
+                with Timer() as timer:
+                    self.assertEqual(codec.loads(expected), universe)
+                self.report(size, "loads", codec, timer)
+
+                with Timer() as timer:
+                    dumped = codec.dumps(universe)
+                self.report(size, "dumps", codec, timer, "" if codec.exact else "(not exact)")
+                if codec.exact:
+                    self.assertEqual(dumped.encode(), expected)
+
+                with Timer() as timer:
+                    count = sum(1 for _ in Universe(self.path).read(incremental=False, codec=codec))
+                self.report(size, "read (in memory)", codec, timer)
+                self.assertEqual(count, size)
+
+                if codec.streaming:
+                    with Timer() as timer:
+                        count = sum(1 for _ in Universe(self.path).read(codec=codec))
+                    self.report(size, "read (streaming)", codec, timer)
+                    self.assertEqual(count, size)
+
+                if codec.exact:
+                    out_path = self.path + ".out"
+                    with Timer() as timer:
+                        Universe(out_path).write(entries, codec=codec)
+                    self.report(size, "write", codec, timer)
+                    with open(out_path, "rb") as fp:
+                        self.assertEqual(fp.read(), expected)
@@ -0,0 +1,75 @@
+# (C) Copyright 2026 Simon Baatz <gmbnomis@gmail.com>
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""Benchmarks comparing repo key lookups of existing content in a repository version."""
+import os
+import time
+
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+from django.test import TestCase
+
+from pulp_cookbook.app.models import CookbookPackageContent, CookbookRepository
+from pulp_cookbook.app.repo_version_utils import filter_repo_keys
+
+# Batch sizes to benchmark with, can be overridden by a comma separated list in
+# the environment
+BATCH_SIZES = [
+    int(size)
+    for size in os.environ.get("COOKBOOK_BENCHMARK_BATCH_SIZES", "100,1000,10000").split(",")
+]
+
+
+class RepoKeyLookupBenchmark(TestCase):
+    """Compare OR-chained Q objects with the set-based repo key lookup."""
+
+    @classmethod
+    def setUpTestData(cls):
+        count = max(BATCH_SIZES)
+        CookbookPackageContent.objects.bulk_create(
+            CookbookPackageContent(
+                name=f"cookbook-{i // 10}",
+                version=f"{i % 10}.0.0",
+                content_id_type=CookbookPackageContent.SHA256,
+                content_id=str(i),
+                dependencies={},
+            )
+            for i in range(count)
+        )
+        cls.repository = CookbookRepository.objects.create(name="benchmark")
+        with cls.repository.new_version() as new_version:
+            new_version.add_content(CookbookPackageContent.objects.all())
+        cls.keys = [(f"cookbook-{i // 10}", f"{i % 10}.0.0") for i in range(count)]
+
+    def content(self):
+        return CookbookPackageContent.objects.filter(
+            pk__in=self.repository.latest_version().content
+        )
+
+    def or_chained(self, keys):
+        return self.content().filter(reduce(or_, (Q(name=n, version=v) for n, v in keys)))
+
+    def set_based(self, keys):
+        return filter_repo_keys(self.content(), keys)
+
+    def measure(self, lookup, keys):
+        qs = lookup(keys)
+        sql, params = qs.query.sql_with_params()
+        start = time.perf_counter()
+        count = sum(1 for _ in qs.values_list("pk", flat=True))
+        elapsed = time.perf_counter() - start
+        return count, elapsed, len(sql), len(params)
+
+    def test_lookups(self):
+        for size in BATCH_SIZES:
+            keys = self.keys[:size]
+            for lookup in (self.or_chained, self.set_based):
+                count, elapsed, sql_size, param_count = self.measure(lookup, keys)
+                self.assertEqual(count, size)
+                print(
+                    f"\n{size:>6} keys {lookup.__name__:<11} {elapsed:8.3f}s"
+                    f" statement {sql_size:>8} chars, {param_count:>6} parameters"
+                )
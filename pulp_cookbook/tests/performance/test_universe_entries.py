@@ -0,0 +1,115 @@
+# (C) Copyright 2026 Simon Baatz <gmbnomis@gmail.com>
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""Micro-benchmarks for the universe entry representation."""
+import json
+import os
+import tempfile
+import timeit
+import tracemalloc
+
+from unittest import TestCase
+
+from pulp_cookbook.metadata import Entry, Universe
+
+ENTRY_COUNT = 100000
+
+
+class DictEntry:
+    """The former universe entry implementation (instance `__dict__`, `data` dict) as reference."""
+
+    def __init__(self, name, version, download_url, dependencies):
+        self.name = name
+        self.version = version
+        self.download_url = download_url
+        self.dependencies = dependencies
+
+    @property
+    def data(self):
+        return {
+            "location_type": "uri",
+            "location_path": self.download_url,
+            "download_url": self.download_url,
+            "dependencies": self.dependencies,
+        }
+
+
+def write_with_data_dicts(path, entries):
+    """Write the universe the former way: one `data` dict per entry, then a dict per cookbook."""
+    universe = {}
+    for entry in entries:
+        universe.setdefault(entry.name, {})[entry.version] = entry.data
+    with open(path, "w") as fp:
+        json.dump(universe, fp)
+
+
+def make_entries(entry_class, count=ENTRY_COUNT):
+    dependencies = {"apt": ">= 0.0.0"}
+    return [
+        entry_class(
+            f"cookbook{i // 10}",
+            f"{i % 10}.0.0",
+            f"https://example.com/cookbook{i // 10}/{i % 10}.0.0/download",
+            dependencies,
+        )
+        for i in range(count)
+    ]
+
+
+def measure(func, repeat=3):
+    """
+    Measure calling `func`.
+
+    Returns:
+        tuple: result of `func`, best time in seconds (without tracing), number of memory
+            blocks allocated by `func` and still alive when it returns, and the peak of traced
+            memory in bytes.
+
+    """
+    elapsed = min(timeit.repeat(func, number=1, repeat=repeat))
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = func()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    return result, elapsed, blocks, peak
+
+
+class UniverseEntryBenchmark(TestCase):
+    """Compare the slot based entries with the former dict based entries."""
+
+    def report(self, label, elapsed, blocks, peak):
+        print(
+            f"\n{label}: {elapsed / ENTRY_COUNT * 1e6:.2f} us/entry,"
+            f" {blocks} live blocks, peak {peak / 2**20:.1f} MiB"
+        )
+
+    def test_entry_creation(self):
+        results = {}
+        for entry_class in (DictEntry, Entry):
+            entries, elapsed, blocks, peak = measure(lambda: make_entries(entry_class))
+            self.report(f"create {entry_class.__name__}", elapsed, blocks, peak)
+            results[entry_class] = peak
+            del entries
+        self.assertLess(results[Entry], results[DictEntry])
+
+    def test_universe_write(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "universe")
+            dict_entries = make_entries(DictEntry)
+            _, elapsed, blocks, dict_peak = measure(
+                lambda: write_with_data_dicts(path, dict_entries)
+            )
+            self.report("write DictEntry (former writer)", elapsed, blocks, dict_peak)
+            with open(path, "rb") as fp:
+                expected = fp.read()
+
+            entries = make_entries(Entry)
+            _, elapsed, blocks, peak = measure(lambda: Universe(path).write(entries))
+            self.report("write Entry", elapsed, blocks, peak)
+            with open(path, "rb") as fp:
+                self.assertEqual(fp.read(), expected)
+        self.assertLess(peak, dict_peak)
@@ -0,0 +1,100 @@
+# (C) Copyright 2026 Simon Baatz <gmbnomis@gmail.com>
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""Benchmarks comparing the queries to share existing content after downloading cookbooks."""
+import os
+import time
+
+from functools import reduce
+from operator import or_
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from pulpcore.plugin.models import Artifact
+from pulpcore.plugin.stages import DeclarativeArtifact, DeclarativeContent
+
+from pulp_cookbook.app.models import CookbookPackageContent, CookbookRemote
+from pulp_cookbook.app.tasks.synchronizing import UpdateContentWithDownloadResult
+
+# Number of downloaded cookbooks to benchmark with
+COUNT = int(os.environ.get("COOKBOOK_BENCHMARK_DOWNLOADED", "1000"))
+
+# Batch size of the stages API
+BATCH_SIZE = 500
+
+
+class UpdateContentBenchmark(TestCase):
+    """
+    Compare the per item stage followed by QueryExistingContents with the batch stage.
+
+    Benchmarks a sync of new cookbooks only and a sync where half of the
+    downloaded cookbooks exist in Pulp already (with the same digest).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.remote = CookbookRemote.objects.create(name="benchmark")
+        CookbookPackageContent.objects.bulk_create(
+            CookbookPackageContent(
+                name=f"cookbook-{i}",
+                version="1.0.0",
+                content_id_type=CookbookPackageContent.SHA256,
+                content_id=f"{i:064x}",
+                dependencies={},
+            )
+            for i in range(0, COUNT, 2)
+        )
+
+    def batches(self, prefix):
+        batch = []
+        for i in range(COUNT):
+            content = CookbookPackageContent(name=f"{prefix}-{i}", version="1.0.0", dependencies={})
+            artifact = Artifact(sha256=f"{i:064x}")
+            artifact._state.adding = False
+            d_artifact = DeclarativeArtifact(
+                artifact=artifact,
+                url=f"http://example.com/{i}",
+                relative_path=content.relative_path(),
+                remote=self.remote,
+            )
+            batch.append(DeclarativeContent(content=content, d_artifacts=[d_artifact]))
+            if len(batch) == BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def per_item(self, batch):
+        """Set the digests item by item, then issue the queries of QueryExistingContents."""
+        for d_content in batch:
+            d_content.content.set_sha256_digest(d_content.d_artifacts[0].artifact.sha256)
+        content_q = reduce(or_, (d_content.content.q() for d_content in batch))
+        CookbookPackageContent.objects.filter(content_q).touch()
+        by_natural_key = {d_content.content.natural_key(): d_content for d_content in batch}
+        for result in CookbookPackageContent.objects.filter(content_q).iterator():
+            by_natural_key[result.natural_key()].content = result
+
+    def batched(self, batch):
+        UpdateContentWithDownloadResult()._process_batch(batch)
+
+    def test_share_existing_content(self):
+        for prefix, expected_shared in (("new", 0), ("cookbook", (COUNT + 1) // 2)):
+            for process in (self.per_item, self.batched):
+                shared = 0
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    for batch in self.batches(prefix):
+                        process(batch)
+                        shared += sum(
+                            1 for d_content in batch if not d_content.content._state.adding
+                        )
+                    elapsed = time.perf_counter() - start
+                self.assertEqual(shared, expected_shared)
+                sql_size = sum(len(query["sql"]) for query in queries.captured_queries)
+                print(
+                    f"\n{COUNT:>6} cookbooks ({shared:>5} existing) {process.__name__:<8}"
+                    f" {elapsed:8.3f}s {len(queries):>4} queries, {sql_size:>9} chars of SQL"
+                )
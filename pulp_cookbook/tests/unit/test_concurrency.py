@@ -0,0 +1,264 @@
+# (C) Copyright 2026 Simon Baatz <gmbnomis@gmail.com>
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import asyncio
+
+from functools import partial
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+import backoff
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from pulp_cookbook.app.downloaders import AdaptiveDownloaderFactory, AdaptiveHttpDownloader
+from pulp_cookbook.app.models import CookbookRemote
+from pulp_cookbook.concurrency import AdaptiveConcurrency, AdaptiveLimiter
+from pulp_cookbook.metadata import Entry
+from pulp_cookbook.tests.unit.test_downloaders import (
+    DownloaderTestCase,
+    UniverseStub,
+    universe_document,
+)
+
+
+class ThrottlingStub:
+    """
+    A local HTTP server simulating an upstream with limited capacity.
+
+    Responds with "429 Too Many Requests" if more than `capacity` requests are
+    in progress. Each request takes `delay` seconds. The first requests of a
+    path can be answered by the statuses listed for it in `responses` instead
+    (or time out for `TIMEOUT`). The requested paths are logged in `requests`.
+    """
+
+    TIMEOUT = "timeout"
+
+    def __init__(self, capacity, delay=0.01, responses=None):
+        self.capacity = capacity
+        self.delay = delay
+        self.responses = responses or {}
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self.throttled = 0
+
+    async def handle(self, request):
+        name = request.match_info["name"]
+        self.requests.append(name)
+        statuses = self.responses.get(name)
+        if statuses:
+            status = statuses.pop(0)
+            await asyncio.sleep(10 if status == self.TIMEOUT else self.delay)
+            return web.Response(status=status)
+        if self.active >= self.capacity:
+            self.throttled += 1
+            return web.Response(status=429)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            return web.Response(body=b"x" * 1024)
+        finally:
+            self.active -= 1
+
+    def server(self):
+        app = web.Application()
+        app.router.add_get("/{name}", self.handle)
+        return TestServer(app)
+
+
+class AdaptiveLimiterTestCase(IsolatedAsyncioTestCase):
+    """Verify the adaptation of the concurrency limit."""
+
+    async def test_increase_while_throughput_holds(self):
+        limiter = AdaptiveLimiter(initial=2, maximum=4)
+        for _ in range(2):
+            await limiter.record_success(1.0, 10**6)
+        self.assertEqual(limiter.limit, 3)
+        for _ in range(20):
+            await limiter.record_success(1.0, 10**6)
+        self.assertEqual(limiter.limit, 4)
+
+    async def test_decrease_if_throughput_drops(self):
+        limiter = AdaptiveLimiter(initial=4, maximum=8)
+        await limiter.record_success(1.0, 10**7)
+        for _ in range(20):
+            await limiter.record_success(10.0, 10**6)
+        self.assertLess(limiter.limit, 4)
+
+    async def test_halve_on_failure(self):
+        limiter = AdaptiveLimiter(initial=8, maximum=8)
+        epoch = limiter.epoch
+        await limiter.record_failure(epoch)
+        self.assertEqual(limiter.limit, 4)
+        # Downloads started before the decrease ran at the higher limit
+        await limiter.record_failure(epoch)
+        self.assertEqual(limiter.limit, 4)
+        await limiter.record_failure(limiter.epoch)
+        self.assertEqual(limiter.limit, 2)
+        for _ in range(3):
+            await limiter.record_failure()
+        self.assertEqual(limiter.limit, 1)
+
+    async def test_limits_concurrency(self):
+        limiter = AdaptiveLimiter(initial=2, maximum=2)
+        running = []
+
+        async def task():
+            async with limiter:
+                running.append(limiter.active)
+                await asyncio.sleep(0)
+
+        await asyncio.gather(*(task() for _ in range(10)))
+        self.assertEqual(max(running), 2)
+
+    async def test_waiters_resume_on_increase(self):
+        limiter = AdaptiveLimiter(initial=1, maximum=2)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        self.assertFalse(waiter.done())
+        await limiter.record_success(1.0, 10**6)
+        await asyncio.wait_for(waiter, 1)
+        self.assertEqual(limiter.active, 2)
+
+    def test_limiter_per_host(self):
+        concurrency = AdaptiveConcurrency(initial=2, maximum=4)
+        limiter = concurrency.limiter("https://Example.com/c1")
+        self.assertIs(concurrency.limiter("https://example.com/c2"), limiter)
+        self.assertIsNot(concurrency.limiter("https://other.example.com/c1"), limiter)
+
+
+class ThrottlingUpstreamTestCase(DownloaderTestCase):
+    """
+    Verify the adaptation of the artifact downloads against a local upstream.
+
+    The downloads run through the downloaders of an :class:`AdaptiveDownloaderFactory`.
+    Retries do not wait.
+    """
+
+    def setUp(self):
+        super().setUp()
+        wait = patch("backoff.expo", partial(backoff.constant, interval=0))
+        wait.start()
+        self.addCleanup(wait.stop)
+
+    def factory(self, initial, maximum, max_retries=1, total_timeout=None):
+        remote = CookbookRemote(
+            name="remote",
+            url="http://example.com",
+            download_concurrency=initial,
+            max_retries=max_retries,
+            total_timeout=total_timeout,
+        )
+        factory = AdaptiveDownloaderFactory(remote, maximum)
+        self.addAsyncCleanup(factory._session.close)
+        return factory
+
+    @staticmethod
+    def limiter(factory):
+        """Return the limiter of the only host downloaded from."""
+        (limiter,) = factory._concurrency._limiters.values()
+        return limiter
+
+    async def download_all(self, stub, factory, names):
+        """
+        Download `names` from `stub` concurrently.
+
+        Returns:
+            list: the result or exception of each download
+
+        """
+        async with stub.server() as server:
+            downloaders = [factory.build(str(server.make_url(f"/{name}"))) for name in names]
+            return await asyncio.gather(
+                *(downloader.run() for downloader in downloaders), return_exceptions=True
+            )
+
+    async def test_failure_classification(self):
+        for status, limit in (
+            (429, 4),
+            (503, 4),
+            (ThrottlingStub.TIMEOUT, 4),
+            (404, 8),
+        ):
+            with self.subTest(status=status):
+                # A failed download is retried once
+                stub = ThrottlingStub(capacity=10, responses={"c1": [status]})
+                factory = self.factory(initial=8, maximum=8, total_timeout=0.5)
+                (result,) = await self.download_all(stub, factory, ["c1"])
+                self.assertEqual(isinstance(result, Exception), status == 404)
+                limiter = self.limiter(factory)
+                self.assertEqual(limiter.limit, limit)
+                self.assertEqual(limiter.active, 0)
+
+    async def test_success(self):
+        stub = ThrottlingStub(capacity=10)
+        factory = self.factory(initial=1, maximum=2)
+        (result,) = await self.download_all(stub, factory, ["c1"])
+        self.assertEqual(result.artifact_attributes["size"], 1024)
+        self.assertEqual(self.limiter(factory).limit, 2)
+
+    async def test_failures_of_one_epoch(self):
+        """Concurrent failures of downloads started at the same limit halve it once."""
+        names = [f"c{i}" for i in range(8)]
+        stub = ThrottlingStub(capacity=10, responses={name: [503, 503] for name in names})
+        factory = self.factory(initial=8, maximum=8)
+        results = await self.download_all(stub, factory, names)
+        self.assertTrue(all(isinstance(result, Exception) for result in results))
+        # Once for the first attempts, once for the retries
+        self.assertEqual(self.limiter(factory).limit, 2)
+
+    async def test_retries_hold_limiter(self):
+        stub = ThrottlingStub(capacity=10, responses={"c1": [503, 503]})
+        factory = self.factory(initial=1, maximum=1, max_retries=2)
+        results = await self.download_all(stub, factory, ["c1", "c2"])
+        self.assertFalse(any(isinstance(result, Exception) for result in results))
+        # c2 waits for the retries of c1 to complete
+        self.assertEqual(stub.requests, ["c1", "c1", "c1", "c2"])
+
+    async def test_limiter_per_host(self):
+        factory = self.factory(initial=2, maximum=4)
+        downloader = factory.build("http://example.com/c1")
+        self.assertIsInstance(downloader, AdaptiveHttpDownloader)
+        self.assertIs(downloader.semaphore, factory._concurrency.limiter("http://example.com/c2"))
+        self.assertIsNot(
+            factory.build("http://other.example.com/c1").semaphore, downloader.semaphore
+        )
+
+    async def test_universe_download(self):
+        """The universe download neither takes a slot of its host nor adapts the limit."""
+        stub = UniverseStub(universe_document([Entry("c1", "1.0.0", "http://c1", {})]))
+        factory = self.factory(initial=1, maximum=1)
+        async with stub.server() as server:
+            url = str(server.make_url("/universe"))
+            limiter = factory._concurrency.limiter(url)
+            await limiter.acquire()
+            downloader = factory.build(url, universe=True)
+            self.assertNotIsInstance(downloader.semaphore, AdaptiveLimiter)
+            result = await asyncio.wait_for(downloader.run(), timeout=5)
+        with open(result.path, "rb") as fp:
+            self.assertEqual(fp.read(), stub.body)
+        self.assertIsNone(limiter.throughput)
+
+    async def test_shrinks_to_capacity(self):
+        stub = ThrottlingStub(capacity=3)
+        factory = self.factory(initial=16, maximum=16, max_retries=100)
+        results = await self.download_all(stub, factory, [f"c{i}" for i in range(200)])
+        self.assertFalse(any(isinstance(result, Exception) for result in results))
+        self.assertGreater(stub.throttled, 0)
+        self.assertLess(stub.throttled, 100)
+        # The limit keeps probing for more capacity, i.e. oscillates around it.
+        # Retries hold their slot, thus a round may complete above the capacity.
+        self.assertLessEqual(self.limiter(factory).limit, stub.capacity + 2)
+
+    async def test_grows_without_throttling(self):
+        stub = ThrottlingStub(capacity=100, delay=0.05)
+        factory = self.factory(initial=1, maximum=8)
+        results = await self.download_all(stub, factory, [f"c{i}" for i in range(100)])
+        self.assertFalse(any(isinstance(result, Exception) for result in results))
+        self.assertEqual(stub.throttled, 0)
+        self.assertEqual(stub.max_active, 8)
@@ -0,0 +1,49 @@
+# (C) Copyright 2026 Simon Baatz <gmbnomis@gmail.com>
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+from unittest import TestCase
+
+from pulp_cookbook.dependencies import UniverseGraph
+from pulp_cookbook.metadata import Entry
+from pulp_cookbook.versions import parse_constraint
+
+
+class UniverseGraphTestCase(TestCase):
+    """Verify the dependency closure computation."""
+
+    def setUp(self):
+        entries = [
+            Entry("app", "1.0.0", "u", {"db": "~> 1.0", "web": ">= 2.0"}),
+            Entry("app", "2.0.0", "u", {"db": "~> 2.0"}),
+            Entry("db", "1.0.0", "u", {}),
+            Entry("db", "1.5.0", "u", {"os": ""}),
+            Entry("db", "2.0.0", "u", {}),
+            Entry("web", "1.0.0", "u", {}),
+            Entry("web", "2.1.0", "u", {"app": "= 1.0.0", "os": "invalid"}),
+            Entry("os", "1.0.0", "u", {}),
+            Entry("os", "2.0.0", "u", {}),
+            Entry("unrelated", "1.0.0", "u", {}),
+        ]
+        self.graph = UniverseGraph(entries)
+
+    def closure(self, roots):
+        constraints = {name: parse_constraint(c) for name, c in roots.items()}
+        return sorted((e.name, e.version) for e in self.graph.closure(constraints))
+
+    def test_closure(self):
+        self.assertEqual(
+            self.closure({"app": "1.0.0"}),
+            [
+                ("app", "1.0.0"),
+                ("db", "1.0.0"),
+                ("db", "1.5.0"),
+                ("os", "1.0.0"),
+                ("os", "2.0.0"),
+                ("web", "2.1.0"),
+            ],
+        )
+        self.assertEqual(self.closure({"app": "~> 2.0"}), [("app", "2.0.0"), ("db", "2.0.0")])
+
+    def test_unknown_root(self):
+        self.assertEqual(self.closure({"missing": ""}), [])
@@ -0,0 +1,287 @@
+# (C) Copyright 2026 Simon Baatz <gmbnomis@gmail.com>
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import asyncio
+import json
+import os
+import tempfile
+
+from functools import partial
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, patch
+
+import aiohttp
+import backoff
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from pulp_cookbook.app.downloaders import (
+    CookbookDownloaderFactory,
+    CookbookHttpDownloader,
+)
+from pulp_cookbook.app.models import CookbookRemote
+from pulp_cookbook.app.tasks.synchronizing import UniverseStream
+from pulp_cookbook.metadata import Entry
+
+
+# Retry without waiting
+partial_constant = partial(backoff.constant, interval=0)
+
+
+def universe_document(entries):
+    """Return the universe listing `entries` as JSON document (bytes)."""
+    universe = {}
+    for entry in entries:
+        universe.setdefault(entry.name, {})[entry.version] = entry.data
+    return json.dumps(universe).encode("utf-8")
+
+
+class UniverseStub:
+    """
+    A local HTTP server serving a universe document.
+
+    Answers conditional requests matching its validators with "304 Not
+    Modified". The document is sent in chunks of `chunk_size` bytes, pausing
+    `delay` seconds after each chunk. A `status` other than 200 is returned
+    instead of the document.
+    """
+
+    ETAG = '"1"'
+    LAST_MODIFIED = "Wed, 21 Oct 2015 07:28:00 GMT"
+
+    def __init__(self, body, status=200, chunk_size=None, delay=0):
+        self.body = body
+        self.status = status
+        self.chunk_size = chunk_size or max(len(body), 1)
+        self.delay = delay
+        self.requests = []
+
+    async def handle(self, request):
+        self.requests.append(request.headers)
+        if self.status != 200:
+            return web.Response(status=self.status)
+        headers = {"ETag": self.ETAG, "Last-Modified": self.LAST_MODIFIED}
+        if (
+            request.headers.get("If-None-Match") == self.ETAG
+            or request.headers.get("If-Modified-Since") == self.LAST_MODIFIED
+        ):
+            return web.Response(status=304, headers=headers)
+        response = web.StreamResponse(headers=headers)
+        await response.prepare(request)
+        for pos in range(0, len(self.body), self.chunk_size):
+            await response.write(self.body[pos : pos + self.chunk_size])
+            await asyncio.sleep(self.delay)
+        await response.write_eof()
+        return response
+
+    def server(self):
+        app = web.Application()
+        app.router.add_get("/universe", self.handle)
+        return TestServer(app)
+
+
+class DownloaderTestCase(IsolatedAsyncioTestCase):
+    """Run downloaders in a temporary working directory (they write to the current one)."""
+
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+
+class CookbookHttpDownloaderTestCase(DownloaderTestCase):
+    """Verify the conditional universe download."""
+
+    entries = [Entry("c1", "1.0.0", "http://c1", {}), Entry("c2", "1.0.0", "http://c2", {})]
+
+    async def download(self, stub, **validators):
+        async with stub.server() as server, aiohttp.ClientSession() as session:
+            downloader = CookbookHttpDownloader(
+                str(server.make_url("/universe")), session=session, universe=True, **validators
+            )
+            result = await downloader.run()
+        return downloader, result
+
+    async def test_conditional_headers(self):
+        stub = UniverseStub(universe_document(self.entries))
+        await self.download(stub, etag='"0"', last_modified="Tue, 20 Oct 2015 07:28:00 GMT")
+        (headers,) = stub.requests
+        self.assertEqual(headers["If-None-Match"], '"0"')
+        self.assertEqual(headers["If-Modified-Since"], "Tue, 20 Oct 2015 07:28:00 GMT")
+
+        await self.download(stub)
+        self.assertNotIn("If-None-Match", stub.requests[1])
+        self.assertNotIn("If-Modified-Since", stub.requests[1])
+
+    async def test_not_modified(self):
+        stub = UniverseStub(universe_document(self.entries))
+        downloader, result = await self.download(stub, etag=UniverseStub.ETAG)
+        self.assertTrue(downloader.not_modified)
+        self.assertFalse(downloader.started.is_set())
+        self.assertIsNone(result.path)
+        self.assertEqual(result.headers["ETag"], UniverseStub.ETAG)
+
+    async def test_modified(self):
+        stub = UniverseStub(universe_document(self.entries))
+        downloader, result = await self.download(stub, etag='"0"')
+        self.assertFalse(downloader.not_modified)
+        self.assertTrue(downloader.started.is_set())
+        self.assertTrue(downloader.written.is_set())
+        self.assertEqual(result.headers["ETag"], UniverseStub.ETAG)
+        with open(result.path, "rb") as fp:
+            self.assertEqual(fp.read(), stub.body)
+
+
+class UniverseStreamTestCase(DownloaderTestCase):
+    """Verify consuming the universe while it is downloaded."""
+
+    entries = [
+        Entry(f"c{i}", f"1.{j}.0", f"http://c{i}/{j}", {"c0": ">= 1.0"} if j else {})
+        for i in range(50)
+        for j in range(3)
+    ]
+
+    def setUp(self):
+        super().setUp()
+        progress_report = patch("pulp_cookbook.app.tasks.synchronizing.ProgressReport")
+        progress_report.start().return_value.__aenter__.return_value = AsyncMock()
+        self.addCleanup(progress_report.stop)
+
+    async def asyncSetUp(self):
+        self.session = aiohttp.ClientSession()
+
+    async def asyncTearDown(self):
+        await self.session.close()
+
+    def stream(self, server, session=None):
+        downloader = CookbookHttpDownloader(
+            str(server.make_url("/universe")), session=session or self.session, universe=True
+        )
+        return UniverseStream(downloader)
+
+    async def test_order_across_chunks(self):
+        stub = UniverseStub(universe_document(self.entries), chunk_size=7)
+        async with stub.server() as server:
+            stream = self.stream(server)
+            self.assertTrue(await stream.start())
+            entries = [entry async for entry in stream.entries()]
+        self.assertEqual(
+            [(e.name, e.version, e.download_url, e.dependencies) for e in entries],
+            [(e.name, e.version, e.download_url, e.dependencies) for e in self.entries],
+        )
+        self.assertEqual(stream.result.headers["ETag"], UniverseStub.ETAG)
+
+    async def test_parse_error(self):
+        valid = universe_document(self.entries[:1])[:-1]
+        stub = UniverseStub(
+            valid + b', "c1": {"1.0.0": invalid}}', chunk_size=len(valid), delay=0.1
+        )
+        entries = []
+        async with stub.server() as server:
+            stream = self.stream(server)
+            await stream.start()
+            with self.assertRaises(ValueError):
+                async for entry in stream.entries():
+                    entries.append(entry)
+        self.assertEqual([(e.name, e.version) for e in entries], [("c0", "1.0.0")])
+
+    async def test_download_failure(self):
+        stub = UniverseStub(b"", status=404)
+        async with stub.server() as server:
+            stream = self.stream(server)
+            with self.assertRaises(aiohttp.ClientResponseError):
+                await stream.start()
+
+    async def test_slow_consumer(self):
+        """A slow consumer of the entries does not stall the download."""
+        entries = [Entry(f"c{i}", "1.0.0", f"http://c{i}", {}) for i in range(20000)]
+        stub = UniverseStub(universe_document(entries), chunk_size=65536)
+        timeout = aiohttp.ClientTimeout(sock_read=0.1)
+        async with stub.server() as server, aiohttp.ClientSession(timeout=timeout) as session:
+            stream = self.stream(server, session=session)
+            await stream.start()
+            consumed = []
+            async for entry in stream.entries():
+                consumed.append(entry)
+                if len(consumed) % 2000 == 0:
+                    await asyncio.sleep(0.05)
+                if len(consumed) == len(entries) // 2:
+                    self.assertTrue(stream._task.done())
+        self.assertEqual([e.name for e in consumed], [e.name for e in entries])
+        self.assertEqual(len(stub.requests), 1)
+
+    async def test_retry(self):
+        """A retried download is parsed from the start of the new download."""
+        body = universe_document(self.entries)
+        partial = universe_document(self.entries[:1])[:-1] + b","
+        attempts = []
+
+        async def handle(request):
+            attempts.append(request)
+            response = web.StreamResponse(headers={"Content-Length": str(len(body))})
+            await response.prepare(request)
+            if len(attempts) == 1:
+                await response.write(partial)
+                await asyncio.sleep(0.2)
+                request.transport.close()
+                return response
+            await response.write(body)
+            await response.write_eof()
+            return response
+
+        app = web.Application()
+        app.router.add_get("/universe", handle)
+        with patch("backoff.expo", partial_constant):
+            async with TestServer(app) as server:
+                downloader = CookbookHttpDownloader(
+                    str(server.make_url("/universe")),
+                    session=self.session,
+                    universe=True,
+                    max_retries=1,
+                )
+                stream = UniverseStream(downloader)
+                await stream.start()
+                entries = [entry async for entry in stream.entries()]
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(
+            [(e.name, e.version) for e in entries],
+            [("c0", "1.0.0")] + [(e.name, e.version) for e in self.entries],
+        )
+
+    async def test_close(self):
+        """Closing the stream stops the download."""
+        stub = UniverseStub(universe_document(self.entries), chunk_size=100, delay=0.05)
+        async with stub.server() as server:
+            stream = self.stream(server)
+            await stream.start()
+            await asyncio.sleep(0.1)
+            self.assertFalse(stream._task.done())
+            await asyncio.wait_for(stream.close(), timeout=5)
+            self.assertTrue(stream._task.cancelled())
+
+
+class CookbookDownloaderFactoryTestCase(IsolatedAsyncioTestCase):
+    """Verify the downloaders built for a cookbook remote."""
+
+    async def test_universe_downloader(self):
+        remote = CookbookRemote(name="remote", url="http://example.com", download_concurrency=1)
+        factory = remote.download_factory
+        self.addAsyncCleanup(factory._session.close)
+        self.assertIsInstance(factory, CookbookDownloaderFactory)
+        self.assertIs(remote.download_factory, factory)
+
+        artifact_downloader = remote.get_downloader(url="http://example.com/c1.tgz")
+        universe_downloader = remote.get_downloader(
+            url="http://example.com/universe", universe=True, etag='"1"'
+        )
+        self.assertIsInstance(universe_downloader, CookbookHttpDownloader)
+        self.assertEqual(universe_downloader.conditional_headers(), {"If-None-Match": '"1"'})
+        self.assertIs(universe_downloader.session.session, artifact_downloader.session)
+        # The universe does not hold the only download slot of the remote
+        self.assertIsNot(universe_downloader.semaphore, artifact_downloader.semaphore)
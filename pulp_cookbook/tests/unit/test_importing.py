@@ -0,0 +1,188 @@
+# (C) Copyright 2026 Simon Baatz <gmbnomis@gmail.com>
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import hashlib
+import os
+import tempfile
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock, patch
+
+from django.test import override_settings
+
+from pulpcore.plugin.stages import EndStage, Stage, create_pipeline
+
+from pulp_cookbook.app.serializers import CookbookDirectoryImportSerializer
+from pulp_cookbook.app.tasks.importing import (
+    DirectoryImportFirstStage,
+    find_cookbook_files,
+    process_cookbook_file,
+)
+from pulp_cookbook.tests.unit.test_metadata import cookbook_archive
+
+
+class DirectoryImportTestCase(TestCase):
+    """Verify reading cookbook archives from a local directory."""
+
+    metadata = {"name": "c1", "version": "1.0.0", "dependencies": {"c2": "~> 1.0"}}
+
+    def setUp(self):
+        self.source_dir = tempfile.TemporaryDirectory()
+        self.working_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.source_dir.cleanup()
+        self.working_dir.cleanup()
+
+    def write(self, relative_path, data):
+        path = os.path.join(self.source_dir.name, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as fp:
+            fp.write(data)
+        return path
+
+    def test_find_cookbook_files(self):
+        paths = [self.write(p, b"") for p in ("b/c2.tgz", "a.tar.gz", "b/c/c3.tar.gz")]
+        self.write("universe", b"{}")
+        self.assertEqual(find_cookbook_files(self.source_dir.name), sorted(paths))
+
+    def test_process_cookbook_file(self):
+        data = cookbook_archive("c1", self.metadata, files_before=2).getvalue()
+        path = self.write("c1.tgz", data)
+        result = process_cookbook_file(path, self.working_dir.name, ["sha256", "md5"])
+        self.assertEqual(result["path"], path)
+        self.assertEqual(result["size"], len(data))
+        self.assertEqual(
+            result["digests"],
+            {"sha256": hashlib.sha256(data).hexdigest(), "md5": hashlib.md5(data).hexdigest()},
+        )
+        self.assertEqual(result["metadata"], self.metadata)
+        self.assertEqual(os.path.dirname(result["file"]), self.working_dir.name)
+        with open(result["file"], "rb") as fp:
+            self.assertEqual(fp.read(), data)
+
+    def test_invalid_archive(self):
+        for data in (b"no archive", cookbook_archive("c1", {}).getvalue()[:50]):
+            path = self.write("c1.tgz", data)
+            with self.subTest(data=data), self.assertRaises(ValueError):
+                process_cookbook_file(path, self.working_dir.name, ["sha256"])
+            self.assertEqual(os.listdir(self.working_dir.name), [])
+
+
+class Collect(Stage):
+    def __init__(self, fail=False):
+        super().__init__()
+        self.fail = fail
+        self.names = []
+
+    async def run(self):
+        async for d_content in self.items():
+            if self.fail:
+                raise RuntimeError("stage failed")
+            self.names.append(d_content.content.name)
+            await self.put(d_content)
+
+
+class DirectoryImportFirstStageTestCase(IsolatedAsyncioTestCase):
+    """Verify stopping the import of a directory on failures."""
+
+    def setUp(self):
+        self.source_dir = tempfile.TemporaryDirectory()
+        self.working_dir = tempfile.TemporaryDirectory()
+        self._cwd = os.getcwd()
+        os.chdir(self.working_dir.name)
+        progress_report = patch("pulp_cookbook.app.tasks.importing.ProgressReport")
+        progress_report.start().return_value.__aenter__.return_value = AsyncMock()
+        self.addCleanup(progress_report.stop)
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self.source_dir.cleanup()
+        self.working_dir.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.source_dir.name, f"{name}.tgz")
+        with open(path, "wb") as fp:
+            fp.write(data)
+        return path
+
+    def archive(self, name):
+        return self.write(name, cookbook_archive(name, {"name": name, "version": "1.0.0"}).read())
+
+    async def test_invalid_archive(self):
+        paths = [self.archive("c1"), self.write("c2", b"no archive")]
+        collect = Collect()
+        with self.assertRaisesRegex(ValueError, "c2.tgz"):
+            await create_pipeline(
+                [DirectoryImportFirstStage(paths, processes=1), collect, EndStage()]
+            )
+        self.assertIn(collect.names, ([], ["c1"]))
+
+    async def test_failing_stage(self):
+        paths = [self.archive(f"c{i}") for i in range(20)]
+        processed = []
+
+        def process(path, *args, **kwargs):
+            time.sleep(0.02)
+            processed.append(path)
+            return process_cookbook_file(path, *args, **kwargs)
+
+        # Process the archives in a thread to observe the archives processed
+        with patch(
+            "pulp_cookbook.app.tasks.importing.ProcessPoolExecutor", ThreadPoolExecutor
+        ), patch("pulp_cookbook.app.tasks.importing.process_cookbook_file", process):
+            with self.assertRaisesRegex(RuntimeError, "stage failed"):
+                await create_pipeline(
+                    [DirectoryImportFirstStage(paths, processes=1), Collect(fail=True), EndStage()]
+                )
+        # The archives queued behind the failure have not been processed
+        self.assertLess(len(processed), 5)
+
+
+class DirectoryImportSerializerTestCase(TestCase):
+    """Verify the validation of the directory to import from."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.allowed = os.path.join(os.path.realpath(self.tmp.name), "allowed")
+        self.outside = os.path.join(os.path.realpath(self.tmp.name), "outside")
+        for path in (
+            os.path.join(self.allowed, "cookbooks"),
+            self.allowed + "-other",
+            self.outside,
+        ):
+            os.makedirs(path)
+        open(os.path.join(self.allowed, "universe"), "w").close()
+        os.symlink(self.outside, os.path.join(self.allowed, "link"))
+
+    def validate(self, path):
+        serializer = CookbookDirectoryImportSerializer(data={"path": path})
+        with override_settings(ALLOWED_IMPORT_PATHS=[self.allowed]):
+            valid = serializer.is_valid()
+        return serializer.validated_data["path"] if valid else serializer.errors["path"]
+
+    def test_allowed(self):
+        path = os.path.join(self.allowed, "cookbooks")
+        self.assertEqual(self.validate(path), path)
+        self.assertEqual(self.validate(self.allowed), self.allowed)
+        self.assertEqual(self.validate(os.path.join(self.allowed, "..", "allowed")), self.allowed)
+
+    def test_outside(self):
+        for path in (
+            self.outside,
+            self.allowed + "-other",
+            os.path.join(self.allowed, "..", "outside"),
+            # a symlink within the allowed path must not escape it
+            os.path.join(self.allowed, "link"),
+        ):
+            with self.subTest(path=path):
+                (error,) = self.validate(path)
+                self.assertIn("ALLOWED_IMPORT_PATHS", error)
+
+    def test_not_a_directory(self):
+        (error,) = self.validate(os.path.join(self.allowed, "universe"))
+        self.assertIn("not a directory", error)
@@ -0,0 +1,168 @@
+# (C) Copyright 2026 Simon Baatz <gmbnomis@gmail.com>
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import asyncio
+import sqlite3
+
+from types import SimpleNamespace
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from pulpcore.plugin.stages import EndStage, Stage, create_pipeline
+
+from pulp_cookbook.app.tasks.instrumentation import InstrumentedPipeline
+from pulp_cookbook.app.tasks.synchronizing import CookbookDeclarativeVersion
+
+
+class Source(Stage):
+    def __init__(self, count, item=int):
+        super().__init__()
+        self.count = count
+        self.item = item
+        self.cancelled = False
+
+    async def run(self):
+        try:
+            for i in range(self.count):
+                await self.put(self.item(i))
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+class Slow(Stage):
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    async def run(self):
+        async for item in self.items():
+            await asyncio.sleep(self.delay)
+            await self.put(item)
+
+
+class Batching(Stage):
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+        self.batches_seen = 0
+
+    async def run(self):
+        async for batch in self.batches(minsize=3):
+            self.batches_seen += 1
+            await asyncio.sleep(self.delay)
+            for item in batch:
+                await self.put(item)
+
+
+class Failing(Stage):
+    async def run(self):
+        async for item in self.items():
+            raise ValueError(item)
+
+
+class InstrumentedPipelineTestCase(IsolatedAsyncioTestCase):
+    """Verify the metrics of the stages of a pipeline."""
+
+    async def test_bottleneck(self):
+        stages = [Source(10), Slow(0.01), EndStage()]
+        pipeline = InstrumentedPipeline(stages)
+        await create_pipeline(pipeline.stages)
+        source, slow, end = pipeline.metrics
+        self.assertEqual([m.name for m in pipeline.metrics], ["Source", "Slow", "EndStage"])
+        self.assertEqual([m.items for m in pipeline.metrics], [10, 10, 10])
+        # The source is held up by the slow stage, the end stage waits for it
+        self.assertGreater(source.output_wait, 0.05)
+        self.assertGreater(slow.busy, 0.08)
+        self.assertGreater(end.input_wait, 0.08)
+        self.assertLess(end.busy, 0.05)
+        self.assertIn("Slow: 10 items", slow.summary())
+
+    async def test_batches(self):
+        """Processing a batch does not count as waiting for the next one."""
+        batching = Batching(0.02)
+        pipeline = InstrumentedPipeline(
+            [Source(12, item=lambda i: SimpleNamespace(does_batch=True)), batching, EndStage()]
+        )
+        await create_pipeline(pipeline.stages)
+        metrics = pipeline.metrics[1]
+        self.assertEqual(metrics.items, 12)
+        self.assertGreaterEqual(metrics.busy, batching.batches_seen * 0.02 * 0.9)
+        self.assertLess(metrics.input_wait, 0.02)
+
+    async def test_queue_depth(self):
+        pipeline = InstrumentedPipeline([Source(5), Slow(0), EndStage()])
+        await create_pipeline(pipeline.stages, maxsize=10)
+        slow = pipeline.metrics[1]
+        self.assertEqual((slow.max_depth, slow.mean_depth), (5, 3))
+        self.assertIn("input queue depth 3.0 (max 5)", slow.summary())
+        self.assertNotIn("input queue depth", pipeline.metrics[0].summary())
+
+    async def test_unique_stages(self):
+        stage = Slow(0)
+        with self.assertRaises(ValueError):
+            InstrumentedPipeline([Source(1), stage, stage, EndStage()])
+
+    async def test_failure_cancels_stages(self):
+        source = Source(1000)
+        pipeline = InstrumentedPipeline([source, Failing(), EndStage()])
+        with self.assertRaises(ValueError):
+            await create_pipeline(pipeline.stages)
+        # The cancelled stages have finished when the pipeline fails
+        self.assertTrue(source.cancelled)
+        self.assertGreater(pipeline.metrics[0].duration, 0)
+
+    async def test_profiling(self):
+        """The instrumented stages can be profiled by the Stages API."""
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE TABLE stages (uuid varchar(36), name text, num int)")
+        conn.execute(
+            "CREATE TABLE traffic (uuid varchar(36), waiting_time real, service_time real)"
+        )
+        conn.execute("CREATE TABLE system (uuid varchar(36), length int, interarrival_time real)")
+        self.addCleanup(conn.close)
+        pipeline = InstrumentedPipeline(
+            [Source(3, item=lambda i: SimpleNamespace(extra_data={})), Slow(0), EndStage()]
+        )
+        with override_settings(PROFILE_STAGES_API=True), patch(
+            "pulpcore.plugin.stages.profiler.CONN", conn
+        ):
+            await create_pipeline(pipeline.stages)
+        self.assertEqual([m.items for m in pipeline.metrics], [3, 3, 3])
+        self.assertEqual(
+            conn.execute("SELECT name FROM stages ORDER BY num").fetchall(),
+            [(f"{__name__}.Slow",), ("pulpcore.plugin.stages.api.EndStage",)],
+        )
+        self.assertEqual(conn.execute("SELECT count(*) FROM system").fetchone(), (6,))
+
+
+class CookbookDeclarativeVersionTestCase(SimpleTestCase):
+    """Verify the instrumentation of the sync pipeline."""
+
+    def pipeline_stages(self):
+        declarative_version = CookbookDeclarativeVersion(False, Source(0), None)
+        return declarative_version, declarative_version.pipeline_stages(None)
+
+    def test_not_instrumented(self):
+        declarative_version, stages = self.pipeline_stages()
+        self.assertIsNone(declarative_version.instrumented_pipeline)
+        self.assertNotIn("run", vars(stages[0]))
+
+    @override_settings(COOKBOOK_SYNC_INSTRUMENTATION=True)
+    def test_instrumented(self):
+        declarative_version, stages = self.pipeline_stages()
+        pipeline = declarative_version.instrumented_pipeline
+        self.assertIs(stages, pipeline.stages)
+        self.assertIn("run", vars(stages[0]))
+        self.assertEqual(
+            [metrics.name for metrics in pipeline.metrics],
+            [
+                "Source",
+                "QueryExistingRepoContentAndArtifacts",
+                "ContentSaver",
+                "RemoteArtifactSaver",
+            ],
+        )
@@ -0,0 +1,47 @@
+# (C) Copyright 2026 Simon Baatz <gmbnomis@gmail.com>
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import json
+
+from unittest import TestCase
+
+from pulp_cookbook.jsoncodecs import JsonCodec, available_codecs, select_codec
+
+
+class JsonCodecTestCase(TestCase):
+    """Verify the JSON codecs."""
+
+    values = [
+        "",
+        "plain",
+        'quote " backslash \\ slash /',
+        "control \n\t\x00\x1f\x7f",
+        "non-ascii äöü € 𝄞",
+        {},
+        {"apt": ">= 1.0", "käse": "~> 2.0"},
+        {"nested": {"a": [1, 2.5, None, True]}},
+        [],
+        ["a", 1],
+        1.1,
+        None,
+    ]
+
+    def test_json_codec_dumps_exact(self):
+        codec = JsonCodec()
+        for value in self.values:
+            with self.subTest(value=value):
+                self.assertEqual(codec.dumps(value), json.dumps(value))
+
+    def test_codecs_round_trip(self):
+        for codec in available_codecs():
+            for value in self.values:
+                with self.subTest(codec=codec.name, value=value):
+                    self.assertEqual(codec.loads(codec.dumps(value)), value)
+                    self.assertEqual(codec.loads(json.dumps(value).encode()), value)
+
+    def test_select_codec(self):
+        self.assertTrue(select_codec(exact=True).exact)
+        self.assertTrue(select_codec(streaming=True).streaming)
+        self.assertIs(select_codec(), available_codecs()[0])
+        self.assertIsInstance(available_codecs()[-1], JsonCodec)
@@ -0,0 +1,85 @@
+# (C) Copyright 2026 Simon Baatz <gmbnomis@gmail.com>
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import hashlib
+import io
+import json
+import tarfile
+
+from unittest.mock import patch
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+
+from pulpcore.plugin.models import Artifact
+
+from pulp_cookbook.app.metadata_cache import LRUCache, get_cookbook_metadata, metadata_cache
+from pulp_cookbook.app.models import CookbookArtifactMetadata
+from pulp_cookbook.metadata import CookbookMetadata
+
+
+def cookbook_tar(name, version):
+    metadata = json.dumps({"name": name, "version": version, "dependencies": {}}).encode()
+    fileobj = io.BytesIO()
+    with tarfile.open(fileobj=fileobj, mode="w:gz") as tf:
+        info = tarfile.TarInfo(f"{name}/metadata.json")
+        info.size = len(metadata)
+        tf.addfile(info, io.BytesIO(metadata))
+    return fileobj.getvalue()
+
+
+class LRUCacheTestCase(TestCase):
+    """Verify the LRUCache."""
+
+    def test_eviction(self):
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+
+
+class GetCookbookMetadataTestCase(TestCase):
+    """Verify that extracted metadata is cached in memory and in the DB."""
+
+    def setUp(self):
+        data = cookbook_tar("c1", "1.0.0")
+        self.artifact = Artifact.objects.create(
+            size=len(data),
+            sha224=hashlib.sha224(data).hexdigest(),
+            sha256=hashlib.sha256(data).hexdigest(),
+            sha384=hashlib.sha384(data).hexdigest(),
+            sha512=hashlib.sha512(data).hexdigest(),
+            file=SimpleUploadedFile("c1.tar.gz", data),
+        )
+        metadata_cache().clear()
+
+    def test_cached(self):
+        with patch.object(
+            CookbookMetadata, "from_cookbook_file", wraps=CookbookMetadata.from_cookbook_file
+        ) as extract:
+            self.assertEqual(get_cookbook_metadata(self.artifact, "c1").version, "1.0.0")
+            self.assertEqual(extract.call_count, 1)
+            self.assertEqual(
+                CookbookArtifactMetadata.objects.get(artifact=self.artifact).metadata["version"],
+                "1.0.0",
+            )
+
+            # in-process cache hit
+            with self.assertNumQueries(0):
+                self.assertEqual(get_cookbook_metadata(self.artifact, "c1").version, "1.0.0")
+
+            # DB hit
+            metadata_cache().clear()
+            with self.assertNumQueries(1):
+                self.assertEqual(get_cookbook_metadata(self.artifact, "c1").version, "1.0.0")
+            self.assertEqual(extract.call_count, 1)
+
+    def test_metadata_not_found(self):
+        with self.assertRaises(FileNotFoundError):
+            get_cookbook_metadata(self.artifact, "c2")
+        self.assertFalse(CookbookArtifactMetadata.objects.exists())
@@ -0,0 +1,28 @@
+# (C) Copyright 2026 Simon Baatz <gmbnomis@gmail.com>
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, Mock
+
+from pulp_cookbook.app.tasks.progress import ThrottledProgress
+
+
+class ThrottledProgressTestCase(IsolatedAsyncioTestCase):
+    """Verify the throttled progress reporting."""
+
+    async def test_flush_items(self):
+        progress_report = Mock(aincrease_by=AsyncMock())
+        async with ThrottledProgress(progress_report, 4, 3600) as progress:
+            for _ in range(10):
+                await progress.aincrement()
+            self.assertEqual(progress_report.aincrease_by.await_count, 2)
+        self.assertEqual(
+            [c.args[0] for c in progress_report.aincrease_by.await_args_list], [4, 4, 2]
+        )
+
+    async def test_flush_interval(self):
+        progress_report = Mock(aincrease_by=AsyncMock())
+        progress = ThrottledProgress(progress_report, flush_items=1000, flush_interval=0)
+        await progress.aincrease_by(3)
+        progress_report.aincrease_by.assert_awaited_once_with(3)
@@ -11,7 +11,7 @@ from django.test.utils import override_settings
 from pulpcore.plugin.models import ContentArtifact, PublishedArtifact
 
 from pulp_cookbook.app.models import CookbookPackageContent, CookbookPublication, CookbookRepository
-from pulp_cookbook.app.repo_version_utils import check_repo_version_constraint
+from pulp_cookbook.app.repo_version_utils import check_repo_version_constraint, filter_repo_keys
 from pulp_cookbook.app.tasks.publishing import populate
 
 
@@ -72,6 +72,49 @@ class CheckRepoVersionConstraintTestCase(TestCase):
             check_repo_version_constraint(self.new_version_content())
 
 
+class FilterRepoKeysTestCase(TestCase):
+    """Verify filter_repo_keys() method."""
+
+    def test_filter_repo_keys(self):
+        for name, version in (("c1", "1.0.0"), ("c1", "1.0.1"), ("c2", "1.0.0")):
+            CookbookPackageContent.objects.create(
+                name=name,
+                version=version,
+                content_id_type="sha256",
+                content_id="1",
+                dependencies={},
+            )
+        qs = CookbookPackageContent.objects.all()
+        keys = [("c1", "1.0.1"), ("c2", "1.0.0"), ("c2", "1.0.1"), ("c3", "1.0.0")]
+        self.assertEqual(
+            sorted(c.repo_key_value() for c in filter_repo_keys(qs, keys)),
+            [("c1", "1.0.1"), ("c2", "1.0.0")],
+        )
+        self.assertEqual(list(filter_repo_keys(qs, [])), [])
+
+    def test_quoting(self):
+        keys = [("c'1", "1.0,0"), ('c"1', "1.0.0"), ("c1,1.0)", "('1')"), ("c{1}", "NULL")]
+        for name, version in keys:
+            CookbookPackageContent.objects.create(
+                name=name,
+                version=version,
+                content_id_type="sha256",
+                content_id="1",
+                dependencies={},
+            )
+        qs = CookbookPackageContent.objects.all()
+        self.assertEqual(
+            sorted(c.repo_key_value() for c in filter_repo_keys(qs, keys)), sorted(keys)
+        )
+        self.assertEqual(
+            [c.repo_key_value() for c in filter_repo_keys(qs, [("c'1", "1.0"), ("c1", "1.0)")])],
+            [],
+        )
+        # Duplicate keys, no match for escaped quotes
+        duplicates = [("c'1", "1.0,0"), ("c'1", "1.0,0"), ("c\\'1", "1.0,0")]
+        self.assertEqual([c.name for c in filter_repo_keys(qs, duplicates)], ["c'1"])
+
+
 class CheckPublishingPopulate(TestCase):
     """Verify populate() from the publishing task."""
 
@@ -105,3 +148,17 @@ class CheckPublishingPopulate(TestCase):
         )
         self.assertEqual(len(entries), self.content_count)
         self.assertEqual(PublishedArtifact.objects.count(), self.content_count)
+
+    def test_populate_ordered_by_name(self):
+        """Entries are grouped by cookbook name as required by Universe.write()."""
+        for name in ("zz", "aa"):
+            c = CookbookPackageContent.objects.create(name=name, version="1.0.0", dependencies={})
+            ContentArtifact.objects.create(
+                artifact=None, content=c, relative_path=c.relative_path()
+            )
+        with self.repository.new_version() as version2:
+            version2.add_content(CookbookPackageContent.objects.all())
+        publication = CookbookPublication.objects.create(repository_version=version2)
+        names = [entry.name for entry in populate(publication, batch_size=5)]
+        self.assertEqual(names, sorted(names))
+        self.assertEqual(len(names), self.content_count + 2)
@@ -2,16 +2,54 @@
 #
 # SPDX-License-Identifier: GPL-2.0-or-later
 
-from unittest.mock import Mock
+import asyncio
+import os
+import tempfile
+
+from unittest.mock import AsyncMock, Mock, patch
 
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DEFAULT_DB_ALIAS, connections
 from django.test import TestCase
 
-from pulpcore.plugin.models import Artifact, ContentArtifact
-from pulpcore.plugin.stages import DeclarativeArtifact, DeclarativeContent
+from pulpcore.plugin.models import Artifact, ContentArtifact, RepositoryVersion
+from pulpcore.plugin.stages import ArtifactDownloader, DeclarativeArtifact, DeclarativeContent
+
+from pulp_cookbook.app.models import (
+    CookbookDownloadMemo,
+    CookbookPackageContent,
+    CookbookRemote,
+    CookbookRepository,
+    CookbookSyncState,
+)
+from pulp_cookbook.app.tasks.synchronizing import (
+    CookbookDeclarativeVersion,
+    CookbookFirstStage,
+    MultiRemoteFirstStage,
+    QueryDownloadMemo,
+    QueryExistingRepoContentAndArtifacts,
+    RecordDownloadMemo,
+    RemoveReplacedContent,
+    UpdateContentWithDownloadResult,
+    plan_sync,
+    synchronize,
+    synchronize_remotes,
+)
+from pulp_cookbook.metadata import Entry, UniverseFingerprint
+from pulp_cookbook.tests.unit.test_downloaders import UniverseStub
+
+
+def changed_entries(stage, entries):
+    """Run `CookbookFirstStage.changed_entries()` on a list of entries."""
+
+    async def stream():
+        for entry in entries:
+            yield entry
+
+    async def collect():
+        return [entry async for entry in stage.changed_entries(stream())]
 
-from pulp_cookbook.app.models import CookbookPackageContent, CookbookRemote
-from pulp_cookbook.app.tasks.synchronizing import QueryExistingRepoContentAndArtifacts
+    return asyncio.get_event_loop().run_until_complete(collect())
 
 
 class QueryExistingRepoContentAndArtifactsTestCase(TestCase):
@@ -53,7 +91,23 @@ class QueryExistingRepoContentAndArtifactsTestCase(TestCase):
 
     def test_content_associated_using_repo_key(self):
         stage = QueryExistingRepoContentAndArtifacts(new_version=self.new_version_all_content())
+        self.check_content_associated(stage)
 
+    def test_content_associated_using_index(self):
+        stage = QueryExistingRepoContentAndArtifacts(
+            new_version=self.new_version_all_content(), index_max_bytes=10**8
+        )
+        self.check_content_associated(stage)
+        self.assertEqual(len(stage._indexes[CookbookPackageContent]), 2)
+
+    def test_index_memory_limit(self):
+        stage = QueryExistingRepoContentAndArtifacts(
+            new_version=self.new_version_all_content(), index_max_bytes=1
+        )
+        self.check_content_associated(stage)
+        self.assertIsNone(stage._indexes[CookbookPackageContent])
+
+    def check_content_associated(self, stage):
         # c1: Existing content unit with Artifact
         c1 = CookbookPackageContent(name="c1", version="1.0.0", dependencies={})
         # c2: content unit does not exist in DB
@@ -98,3 +152,688 @@ class QueryExistingRepoContentAndArtifactsTestCase(TestCase):
 
         self.assertEqual(batch[2].content.pk, self.c3.pk)
         self.assertTrue(batch[2].d_artifacts[0].artifact._state.adding)
+
+
+class DownloadMemoTestCase(TestCase):
+    """Verify looking up, revalidating and recording artifacts in the download memo."""
+
+    def setUp(self):
+        self.remote = CookbookRemote.objects.create(name="remote")
+        self.artifact = Artifact.objects.create(
+            size=0,
+            sha224="111111111111111111",
+            sha256="111111111111111111",
+            sha384="111111111111111111",
+            sha512="111111111111111111",
+            file=SimpleUploadedFile("test_filename", b""),
+        )
+        self.memo = CookbookDownloadMemo.objects.create(
+            key="known", artifact=self.artifact, etag=UniverseStub.ETAG
+        )
+        CookbookDownloadMemo.objects.create(key="no-validators", artifact=self.artifact)
+
+    def declarative_content(self, name, key):
+        content = CookbookPackageContent(name=name, version="1.0.0", dependencies={})
+        d_artifact = DeclarativeArtifact(
+            artifact=Artifact(),
+            url=f"http://{name}",
+            relative_path=content.relative_path(),
+            remote=self.remote,
+            extra_data={"download_key": key},
+        )
+        return DeclarativeContent(content=content, d_artifacts=[d_artifact])
+
+    def test_lookup_and_record(self):
+        batch = [
+            self.declarative_content("c1", "known"),
+            self.declarative_content("c2", "new"),
+            self.declarative_content("c3", "no-validators"),
+        ]
+        d_a1, d_a2, d_a3 = (d_content.d_artifacts[0] for d_content in batch)
+        self.assertEqual(QueryDownloadMemo()._process_batch(batch), {d_a1: self.memo})
+        self.assertTrue(d_a1.artifact._state.adding)
+        self.assertNotIn("record_download", d_a1.extra_data)
+        for d_artifact in (d_a2, d_a3):
+            self.assertTrue(d_artifact.artifact._state.adding)
+            self.assertTrue(d_artifact.extra_data["record_download"])
+
+        self.assertEqual(QueryDownloadMemo(revalidate=False)._process_batch(batch), {})
+        self.assertEqual(d_a1.artifact.pk, self.artifact.pk)
+
+        # Not saved yet, i.e. nothing to record
+        d_a2.extra_data["validators"] = {"etag": '"2"'}
+        RecordDownloadMemo()._process_batch(batch)
+        self.assertEqual(CookbookDownloadMemo.objects.count(), 2)
+
+        d_a2.artifact = self.artifact
+        d_a3.artifact = self.artifact
+        RecordDownloadMemo()._process_batch(batch)
+        memo = CookbookDownloadMemo.objects.get(key="new")
+        self.assertEqual((memo.artifact, memo.validators()), (self.artifact, {"etag": '"2"'}))
+        # Without validators, the download cannot be revalidated
+        self.assertEqual(CookbookDownloadMemo.objects.get(key="no-validators").etag, None)
+
+    def test_skipped(self):
+        deferred = self.declarative_content("c1", "known")
+        deferred.d_artifacts[0].deferred_download = True
+        existing = self.declarative_content("c2", "known")
+        existing.d_artifacts[0].artifact = self.artifact
+        self.assertEqual(QueryDownloadMemo()._process_batch([deferred, existing]), {})
+        self.assertNotIn("record_download", deferred.d_artifacts[0].extra_data)
+        self.assertNotIn("record_download", existing.d_artifacts[0].extra_data)
+
+    def revalidate(self, stub):
+        """
+        Revalidate a memo hit against `stub` and run the artifact download stage on it.
+
+        Returns:
+            tuple: the declarative artifact and whether the artifact download stage
+                downloaded it
+
+        """
+        d_content = self.declarative_content("c1", "known")
+        ((d_artifact, memo),) = QueryDownloadMemo()._process_batch([d_content]).items()
+
+        async def run():
+            async with stub.server() as server:
+                d_artifact.urls = [str(server.make_url("/universe"))]
+                await asyncio.wait_for(QueryDownloadMemo._revalidate(d_artifact, memo), 1)
+            await self.remote.download_factory._session.close()
+            stage = ArtifactDownloader()
+            stage.put = AsyncMock()
+            with patch.object(DeclarativeArtifact, "download") as download:
+                await stage._handle_content_unit(d_content)
+            return d_artifact, download.called
+
+        with tempfile.TemporaryDirectory() as working_dir:
+            cwd = os.getcwd()
+            os.chdir(working_dir)
+            try:
+                return asyncio.get_event_loop().run_until_complete(run())
+            finally:
+                os.chdir(cwd)
+
+    def test_not_modified(self):
+        stub = UniverseStub(b"data")
+        d_artifact, downloaded = self.revalidate(stub)
+        self.assertEqual(stub.requests[0]["If-None-Match"], UniverseStub.ETAG)
+        self.assertEqual(d_artifact.artifact.pk, self.artifact.pk)
+        self.assertNotIn("record_download", d_artifact.extra_data)
+        self.assertFalse(downloaded)
+
+    def test_modified(self):
+        """A modified archive is left to the artifact download stage."""
+        self.memo.etag = '"0"'
+        self.memo.save()
+        # Reading the body would exceed the timeout of the revalidation
+        stub = UniverseStub(b"data", chunk_size=1, delay=0.5)
+        d_artifact, downloaded = self.revalidate(stub)
+        self.assertTrue(d_artifact.artifact._state.adding)
+        self.assertFalse(d_artifact.artifact.file)
+        self.assertTrue(d_artifact.extra_data["record_download"])
+        self.assertTrue(downloaded)
+
+    def test_failed_revalidation(self):
+        stub = UniverseStub(b"", status=500)
+        d_artifact, downloaded = self.revalidate(stub)
+        self.assertTrue(d_artifact.extra_data["record_download"])
+        self.assertTrue(downloaded)
+
+    def test_slow_revalidation(self):
+        """Content is passed on while the revalidation of other content is pending."""
+        slow = self.declarative_content("c1", "known")
+        fast = self.declarative_content("c2", "new")
+        stage = QueryDownloadMemo()
+        stage._process_batch = lambda batch: {slow.d_artifacts[0]: self.memo}
+        passed = []
+
+        async def run():
+            released = asyncio.Event()
+
+            async def revalidate(d_artifact, memo):
+                await released.wait()
+
+            async def batches():
+                yield [slow, fast]
+
+            async def put(d_content):
+                passed.append(d_content.content.name)
+                released.set()
+
+            stage._revalidate = revalidate
+            stage.batches = batches
+            stage.put = put
+            await asyncio.wait_for(stage.run(), timeout=5)
+
+        asyncio.get_event_loop().run_until_complete(run())
+        self.assertEqual(passed, ["c2", "c1"])
+
+
+class UpdateContentWithDownloadResultTestCase(TestCase):
+    """Verify setting the content_id and sharing existing content with the same digest."""
+
+    def setUp(self):
+        self.remote = CookbookRemote.objects.create(name="remote")
+        self.artifact = Artifact.objects.create(
+            size=0,
+            sha224="111111111111111111",
+            sha256="111111111111111111",
+            sha384="111111111111111111",
+            sha512="111111111111111111",
+            file=SimpleUploadedFile("test_filename", b""),
+        )
+        self.existing = CookbookPackageContent.objects.create(
+            name="c1",
+            version="1.0.0",
+            content_id_type=CookbookPackageContent.SHA256,
+            content_id=self.artifact.sha256,
+            dependencies={},
+        )
+
+    def declarative_content(self, content, artifact):
+        d_artifact = DeclarativeArtifact(
+            artifact=artifact,
+            url="http://c",
+            relative_path=content.relative_path(),
+            remote=self.remote,
+        )
+        return DeclarativeContent(content=content, d_artifacts=[d_artifact])
+
+    def test_process_batch(self):
+        other = Artifact(sha256="222222222222222222")
+        other._state.adding = False
+        on_demand = CookbookPackageContent.objects.create(
+            name="c2", version="1.0.0", dependencies={}
+        )
+        # The stage resets the pk of the content it clones
+        on_demand_pk = on_demand.pk
+        batch = [
+            # new content, existing content has the same digest
+            self.declarative_content(
+                CookbookPackageContent(name="c1", version="1.0.0", dependencies={}), self.artifact
+            ),
+            # new content with a new digest
+            self.declarative_content(
+                CookbookPackageContent(name="c1", version="1.0.0", dependencies={}), other
+            ),
+            # existing on-demand content, downloaded now
+            self.declarative_content(on_demand, self.artifact),
+            # deferred download
+            self.declarative_content(
+                CookbookPackageContent(name="c3", version="1.0.0", dependencies={}), Artifact()
+            ),
+        ]
+        UpdateContentWithDownloadResult()._process_batch(batch)
+
+        self.assertEqual(batch[0].content.pk, self.existing.pk)
+        self.assertTrue(batch[1].content._state.adding)
+        self.assertEqual(batch[1].content.content_id, other.sha256)
+        # c2 has been cloned with the digest of the artifact
+        self.assertTrue(batch[2].content._state.adding)
+        self.assertEqual(batch[2].content.content_id, self.artifact.sha256)
+        self.assertEqual(
+            CookbookPackageContent.objects.get(pk=on_demand_pk).content_id_type,
+            CookbookPackageContent.UUID,
+        )
+        self.assertTrue(batch[3].content._state.adding)
+        self.assertEqual(batch[3].content.content_id_type, CookbookPackageContent.UUID)
+
+
+class CookbookSyncStateTestCase(TestCase):
+    """Verify the validity of the state of the last sync."""
+
+    def setUp(self):
+        self.remote = CookbookRemote.objects.create(name="remote")
+        self.repository = CookbookRepository.objects.create(name="repository")
+        self.state = CookbookSyncState.objects.create(
+            remote=self.remote,
+            repository=self.repository,
+            repository_version=self.repository.latest_version(),
+            etag='"abc"',
+            last_modified=None,
+            mirror=False,
+            remote_last_updated=self.remote.pulp_last_updated,
+        )
+
+    def test_validators(self):
+        self.assertTrue(self.state.is_current(mirror=False))
+        self.assertEqual(self.state.validators(), {"etag": '"abc"'})
+
+    def test_fingerprint(self):
+        self.assertIsNone(self.state.universe_fingerprint())
+        fingerprint = UniverseFingerprint()
+        fingerprint.add(Entry("c1", "1.0.0", "http://c1/1", {}))
+        self.state.fingerprint = fingerprint.to_bytes()
+        self.state.save()
+        self.state.refresh_from_db()
+        self.assertEqual(self.state.universe_fingerprint().digests, fingerprint.digests)
+
+    def test_mirror_after_additive_sync(self):
+        self.assertFalse(self.state.is_current(mirror=True))
+        self.state.mirror = True
+        self.assertTrue(self.state.is_current(mirror=True))
+
+    def test_remote_updated(self):
+        self.remote.url = "http://example.com"
+        self.remote.save()
+        self.state.refresh_from_db()
+        self.assertFalse(self.state.is_current(mirror=False))
+
+    def test_repository_version_changed(self):
+        content = CookbookPackageContent.objects.create(
+            name="c1", version="1.0.0", content_id_type="sha256", content_id="1", dependencies={}
+        )
+        with self.repository.new_version() as new_version:
+            new_version.add_content(CookbookPackageContent.objects.filter(pk=content.pk))
+        self.state.refresh_from_db()
+        self.assertFalse(self.state.is_current(mirror=False))
+
+
+class CookbookFirstStageTestCase(TestCase):
+    """Verify the selection of cookbooks in incremental syncs."""
+
+    def entries(self, **urls):
+        return [Entry(name, "1.0.0", url, {}) for name, url in urls.items()]
+
+    def test_changed_entries(self):
+        previous = UniverseFingerprint()
+        for entry in self.entries(c1="http://c1", c2="http://c2", c3="http://c3"):
+            previous.add(entry)
+        stage = CookbookFirstStage(
+            remote=Mock(), universe=None, download_artifacts=False, previous=previous
+        )
+        entries = self.entries(c1="http://c1", c2="http://changed", c4="http://c4")
+        changed = changed_entries(stage, entries)
+        self.assertEqual([e.name for e in changed], ["c2", "c4"])
+        self.assertEqual(stage.replaced_keys, {("c2", "1.0.0"), ("c3", "1.0.0")})
+        self.assertEqual(len(stage.fingerprint), 3)
+
+    def test_without_previous_sync(self):
+        stage = CookbookFirstStage(remote=Mock(), universe=None, download_artifacts=False)
+        entries = self.entries(c1="http://c1", c2="http://c2")
+        self.assertEqual(changed_entries(stage, entries), entries)
+        self.assertEqual(stage.replaced_keys, set())
+
+    def test_latest_entries(self):
+        entries = [
+            Entry("c1", version, f"http://c1/{version}", {})
+            for version in ("1.0.0", "10.0.0", "invalid", "2.1", "2.0.10", "bad")
+        ] + [Entry("c2", "1.0.0", "http://c2", {})]
+
+        async def collect(stage):
+            async def stream():
+                for entry in entries:
+                    yield entry
+
+            return [(e.name, e.version) async for e in stage.latest_entries(stream())]
+
+        for latest_versions, expected in (
+            (None, [(e.name, e.version) for e in entries]),
+            (2, [("c1", "10.0.0"), ("c1", "2.1"), ("c2", "1.0.0")]),
+            (3, [("c1", "10.0.0"), ("c1", "2.1"), ("c1", "2.0.10"), ("c2", "1.0.0")]),
+            # Invalid versions rank as the oldest
+            (5, [(e.name, e.version) for e in entries[:5]] + [("c2", "1.0.0")]),
+        ):
+            stage = CookbookFirstStage(
+                remote=Mock(latest_versions=latest_versions),
+                universe=None,
+                download_artifacts=False,
+            )
+            with self.subTest(latest_versions=latest_versions):
+                self.assertEqual(
+                    asyncio.get_event_loop().run_until_complete(collect(stage)), expected
+                )
+
+    def test_repeated_entries(self):
+        """Entries repeated by a retried universe download are emitted once."""
+        stage = CookbookFirstStage(remote=Mock(), universe=None, download_artifacts=False)
+        entries = self.entries(c1="http://c1", c2="http://c2")
+        self.assertEqual(changed_entries(stage, entries + entries[:1]), entries)
+
+
+class IncrementalMirrorTestCase(TestCase):
+    """Verify removing replaced content in an incremental mirror sync."""
+
+    def setUp(self):
+        self.repository = CookbookRepository.objects.create(name="repository")
+        self.entries = [Entry(name, "1.0.0", f"http://{name}", {}) for name in ("c1", "c2", "c3")]
+        self.previous = UniverseFingerprint()
+        contents = []
+        for entry in self.entries:
+            self.previous.add(entry)
+            contents.append(
+                CookbookPackageContent.objects.create(
+                    name=entry.name, version=entry.version, dependencies={}
+                )
+            )
+        with self.repository.new_version() as new_version:
+            new_version.add_content(
+                CookbookPackageContent.objects.filter(pk__in=[c.pk for c in contents])
+            )
+        self.contents = {content.name: content for content in contents}
+
+    def sync(self, entries, replace=None):
+        """
+        Run an incremental sync of `entries` up to the removal of replaced content.
+
+        Emitted cookbooks are matched with the existing content. Those named in
+        `replace` are replaced by new content instead.
+
+        Returns:
+            tuple: names of the emitted cookbooks, content of the new version by name
+
+        """
+        stage = CookbookFirstStage(
+            remote=Mock(), universe=None, download_artifacts=False, previous=self.previous
+        )
+        emitted = changed_entries(stage, entries)
+        batch = [stage.declarative_content(entry) for entry in emitted]
+        with self.repository.new_version() as new_version:
+            QueryExistingRepoContentAndArtifacts(new_version=new_version)._process_batch(batch)
+            for d_content in batch:
+                if d_content.content.name in (replace or ()):
+                    d_content.content = CookbookPackageContent.objects.create(
+                        name=d_content.content.name,
+                        version=d_content.content.version,
+                        content_id_type=CookbookPackageContent.SHA256,
+                        content_id="new",
+                        dependencies={},
+                    )
+            RemoveReplacedContent(new_version, stage)._remove_replaced(
+                {d_content.content.pk for d_content in batch}
+            )
+            new_version.add_content(
+                CookbookPackageContent.objects.filter(
+                    pk__in=[d_content.content.pk for d_content in batch]
+                )
+            )
+            content = CookbookPackageContent.objects.filter(pk__in=new_version.content)
+            content = {c.name: c for c in content}
+        return [e.name for e in emitted], content
+
+    def test_changed(self):
+        entries = [self.entries[0], Entry("c2", "1.0.0", "http://changed", {}), self.entries[2]]
+        emitted, content = self.sync(entries)
+        self.assertEqual(emitted, ["c2"])
+        # The existing content of the changed cookbook has been emitted again
+        self.assertEqual(content, self.contents)
+
+        emitted, content = self.sync(entries, replace=("c2",))
+        self.assertEqual(sorted(content), ["c1", "c2", "c3"])
+        self.assertEqual(content["c2"].content_id, "new")
+        self.assertEqual(content["c1"], self.contents["c1"])
+        self.assertEqual(content["c3"], self.contents["c3"])
+
+    def test_dropped(self):
+        emitted, content = self.sync([self.entries[0], self.entries[2]])
+        self.assertEqual(emitted, [])
+        self.assertEqual(content, {"c1": self.contents["c1"], "c3": self.contents["c3"]})
+
+    def test_unchanged(self):
+        emitted, content = self.sync(self.entries)
+        self.assertEqual(emitted, [])
+        self.assertEqual(content, self.contents)
+        self.assertEqual(self.repository.latest_version().number, 1)
+
+    def test_pipeline(self):
+        dv = CookbookDeclarativeVersion(
+            first_stage=Mock(),
+            repository=self.repository,
+            download_artifacts=False,
+            incremental_mirror=True,
+        )
+        stages = dv.pipeline_stages(self.repository.latest_version())
+        self.assertIsInstance(stages[-1], RemoveReplacedContent)
+        self.assertIs(stages[-1].first_stage, dv.first_stage)
+
+
+class MultiRemoteFirstStageTestCase(TestCase):
+    """Verify merging the universes of several remotes."""
+
+    def first_stage(self, *entries, error=None, read=None):
+        async def stream():
+            for entry in entries:
+                if read is not None:
+                    read.append(entry)
+                yield entry
+            if error:
+                raise error
+
+        first_stage = Mock()
+        first_stage.remote_entries = stream
+        first_stage.declarative_content = lambda entry: entry
+        return first_stage
+
+    def run_stage(self, stage):
+        stage.put = AsyncMock()
+        with patch("pulp_cookbook.app.tasks.synchronizing.ProgressReport") as progress_report:
+            progress_report.return_value.__aenter__.return_value = AsyncMock()
+            asyncio.get_event_loop().run_until_complete(stage.run())
+        return [c.args[0].download_url for c in stage.put.call_args_list]
+
+    def test_precedence(self):
+        stage = MultiRemoteFirstStage(
+            [
+                self.first_stage(Entry("c1", "1.0.0", "http://a/c1", {})),
+                self.first_stage(
+                    Entry("c1", "1.0.0", "http://b/c1", {}),
+                    Entry("c1", "2.0.0", "http://b/c1-2", {}),
+                ),
+                self.first_stage(
+                    Entry("c2", "1.0.0", "http://c/c2", {}),
+                    Entry("c1", "2.0.0", "http://c/c1-2", {}),
+                ),
+            ]
+        )
+        self.assertEqual(self.run_stage(stage), ["http://a/c1", "http://b/c1-2", "http://c/c2"])
+
+    @patch("pulp_cookbook.app.tasks.synchronizing.REMOTE_ENTRIES_QUEUE_SIZE", 2)
+    def test_bounded_buffer(self):
+        """The entries of a remote are read as they are emitted, not buffered upfront."""
+        read = []
+        entries = [Entry(f"c{i}", "1.0.0", f"http://b/c{i}", {}) for i in range(10)]
+        stage = MultiRemoteFirstStage(
+            [
+                self.first_stage(*[Entry(f"a{i}", "1.0.0", f"http://a/{i}", {}) for i in range(5)]),
+                self.first_stage(*entries, read=read),
+            ]
+        )
+        read_while_emitting = []
+
+        async def put(entry):
+            if entry.download_url.startswith("http://a/"):
+                read_while_emitting.append(len(read))
+            await asyncio.sleep(0)
+
+        stage.put = put
+        with patch("pulp_cookbook.app.tasks.synchronizing.ProgressReport") as progress_report:
+            progress_report.return_value.__aenter__.return_value = AsyncMock()
+            asyncio.get_event_loop().run_until_complete(stage.run())
+        # The queue holds 2 entries, the reader waits to put the next one
+        self.assertLessEqual(max(read_while_emitting), 3)
+        self.assertEqual(len(read), 10)
+
+    def test_failed_remote(self):
+        stage = MultiRemoteFirstStage(
+            [
+                self.first_stage(Entry("c1", "1.0.0", "http://a/c1", {})),
+                self.first_stage(error=ValueError("invalid universe")),
+            ]
+        )
+        with self.assertRaises(ValueError):
+            self.run_stage(stage)
+
+
+class InvalidCookbookSpecifierTestCase(TestCase):
+    """Verify that remotes with an invalid stored specifier fail before syncing."""
+
+    def setUp(self):
+        # Stored without validation, like remotes created before constraints were checked
+        self.remote = CookbookRemote.objects.create(
+            name="remote", url="http://example.com", cookbooks={"c1": ">= x"}
+        )
+        self.repository = CookbookRepository.objects.create(name="repository")
+
+    @patch("pulp_cookbook.app.tasks.synchronizing.open_universe")
+    def test_synchronize(self, open_universe):
+        for dry_run in (False, True):
+            with self.subTest(dry_run=dry_run), self.assertRaisesRegex(ValueError, "'remote'"):
+                synchronize(self.remote.pk, self.repository.pk, mirror=False, dry_run=dry_run)
+        open_universe.assert_not_called()
+
+    @patch("pulp_cookbook.app.tasks.synchronizing.open_universe")
+    def test_synchronize_remotes(self, open_universe):
+        valid = CookbookRemote.objects.create(name="valid", url="http://example.com")
+        with self.assertRaisesRegex(ValueError, "'remote'"):
+            synchronize_remotes([valid.pk, self.remote.pk], self.repository.pk, mirror=False)
+        open_universe.assert_not_called()
+
+
+@patch("pulp_cookbook.app.tasks.synchronizing.CookbookDeclarativeVersion")
+@patch("pulp_cookbook.app.tasks.synchronizing.open_universe", new_callable=AsyncMock)
+class ConditionalSynchronizeTestCase(TestCase):
+    """Verify the use of the state of the last sync by `synchronize()`."""
+
+    def setUp(self):
+        self.remote = CookbookRemote.objects.create(name="remote", url="http://example.com")
+        self.repository = CookbookRepository.objects.create(name="repository")
+        self.state = CookbookSyncState.objects.create(
+            remote=self.remote,
+            repository=self.repository,
+            repository_version=self.repository.latest_version(),
+            etag='"abc"',
+            mirror=False,
+            remote_last_updated=self.remote.pulp_last_updated,
+        )
+
+    def synchronize(self, open_universe, mirror=False):
+        open_universe.return_value = None  # not modified
+        synchronize(self.remote.pk, self.repository.pk, mirror=mirror)
+        open_universe.assert_called_once()
+        return open_universe.call_args.args[1]
+
+    def test_not_modified(self, open_universe, declarative_version):
+        self.assertEqual(self.synchronize(open_universe), {"etag": '"abc"'})
+        declarative_version.assert_not_called()
+        self.assertEqual(self.repository.latest_version().number, 0)
+        state = CookbookSyncState.objects.get(pk=self.state.pk)
+        self.assertEqual(state.pulp_last_updated, self.state.pulp_last_updated)
+
+    def test_remote_updated(self, open_universe, declarative_version):
+        self.remote.url = "http://example.com/other"
+        self.remote.save()
+        self.assertEqual(self.synchronize(open_universe), {})
+
+    def test_mirror_after_additive_sync(self, open_universe, declarative_version):
+        self.assertEqual(self.synchronize(open_universe, mirror=True), {})
+
+    def test_repository_version_changed(self, open_universe, declarative_version):
+        content = CookbookPackageContent.objects.create(
+            name="c1", version="1.0.0", content_id_type="sha256", content_id="1", dependencies={}
+        )
+        with self.repository.new_version() as new_version:
+            new_version.add_content(CookbookPackageContent.objects.filter(pk=content.pk))
+        self.assertEqual(self.synchronize(open_universe), {})
+
+    def test_incremental_mirror(self, open_universe, declarative_version):
+        fingerprint = UniverseFingerprint()
+        fingerprint.add(Entry("c1", "1.0.0", "http://c1/1", {}))
+        self.state.fingerprint = fingerprint.to_bytes()
+        self.state.mirror = True
+        self.state.save()
+        open_universe.return_value = Mock(result=Mock(headers={}), close=AsyncMock())
+        synchronize(self.remote.pk, self.repository.pk, mirror=True)
+        kwargs = declarative_version.call_args.kwargs
+        self.assertFalse(kwargs["mirror"])
+        self.assertTrue(kwargs["incremental_mirror"])
+        self.assertEqual(kwargs["first_stage"].previous.digests, fingerprint.digests)
+
+
+@patch("pulp_cookbook.app.tasks.synchronizing.open_universe", new_callable=AsyncMock)
+class PlanSyncTestCase(TestCase):
+    """
+    Verify the report of a dry run sync.
+
+    The database access of the stages uses the connection of the test (instead
+    of a worker thread with its own connection), i.e. runs within the
+    transaction of the test.
+    """
+
+    def setUp(self):
+        self.remote = CookbookRemote.objects.create(
+            name="remote", url="http://example.com", policy=CookbookRemote.IMMEDIATE
+        )
+        self.repository = CookbookRepository.objects.create(name="repository")
+        artifact = Artifact.objects.create(
+            size=3 * 2**20,
+            sha224="111111111111111111",
+            sha256="111111111111111111",
+            sha384="111111111111111111",
+            sha512="111111111111111111",
+            file=SimpleUploadedFile("test_filename", b""),
+        )
+        c1 = CookbookPackageContent.objects.create(
+            name="c1",
+            version="1.0.0",
+            content_id_type=CookbookPackageContent.SHA256,
+            content_id="1",
+            dependencies={},
+        )
+        ContentArtifact.objects.create(
+            artifact=artifact, content=c1, relative_path=c1.relative_path()
+        )
+        c3 = CookbookPackageContent.objects.create(name="c3", version="1.0.0", dependencies={})
+        ContentArtifact.objects.create(artifact=None, content=c3, relative_path=c3.relative_path())
+        with self.repository.new_version() as new_version:
+            new_version.add_content(CookbookPackageContent.objects.filter(pk__in=[c1.pk, c3.pk]))
+
+    def plan(self, open_universe, mirror):
+        entries = [Entry(name, "1.0.0", f"http://{name}", {}) for name in ("c1", "c2", "c4")]
+
+        async def stream():
+            for entry in entries:
+                yield entry
+
+        open_universe.return_value = Mock(entries=stream, close=AsyncMock())
+        test_connection = connections[DEFAULT_DB_ALIAS]
+
+        def sync_to_async(func):
+            async def run(*args, **kwargs):
+                connections[DEFAULT_DB_ALIAS] = test_connection
+                return func(*args, **kwargs)
+
+            return run
+
+        with patch(
+            "pulp_cookbook.app.tasks.synchronizing.sync_to_async", sync_to_async
+        ), patch.dict(os.environ, DJANGO_ALLOW_ASYNC_UNSAFE="true"), patch(
+            "pulp_cookbook.app.tasks.synchronizing.ProgressReport"
+        ) as progress_report:
+            progress_report.return_value.__aenter__.return_value = AsyncMock()
+            plan_sync(self.remote, self.repository, mirror)
+        open_universe.return_value.close.assert_awaited_once()
+        return {
+            c.kwargs["code"]: (c.kwargs["total"], c.kwargs["done"])
+            for c in progress_report.call_args_list
+            if c.kwargs["code"].startswith("sync.plan.")
+        }
+
+    def test_mirror(self, open_universe):
+        versions = RepositoryVersion.objects.count()
+        self.assertEqual(
+            self.plan(open_universe, mirror=True),
+            {
+                "sync.plan.adding.content": (2, 2),
+                "sync.plan.removing.content": (1, 1),
+                "sync.plan.downloading.artifacts": (2, 2),
+                "sync.plan.downloading.size": (6, 6),
+            },
+        )
+        self.assertEqual(self.repository.latest_version().number, 1)
+        self.assertEqual(RepositoryVersion.objects.count(), versions)
+        self.assertFalse(CookbookSyncState.objects.exists())
+
+    def test_additive(self, open_universe):
+        report = self.plan(open_universe, mirror=False)
+        self.assertEqual(report["sync.plan.adding.content"], (2, 2))
+        self.assertEqual(report["sync.plan.removing.content"], (0, 0))
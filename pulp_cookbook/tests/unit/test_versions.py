@@ -0,0 +1,128 @@
+# (C) Copyright 2026 Simon Baatz <gmbnomis@gmail.com>
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+from unittest import TestCase
+
+from pulp_cookbook.versions import (
+    InvalidConstraint,
+    InvalidVersion,
+    VersionArray,
+    parse_constraint,
+    parse_version,
+    version_key,
+)
+
+
+class ParseVersionTestCase(TestCase):
+    """Verify parsing of cookbook versions."""
+
+    def test_parse_version(self):
+        self.assertEqual(parse_version("1.2.3"), (1, 2, 3))
+        self.assertEqual(parse_version("1.2"), (1, 2, 0))
+        self.assertEqual(parse_version("10"), (10, 0, 0))
+        for version in ("", "a", "1.2.3.4", "1.2.x", "-1"):
+            with self.subTest(version=version), self.assertRaises(InvalidVersion):
+                parse_version(version)
+
+
+class VersionConstraintTestCase(TestCase):
+    """Verify evaluation of Chef version constraints."""
+
+    versions = ["0.9.0", "1.0.0", "1.1.0", "1.2.0", "1.2.5", "1.3.0", "2.0.0", "10.0.0", "bad"]
+
+    def assertSelects(self, constraint, expected):
+        self.assertEqual(parse_constraint(constraint).filter(self.versions), expected, constraint)
+
+    def test_operators(self):
+        self.assertSelects("= 1.2.0", ["1.2.0"])
+        self.assertSelects("1.2", ["1.2.0"])
+        self.assertSelects(">= 1.3.0", ["1.3.0", "2.0.0", "10.0.0"])
+        self.assertSelects("> 1.3.0", ["2.0.0", "10.0.0"])
+        self.assertSelects("<= 1.0.0", ["0.9.0", "1.0.0"])
+        self.assertSelects("< 1.0.0", ["0.9.0"])
+
+    def test_pessimistic_operator(self):
+        self.assertSelects("~> 1.2.0", ["1.2.0", "1.2.5"])
+        self.assertSelects("~> 1.2", ["1.2.0", "1.2.5", "1.3.0"])
+        self.assertSelects("~> 1", ["1.0.0", "1.1.0", "1.2.0", "1.2.5", "1.3.0"])
+
+    def test_combined_and_empty(self):
+        self.assertSelects(">= 1.1.0, < 1.3", ["1.1.0", "1.2.0", "1.2.5"])
+        self.assertSelects("> 1.2.5, <= 1.2.5", [])
+        self.assertSelects("", self.versions[:-1])
+
+    def test_match_many(self):
+        constraint = parse_constraint("~> 1.2")
+        self.assertEqual(
+            constraint.match_many(["1.1.9", "1.2.0", "1.99.0", "2.0.0", "x"]),
+            [False, True, True, False, False],
+        )
+
+    def test_cached(self):
+        self.assertIs(parse_constraint(">= 1.0"), parse_constraint(">= 1.0"))
+
+    def test_invalid_constraints(self):
+        for constraint in ("~>", ">= a", "=> 1.0", "1.0 2.0"):
+            with self.subTest(constraint=constraint), self.assertRaises(InvalidConstraint):
+                parse_constraint(constraint)
+
+
+class VersionArrayTestCase(TestCase):
+    """Verify the batch operations on integer encoded versions."""
+
+    def setUp(self):
+        self.array = VersionArray(
+            [
+                ("b", "1.10.0"),
+                ("a", "2.0.0"),
+                ("b", "1.9.0"),
+                ("a", "10.0"),
+                ("b", "4294967295.0.1"),
+                ("a", "2.0.1"),
+            ]
+        )
+
+    def test_append_invalid(self):
+        with self.assertRaises(InvalidVersion):
+            self.array.append("a", "4294967296.0.0")
+        with self.assertRaises(InvalidVersion):
+            self.array.append("a", "x")
+        self.assertEqual(len(self.array), 6)
+
+    def test_keys_order_like_versions(self):
+        keys = self.array.keys()
+        tuples = [parse_version(v) for v in self.array.versions]
+        self.assertEqual(
+            sorted(range(len(keys)), key=keys.__getitem__),
+            sorted(range(len(tuples)), key=tuples.__getitem__),
+        )
+        self.assertEqual(keys[0], version_key((1, 10, 0)))
+
+    def test_sorted_indices(self):
+        ordered = [
+            (self.array.name(i), self.array.versions[i]) for i in self.array.sorted_indices()
+        ]
+        self.assertEqual(
+            ordered,
+            [
+                ("a", "2.0.0"),
+                ("a", "2.0.1"),
+                ("a", "10.0"),
+                ("b", "1.9.0"),
+                ("b", "1.10.0"),
+                ("b", "4294967295.0.1"),
+            ],
+        )
+
+    def test_latest(self):
+        self.assertEqual(self.array.latest_indices(2), {"a": [3, 5], "b": [4, 0]})
+        self.assertEqual(self.array.max_versions(), {"a": "10.0", "b": "4294967295.0.1"})
+
+    def test_match(self):
+        matches = self.array.match(parse_constraint("~> 2.0"))
+        self.assertEqual(self.array.select(matches), [1, 5])
+        matches = self.array.match_by_name(
+            {"b": parse_constraint(">= 1.9.0, < 2"), "c": parse_constraint("")}
+        )
+        self.assertEqual(self.array.select(matches), [0, 2])
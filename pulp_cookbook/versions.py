@@ -0,0 +1,385 @@
+# (C) Copyright 2026 Simon Baatz <gmbnomis@gmail.com>
+#
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import heapq
+import re
+
+from array import array
+from functools import lru_cache
+from operator import itemgetter
+
+_VERSION_RE = re.compile(r"^\s*(\d+)(?:\.(\d+))?(?:\.(\d+))?\s*$")
+_CONSTRAINT_RE = re.compile(r"^\s*(~>|>=|<=|=|>|<)?\s*(\S+)\s*$")
+
+
+# Versions are encoded as integers with 32 bits per version part
+_PART_BITS = 32
+_PART_MAX = (1 << _PART_BITS) - 1
+
+
+class InvalidVersion(ValueError):
+    """A version string is not a valid Chef version."""
+
+
+class InvalidConstraint(ValueError):
+    """A version constraint string is not a valid Chef version constraint."""
+
+
+@lru_cache(maxsize=65536)
+def parse_version(version):
+    """
+    Parse a Chef cookbook version.
+
+    Args:
+        version (str): version in the format "x", "x.y" or "x.y.z"
+
+    Returns:
+        tuple: (major, minor, patch) integers, missing parts are 0
+
+    Raises:
+        InvalidVersion: If `version` is not a valid version
+
+    """
+    match = _VERSION_RE.match(version)
+    if not match:
+        raise InvalidVersion(f"invalid cookbook version '{version}'")
+    return tuple(int(part) if part else 0 for part in match.groups())
+
+
+def version_key(version):
+    """
+    Encode a version tuple as returned by `parse_version()` as a single integer.
+
+    Integer keys compare like the version tuples they encode.
+
+    Raises:
+        InvalidVersion: If a version part does not fit into the encoding
+
+    """
+    major, minor, patch = version
+    if major > _PART_MAX or minor > _PART_MAX or patch > _PART_MAX:
+        raise InvalidVersion(f"cookbook version {version} is out of range")
+    return (major << (2 * _PART_BITS)) | (minor << _PART_BITS) | patch
+
+
+class VersionConstraint:
+    """
+    A compiled Chef version constraint.
+
+    A constraint is the conjunction of one or more comparisons like "~> 1.2"
+    or ">= 2.0.0" and is represented by the range of matching versions. Use
+    `parse_constraint()` to obtain instances.
+
+    Attributes:
+        text (str): the constraint as given
+        lower (tuple): lower bound of matching versions or None
+        lower_inclusive (bool): whether the lower bound matches
+        upper (tuple): upper bound of matching versions or None
+        upper_inclusive (bool): whether the upper bound matches
+
+    """
+
+    __slots__ = ("text", "lower", "lower_inclusive", "upper", "upper_inclusive")
+
+    def __init__(self, text, lower=None, lower_inclusive=True, upper=None, upper_inclusive=False):
+        self.text = text
+        self.lower = lower
+        self.lower_inclusive = lower_inclusive
+        self.upper = upper
+        self.upper_inclusive = upper_inclusive
+
+    def __repr__(self):
+        return f"VersionConstraint({self.text!r})"
+
+    def intersect(self, other):
+        """Return the constraint matching the versions matched by both constraints."""
+        lower, lower_inclusive = self.lower, self.lower_inclusive
+        if other.lower is not None and (
+            lower is None
+            or other.lower > lower
+            or (other.lower == lower and not other.lower_inclusive)
+        ):
+            lower, lower_inclusive = other.lower, other.lower_inclusive
+        upper, upper_inclusive = self.upper, self.upper_inclusive
+        if other.upper is not None and (
+            upper is None
+            or other.upper < upper
+            or (other.upper == upper and not other.upper_inclusive)
+        ):
+            upper, upper_inclusive = other.upper, other.upper_inclusive
+        return VersionConstraint(
+            f"{self.text}, {other.text}", lower, lower_inclusive, upper, upper_inclusive
+        )
+
+    def matches_parsed(self, version):
+        """Check a version tuple as returned by `parse_version()` against the constraint."""
+        lower = self.lower
+        if lower is not None and (
+            version < lower or (version == lower and not self.lower_inclusive)
+        ):
+            return False
+        upper = self.upper
+        if upper is not None and (
+            version > upper or (version == upper and not self.upper_inclusive)
+        ):
+            return False
+        return True
+
+    def key_range(self):
+        """
+        Return the range of matching versions as integer keys (see `version_key()`).
+
+        Returns:
+            tuple: smallest and largest matching key (both inclusive)
+
+        """
+        if self.lower is None:
+            lowest = 0
+        else:
+            lowest = version_key(self.lower) + (0 if self.lower_inclusive else 1)
+        if self.upper is None:
+            highest = version_key((_PART_MAX, _PART_MAX, _PART_MAX))
+        else:
+            highest = version_key(self.upper) - (0 if self.upper_inclusive else 1)
+        return lowest, highest
+
+    def matches(self, version):
+        """
+        Check whether a version satisfies the constraint.
+
+        Args:
+            version (str): cookbook version
+
+        Returns:
+            bool: True if `version` is a valid version within the constraint
+
+        """
+        try:
+            return self.matches_parsed(parse_version(version))
+        except InvalidVersion:
+            return False
+
+    def match_many(self, versions):
+        """
+        Check many versions against the constraint at once.
+
+        Args:
+            versions (iterable): cookbook versions (str)
+
+        Returns:
+            list: a bool for each version
+
+        """
+        matches = self.matches
+        return [matches(version) for version in versions]
+
+    def filter(self, versions):
+        """
+        Select the versions satisfying the constraint.
+
+        Args:
+            versions (iterable): cookbook versions (str)
+
+        Returns:
+            list: the matching versions
+
+        """
+        matches = self.matches
+        return [version for version in versions if matches(version)]
+
+
+def _compile_comparison(text):
+    match = _CONSTRAINT_RE.match(text)
+    if not match:
+        raise InvalidConstraint(f"invalid version constraint '{text}'")
+    operator, version_text = match.groups()
+    try:
+        version = parse_version(version_text)
+    except InvalidVersion:
+        raise InvalidConstraint(f"invalid version in version constraint '{text}'")
+    if operator in (None, "="):
+        return VersionConstraint(text, version, True, version, True)
+    if operator == ">=":
+        return VersionConstraint(text, lower=version)
+    if operator == ">":
+        return VersionConstraint(text, lower=version, lower_inclusive=False)
+    if operator == "<=":
+        return VersionConstraint(text, upper=version, upper_inclusive=True)
+    if operator == "<":
+        return VersionConstraint(text, upper=version)
+    # "~>": the last given version part may increase
+    parts = version_text.strip().count(".") + 1
+    major, minor, _ = version
+    upper = (major + 1, 0, 0) if parts <= 2 else (major, minor + 1, 0)
+    return VersionConstraint(text, lower=version, upper=upper)
+
+
+@lru_cache(maxsize=1024)
+def parse_constraint(text):
+    """
+    Compile a Chef version constraint.
+
+    Compiled constraints are cached, i.e. parsing the same constraint string
+    again is cheap.
+
+    Args:
+        text (str): constraint like "~> 1.2", ">= 2.0.0" or "1.0.0". Multiple
+                    comparisons separated by "," must all be satisfied. An
+                    empty string matches all versions.
+
+    Returns:
+        VersionConstraint: the compiled constraint
+
+    Raises:
+        InvalidConstraint: If `text` is not a valid constraint
+
+    """
+    constraint = VersionConstraint(text)
+    for comparison in text.split(","):
+        if comparison.strip():
+            constraint = constraint.intersect(_compile_comparison(comparison))
+    constraint.text = text
+    return constraint
+
+
+class VersionArray:
+    """
+    Columnar store of the versions of many cookbooks.
+
+    Versions are kept as fixed width integer arrays (one per version part) and
+    the name of each version as an index into the list of names. Sorting,
+    selecting the latest versions per cookbook and constraint matching work on
+    integer keys instead of parsing version strings again.
+
+    Versions are addressed by their position (in the order they were added).
+
+    Attributes:
+        names (list): cookbook names
+        versions (list): version strings
+
+    """
+
+    def __init__(self, pairs=()):
+        self.names = []
+        self.versions = []
+        self._name_ids = {}
+        self._name_index = array("L")
+        self._major = array("L")
+        self._minor = array("L")
+        self._patch = array("L")
+        for name, version in pairs:
+            self.append(name, version)
+
+    def __len__(self):
+        return len(self.versions)
+
+    def append(self, name, version):
+        """
+        Add a version of a cookbook.
+
+        Raises:
+            InvalidVersion: If `version` is not a valid version
+
+        """
+        major, minor, patch = parsed = parse_version(version)
+        if max(parsed) > _PART_MAX:
+            raise InvalidVersion(f"cookbook version '{version}' is out of range")
+        try:
+            name_id = self._name_ids[name]
+        except KeyError:
+            name_id = self._name_ids[name] = len(self.names)
+            self.names.append(name)
+        self._name_index.append(name_id)
+        self._major.append(major)
+        self._minor.append(minor)
+        self._patch.append(patch)
+        self.versions.append(version)
+
+    def name(self, index):
+        """Return the cookbook name of the version at `index`."""
+        return self.names[self._name_index[index]]
+
+    def keys(self):
+        """Return the integer keys of all versions (see `version_key()`)."""
+        major_shift = 2 * _PART_BITS
+        return [
+            (major << major_shift) | (minor << _PART_BITS) | patch
+            for major, minor, patch in zip(self._major, self._minor, self._patch)
+        ]
+
+    def sorted_indices(self, reverse=False):
+        """Return the indices of all versions ordered by cookbook name and version."""
+        names = self.names
+        name_rank = [0] * len(names)
+        for rank, name_id in enumerate(sorted(range(len(names)), key=names.__getitem__)):
+            name_rank[name_id] = rank
+        keys = self.keys()
+        name_index = self._name_index
+        sort_keys = [(name_rank[name_index[i]], keys[i]) for i in range(len(keys))]
+        return sorted(range(len(keys)), key=sort_keys.__getitem__, reverse=reverse)
+
+    def latest_indices(self, count=1):
+        """
+        Select the latest versions of each cookbook.
+
+        Args:
+            count (int): number of versions to select per cookbook
+
+        Returns:
+            dict: the indices of the `count` latest versions (latest first) by cookbook name
+
+        """
+        keys = self.keys()
+        by_name_id = {}
+        for index, name_id in enumerate(self._name_index):
+            by_name_id.setdefault(name_id, []).append(index)
+        return {
+            self.names[name_id]: heapq.nlargest(count, indices, key=keys.__getitem__)
+            for name_id, indices in by_name_id.items()
+        }
+
+    def max_versions(self):
+        """Return the latest version string by cookbook name."""
+        versions = self.versions
+        return {
+            name: versions[indices[0]] for name, indices in self.latest_indices(count=1).items()
+        }
+
+    def match(self, constraint):
+        """
+        Check all versions against a constraint.
+
+        Args:
+            constraint (VersionConstraint): the constraint
+
+        Returns:
+            list: a bool for each version
+
+        """
+        lowest, highest = constraint.key_range()
+        return [lowest <= key <= highest for key in self.keys()]
+
+    def match_by_name(self, constraints):
+        """
+        Check all versions against the constraint for their cookbook.
+
+        Args:
+            constraints (dict): VersionConstraint by cookbook name. Versions of
+                cookbooks not contained do not match.
+
+        Returns:
+            list: a bool for each version
+
+        """
+        ranges = [
+            constraints[name].key_range() if name in constraints else (1, 0) for name in self.names
+        ]
+        return [
+            ranges[name_id][0] <= key <= ranges[name_id][1]
+            for name_id, key in zip(self._name_index, self.keys())
+        ]
+
+    def select(self, matches):
+        """Return the indices of the True values in `matches` (as returned by the match methods)."""
+        return [index for index, _ in filter(itemgetter(1), enumerate(matches))]